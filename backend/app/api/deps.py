@@ -6,8 +6,12 @@ Reusable dependencies for authentication and authorization
 from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional, Dict, Any
+import asyncio
 import logging
+import time
+from app.core.config import settings
 from app.core.security import verify_token
+from app.core.auth_cache import auth_cache, jwks_verifier, user_from_claims
 from app.db.supabase import supabase_client
 
 logger = logging.getLogger(__name__)
@@ -16,6 +20,33 @@ logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
 
+async def _verify(token: str) -> Optional[Dict[str, Any]]:
+    """Verify a token with JWKS in local mode when configured, else with the JWT secret"""
+    if settings.AUTH_LOCAL_VERIFICATION and jwks_verifier:
+        return await jwks_verifier.verify(token)
+    return verify_token(token)
+
+
+async def _lookup_user(token: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Resolve the user from token claims (local mode) or from Supabase Auth"""
+    if settings.AUTH_LOCAL_VERIFICATION:
+        auth_cache.local_verifications += 1
+        return user_from_claims(payload)
+    
+    # Sync SDK call, kept off the event loop
+    start = time.perf_counter()
+    response = await asyncio.to_thread(supabase_client.auth.get_user, token)
+    auth_cache.record_remote(time.perf_counter() - start)
+    if not response or not response.user:
+        return None
+    
+    return {
+        "id": response.user.id,
+        "email": response.user.email,
+        "role": response.user.user_metadata.get("role", "user")
+    }
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> Dict[str, Any]:
@@ -33,8 +64,12 @@ async def get_current_user(
     """
     token = credentials.credentials
     
+    cached_user = auth_cache.get(token)
+    if cached_user:
+        return cached_user
+    
     # Verify JWT token
-    payload = verify_token(token)
+    payload = await _verify(token)
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,20 +86,14 @@ async def get_current_user(
         )
     
     try:
-        # Fetch user from Supabase
-        response = supabase_client.auth.get_user(token)
-        if not response or not response.user:
+        user_data = await _lookup_user(token, payload)
+        if not user_data:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found",
             )
         
-        user_data = {
-            "id": response.user.id,
-            "email": response.user.email,
-            "role": response.user.user_metadata.get("role", "user")
-        }
-        
+        auth_cache.put(token, user_data, exp=payload.get("exp"))
         return user_data
         
     except Exception as e:
@@ -117,19 +146,18 @@ async def get_optional_user(
     
     token = authorization.replace("Bearer ", "")
     
+    cached_user = auth_cache.get(token)
+    if cached_user:
+        return cached_user
+    
     try:
-        payload = verify_token(token)
+        payload = await _verify(token)
         if not payload:
             return None
         
-        response = supabase_client.auth.get_user(token)
-        if not response or not response.user:
-            return None
-        
-        return {
-            "id": response.user.id,
-            "email": response.user.email,
-            "role": response.user.user_metadata.get("role", "user")
-        }
+        user_data = await _lookup_user(token, payload)
+        if user_data:
+            auth_cache.put(token, user_data, exp=payload.get("exp"))
+        return user_data
     except Exception:
         return None
@@ -4,41 +4,61 @@ Admin-only endpoints for complaint management and dashboard statistics
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.api.deps import get_current_admin_user
+from app.api.pagination import apply_keyset, match_any, split_page, count_option, list_view, select_ai_fields, fold_ai_report
+from app.core.auth_cache import auth_cache
 from app.schemas.complaint import (
     ComplaintResponse,
     ComplaintListResponse,
+    ComplaintSummaryListResponse,
     ComplaintStatusUpdateRequest,
     DashboardStatsResponse
 )
-from app.db.supabase import supabase_client
-from app.services.agent_workflow import log_complaint_action
+from app.db.repository import repository
+from app.services.agent_workflow import log_complaint_action, record_status_change, propagate_status_to_duplicates
+from app.services import followup_sweep
+from app.services.dashboard_stats import dashboard_counters, CLOSED_STATUSES
+from app.services.clustering import tile_cluster_cache
+from app.services.email_outbox import email_outbox
+from app.services.leader_election import leader_elector
+from app.services.vision_cache import vision_cache
+from app.services.llm_client import llm_client
+from app.services.department_registry import department_registry
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 logger = logging.getLogger(__name__)
 
 
-@router.get("/complaints", response_model=ComplaintListResponse)
+@router.get("/complaints", response_model=Union[ComplaintListResponse, ComplaintSummaryListResponse])
 async def list_all_complaints(
     page: int = 1,
     page_size: int = 50,
     status_filter: Optional[str] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    count: str = "exact",
+    view: str = "full",
+    ai_fields: Optional[str] = None,
     current_admin: Dict[str, Any] = Depends(get_current_admin_user)
 ):
     """
     List all complaints with advanced filtering for admin dashboard
     
+    Pass `next_cursor` from the previous response as `cursor` for constant-cost
+    deep pagination (`page` is ignored then). `count` is exact, estimated or none.
+    `view=summary` returns only id, coordinates, category, status and created_at.
+    `ai_fields` (e.g. `prediction,confidence`) returns only those ai_report keys.
+    
     Requires admin authentication.
     """
     try:
-        offset = (page - 1) * page_size
-        
-        query = supabase_client.table("complaints").select("*", count="exact")
+        columns, row_schema, list_schema = list_view(view)
+        columns, fields = select_ai_fields(columns, ai_fields)
+        query = repository.table("complaints").select(columns, count=count_option(count))
         
         # Apply status filter
         if status_filter:
@@ -46,20 +66,24 @@ async def list_all_complaints(
         
         # Apply search filter (search in category, description, or landmark)
         if search:
-            query = query.or_(f"category.ilike.%{search}%,description.ilike.%{search}%,landmark.ilike.%{search}%")
+            query = match_any(query, f"category.ilike.%{search}%,description.ilike.%{search}%,landmark.ilike.%{search}%")
         
         # Execute with pagination
-        response = query.order("created_at", desc=True).range(offset, offset + page_size - 1).execute()
+        response = await apply_keyset(query, cursor, page, page_size).execute()
+        rows, next_cursor = split_page(response.data, page_size)
         
-        complaints = [ComplaintResponse(**c) for c in response.data]
+        complaints = [row_schema(**fold_ai_report(c, fields)) for c in rows]
         
-        return ComplaintListResponse(
+        return list_schema(
             complaints=complaints,
-            total=response.count or 0,
+            total=response.count,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            next_cursor=next_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Admin list complaints failed: {e}")
         raise HTTPException(
@@ -81,21 +105,33 @@ async def update_complaint_status(
     """
     try:
         # Fetch current complaint
-        complaint_response = supabase_client.table("complaints").select("*").eq("id", complaint_id).execute()
+        complaint = await repository.get_complaint(
+            complaint_id,
+            columns="status, created_at, sla_hours, latitude, longitude"
+        )
         
-        if not complaint_response.data:
+        if not complaint:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Complaint not found"
             )
         
-        old_status = complaint_response.data[0]["status"]
+        old_status = complaint["status"]
         
-        # Update status
-        updated_complaint = supabase_client.table("complaints").update({
+        values = {
             "status": update.status,
             "updated_at": datetime.utcnow().isoformat()
-        }).eq("id", complaint_id).execute()
+        }
+        # Closed complaints leave the follow-up schedule; reopened ones are due at the next sweep
+        if update.status in CLOSED_STATUSES:
+            values["next_check_at"] = None
+        elif old_status in CLOSED_STATUSES:
+            values["next_check_at"] = datetime.now(timezone.utc).isoformat()
+        
+        # Update status
+        updated_rows = await repository.update_complaint(complaint_id, values)
+        record_status_change(complaint, update.status)
+        await propagate_status_to_duplicates([complaint_id], update.status)
         
         # Log the status change
         description = f"Admin {current_admin['email']} changed status from '{old_status}' to '{update.status}'"
@@ -116,7 +152,7 @@ async def update_complaint_status(
         
         logger.info(f"Admin updated complaint {complaint_id} status: {old_status} -> {update.status}")
         
-        return ComplaintResponse(**updated_complaint.data[0])
+        return ComplaintResponse(**updated_rows[0])
         
     except HTTPException:
         raise
@@ -135,70 +171,15 @@ async def get_dashboard_statistics(
     """
     Get comprehensive dashboard statistics for admin
     
-    Returns counts by status and performance metrics
+    Returns counts by status and performance metrics from in-process
+    counters that are updated on every status change and periodically
+    reconciled against the `get_dashboard_stats` RPC
     
     Requires admin authentication.
     """
     try:
-        # Get total count
-        total_response = supabase_client.table("complaints").select("id", count="exact").execute()
-        total = total_response.count or 0
-        
-        # Get counts by status
-        statuses = ["submitted", "in_progress", "escalated", "resolved", "rejected"]
-        status_counts = {}
-        
-        for status_name in statuses:
-            response = supabase_client.table("complaints") \
-                .select("id", count="exact") \
-                .eq("status", status_name) \
-                .execute()
-            status_counts[status_name] = response.count or 0
-        
-        # Calculate average resolution time (for resolved complaints)
-        resolved_response = supabase_client.table("complaints") \
-            .select("created_at, updated_at") \
-            .eq("status", "resolved") \
-            .execute()
-        
-        avg_resolution_hours = None
-        if resolved_response.data:
-            total_hours = 0
-            for complaint in resolved_response.data:
-                created = datetime.fromisoformat(complaint["created_at"].replace("Z", "+00:00"))
-                updated = datetime.fromisoformat(complaint["updated_at"].replace("Z", "+00:00"))
-                hours = (updated - created).total_seconds() / 3600
-                total_hours += hours
-            avg_resolution_hours = total_hours / len(resolved_response.data)
-        
-        # Calculate SLA compliance rate
-        sla_compliance_rate = None
-        complaints_with_sla = supabase_client.table("complaints") \
-            .select("created_at, updated_at, sla_hours, status") \
-            .in_("status", ["resolved", "rejected"]) \
-            .execute()
-        
-        if complaints_with_sla.data:
-            compliant_count = 0
-            for complaint in complaints_with_sla.data:
-                if complaint.get("sla_hours"):
-                    created = datetime.fromisoformat(complaint["created_at"].replace("Z", "+00:00"))
-                    updated = datetime.fromisoformat(complaint["updated_at"].replace("Z", "+00:00"))
-                    actual_hours = (updated - created).total_seconds() / 3600
-                    if actual_hours <= complaint["sla_hours"]:
-                        compliant_count += 1
-            sla_compliance_rate = (compliant_count / len(complaints_with_sla.data)) * 100
-        
-        return DashboardStatsResponse(
-            total_complaints=total,
-            submitted=status_counts.get("submitted", 0),
-            in_progress=status_counts.get("in_progress", 0),
-            escalated=status_counts.get("escalated", 0),
-            resolved=status_counts.get("resolved", 0),
-            rejected=status_counts.get("rejected", 0),
-            avg_resolution_time_hours=avg_resolution_hours,
-            sla_compliance_rate=sla_compliance_rate
-        )
+        stats = await dashboard_counters.get()
+        return DashboardStatsResponse(**stats)
         
     except Exception as e:
         logger.error(f"Failed to get dashboard stats: {e}")
@@ -206,3 +187,54 @@ async def get_dashboard_statistics(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve dashboard statistics"
         )
+
+
+
+@router.get("/scheduler/last-sweep")
+async def get_last_sweep_report(
+    current_admin: Dict[str, Any] = Depends(get_current_admin_user)
+):
+    """
+    Get the report from the most recent follow-up sweep in this process
+    
+    Includes candidate/due counts and per-stage timings in milliseconds, and
+    whether this worker currently holds the scheduler lease (standbys have no report).
+    
+    Requires admin authentication.
+    """
+    return {"report": followup_sweep.last_sweep_report, "leader": leader_elector.stats()}
+
+
+@router.get("/metrics/caches")
+async def get_cache_metrics(
+    current_admin: Dict[str, Any] = Depends(get_current_admin_user)
+):
+    """
+    Get hit/miss counters for the in-process caches and Gemini client usage
+    
+    Requires admin authentication.
+    """
+    return {
+        "vision": vision_cache.stats(),
+        "llm": llm_client.stats(),
+        "departments": department_registry.stats(),
+        "auth": auth_cache.stats(),
+        "dashboard": dashboard_counters.stats(),
+        "map_tiles": tile_cluster_cache.stats(),
+        "email_outbox": await email_outbox.stats()
+    }
+
+
+@router.post("/departments/refresh")
+async def refresh_departments(
+    current_admin: Dict[str, Any] = Depends(get_current_admin_user)
+):
+    """
+    Reload the department registry after departments are edited in the database
+    
+    Requires admin authentication.
+    """
+    department_registry.invalidate()
+    departments = await department_registry.all()
+    logger.info(f"Department registry refreshed by admin {current_admin['email']}")
+    return {"departments": len(departments)}
@@ -3,37 +3,76 @@ Complaints API Endpoints
 Handles all complaint-related operations including creation, retrieval, and feedback
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from typing import List, Optional, Dict, Any, Union
 import logging
 from datetime import datetime, timedelta
 from decimal import Decimal
 import uuid
 
 from app.api.deps import get_current_user, get_optional_user
+from app.api.pagination import apply_keyset, split_page, count_option, list_view, select_ai_fields, fold_ai_report
 from app.schemas.complaint import (
     ComplaintCreateRequest,
     ComplaintCreateResponse,
     ComplaintResponse,
     ComplaintDetailResponse,
     ComplaintListResponse,
+    ComplaintSummaryListResponse,
+    ComplaintGeoResponse,
+    ClusterTileResponse,
+    MarkerCluster,
+    ComplaintSummary,
     ComplaintFeedbackRequest,
     ComplaintActionResponse,
-    AIExplanationResponse
+    AIExplanationResponse,
+    ComplaintIngestResponse,
+    IngestionStatusResponse
+)
+from app.db.repository import repository
+from app.services.agent_workflow import log_complaint_action
+from app.services.complaint_pipeline import (
+    ComplaintSubmission,
+    PipelineRun,
+    IngestionQueueFull,
+    PROCESSING_STATUS,
+    run_complaint_pipeline,
+    ingestion_pool
 )
-from app.db.supabase import supabase_client
-from app.services.vision_model import analyze_image_for_civic_issue
-from app.services.gen_ai import reason_about_complaint
-from app.services.agent_workflow import initialize_complaint_workflow, log_complaint_action
-from app.services.scheduler import schedule_complaint_followup
 from app.services.decision_model import decision_model
+from app.services.department_registry import department_registry
+from app.services.geo_search import geo_search
+from app.services.clustering import tile_cluster_cache, MAX_ZOOM
 from app.db.models import DecisionFeatures
-from app.core.config import settings
 
 router = APIRouter(prefix="/complaints", tags=["Complaints"])
 logger = logging.getLogger(__name__)
 
 
+async def _read_submission(
+    current_user: Dict[str, Any],
+    category: str,
+    description: str,
+    latitude: float,
+    longitude: float,
+    landmark: Optional[str],
+    image: UploadFile
+) -> ComplaintSubmission:
+    """Buffer the multipart form into a ComplaintSubmission"""
+    return ComplaintSubmission(
+        complaint_id=str(uuid.uuid4()),
+        user_id=current_user["id"],
+        category=category,
+        description=description,
+        latitude=latitude,
+        longitude=longitude,
+        landmark=landmark,
+        image_bytes=await image.read(),
+        image_filename=image.filename,
+        image_content_type=image.content_type
+    )
+
+
 @router.post("/", response_model=ComplaintCreateResponse, status_code=status.HTTP_201_CREATED)
 async def create_complaint(
     category: str = Form(...),
@@ -48,6 +87,7 @@ async def create_complaint(
     Create a new complaint with AI-powered analysis
     
     This is the core endpoint that:
+    0. Links repeat reports of an open nearby complaint instead of re-running AI
     1. Uploads image to Supabase Storage
     2. Runs AI vision analysis
     3. Runs AI reasoning to assign department and generate official summary
@@ -55,150 +95,148 @@ async def create_complaint(
     5. Initializes autonomous follow-up workflow
     6. Schedules first follow-up check
     
+    Processing happens inline; see POST /complaints/ingest for the
+    asynchronous variant.
+    
     Requires authentication.
     """
     try:
-        user_id = current_user["id"]
-        complaint_id = str(uuid.uuid4())
-        
-        # Step 1: Upload image to Supabase Storage
-        logger.info(f"Uploading image for complaint {complaint_id}")
-        
-        # Read image file
-        image_bytes = await image.read()
-        file_extension = image.filename.split(".")[-1] if image.filename else "jpg"
-        storage_path = f"{user_id}/{complaint_id}.{file_extension}"
-        
-        # Upload to Supabase Storage
-        supabase_client.storage.from_(settings.STORAGE_BUCKET).upload(
-            path=storage_path,
-            file=image_bytes,
-            file_options={"content-type": image.content_type or "image/jpeg"}
-        )
-        
-        # Get public URL
-        image_url = supabase_client.storage.from_(settings.STORAGE_BUCKET).get_public_url(storage_path)
-        
-        logger.info(f"Image uploaded successfully: {image_url}")
-        
-        # Step 2: AI Vision Analysis
-        logger.info(f"Starting AI vision analysis for {complaint_id}")
-        vision_result = await analyze_image_for_civic_issue(image_url)
+        submission = await _read_submission(current_user, category, description, latitude, longitude, landmark, image)
+        run = PipelineRun(submission.complaint_id, submission.user_id)
         
-        # Step 3: AI Reasoning
-        logger.info(f"Starting AI reasoning for {complaint_id}")
-        location_text = landmark if landmark else f"({latitude}, {longitude})"
-        reasoning_result = await reason_about_complaint(
-            vision_result=vision_result,
-            user_description=description,
-            latitude=latitude,
-            longitude=longitude
-        )
+        complaint = await run_complaint_pipeline(run, submission)
         
-        # Calculate SLA deadline
-        sla_deadline = datetime.utcnow() + timedelta(hours=reasoning_result.sla_hours)
+        logger.info(f"Complaint {submission.complaint_id} created successfully")
         
-        # Step 4: Generate initial SHAP explanation for the complaint
-        from app.db.models import DecisionFeatures
-        from app.services.decision_model import decision_model
+        if run.duplicate_of:
+            message = "Complaint submitted successfully. It matches an existing open report and has been linked to it."
+        else:
+            message = "Complaint submitted successfully. AI analysis complete."
         
-        initial_features = DecisionFeatures(
-            time_since_sla_breach=-reasoning_result.sla_hours,  # Negative = before breach
-            category_priority=reasoning_result.priority_level if hasattr(reasoning_result, 'priority_level') else 5,
-            number_of_followups=0,
-            days_since_submission=0.0,
-            status_score=1  # Just submitted
+        return ComplaintCreateResponse(
+            success=True,
+            message=message,
+            complaint_id=submission.complaint_id,
+            complaint=ComplaintResponse(**complaint)
         )
         
-        shap_explanation = decision_model.explain_prediction(initial_features)
-        
-        # Build comprehensive AI report with vision + SHAP data
-        import json
-        ai_report_data = {
-            "vision_summary": vision_result.summary,
-            "vision_confidence": vision_result.confidence,
-            "detected_issue": vision_result.issue,
-            "shap_values": shap_explanation["shap_values"],
-            "feature_importance": shap_explanation["feature_importance"],
-            "prediction": shap_explanation["action"],
-            "confidence": shap_explanation["confidence"],
-            "explanation_text": shap_explanation["explanation_text"]
-        }
-        
-        # Step 5: Save complaint to database
-        complaint_data = {
-            "id": complaint_id,
-            "user_id": user_id,
-            "category": category,
-            "description": description,
-            "landmark": landmark,
-            "latitude": str(latitude),
-            "longitude": str(longitude),
-            "image_url": image_url,
-            "status": "submitted",
-            "ai_detected_category": vision_result.issue,
-            "ai_confidence": int(vision_result.confidence * 100),
-            "ai_report": json.dumps(ai_report_data),
-            "assigned_department": reasoning_result.department_id,
-            "official_summary": reasoning_result.official_summary,
-            "sla_hours": reasoning_result.sla_hours,
-            "sla_deadline": sla_deadline.isoformat()
-        }
-        
-        supabase_client.table("complaints").insert(complaint_data).execute()
-        
-        # Log initial action
-        await log_complaint_action(
-            complaint_id=complaint_id,
-            action_type="submitted",
-            description=f"Complaint submitted by user. AI detected: {vision_result.issue} (confidence: {int(vision_result.confidence * 100)}%)",
-            metadata={
-                "ai_category": vision_result.issue,
-                "ai_confidence": vision_result.confidence,
-                "assigned_department": reasoning_result.department_name,
-                "initial_prediction": shap_explanation["action"],
-                "ml_confidence": shap_explanation["confidence"]
-            }
+    except Exception as e:
+        logger.error(f"Failed to create complaint: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create complaint: {str(e)}"
         )
-        
-        # Step 6: Initialize workflow (send initial email)
-        await initialize_complaint_workflow(
-            complaint_id=complaint_id,
-            department_id=reasoning_result.department_id,
-            category=category,
-            summary=reasoning_result.official_summary,
-            location_text=location_text,
-            image_url=image_url
+
+
+@router.post("/ingest", response_model=ComplaintIngestResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_complaint(
+    category: str = Form(...),
+    description: str = Form(...),
+    latitude: float = Form(...),
+    longitude: float = Form(...),
+    landmark: Optional[str] = Form(None),
+    image: UploadFile = File(...),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Accept a complaint for asynchronous processing
+    
+    Stores the photo and a "processing" complaint row, queues the complaint
+    on the background ingestion workers and returns with the complaint ID, so
+    an accepted complaint survives a restart. Poll
+    GET /complaints/{complaint_id}/ingestion for per-stage progress.
+    Returns 503 with Retry-After when the workers are at capacity.
+    
+    Requires authentication.
+    """
+    if ingestion_pool.is_full:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many complaints are being processed, please retry shortly",
+            headers={"Retry-After": "30"}
         )
+    
+    try:
+        submission = await _read_submission(current_user, category, description, latitude, longitude, landmark, image)
+        await ingestion_pool.accept(submission)
         
-        # Step 7: Schedule follow-up
-        schedule_complaint_followup(complaint_id, reasoning_result.sla_hours)
-        
-        logger.info(f"Complaint {complaint_id} created successfully")
-        
-        # Prepare response
-        complaint_response = ComplaintResponse(**complaint_data)
+        logger.info(f"Complaint {submission.complaint_id} accepted for background processing")
         
-        return ComplaintCreateResponse(
+        return ComplaintIngestResponse(
             success=True,
-            message="Complaint submitted successfully. AI analysis complete.",
-            complaint_id=complaint_id,
-            complaint=complaint_response
+            message="Complaint accepted. AI analysis in progress.",
+            complaint_id=submission.complaint_id,
+            status="processing",
+            status_url=f"/complaints/{submission.complaint_id}/ingestion"
         )
         
+    except IngestionQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many complaints are being processed, please retry shortly",
+            headers={"Retry-After": "30"}
+        )
     except Exception as e:
-        logger.error(f"Failed to create complaint: {e}")
+        logger.error(f"Failed to accept complaint: {e}")
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to create complaint: {str(e)}"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Complaint ingestion is currently unavailable"
         )
 
 
-@router.get("/", response_model=ComplaintListResponse)
+@router.get("/{complaint_id}/ingestion", response_model=IngestionStatusResponse)
+async def get_ingestion_status(
+    complaint_id: str,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Get processing status and per-stage timing for a complaint accepted via
+    POST /complaints/ingest
+    
+    Requires authentication. Only the submitter or an admin can view it.
+    """
+    run = ingestion_pool.get_run(complaint_id)
+    
+    if run:
+        if run.user_id != current_user["id"] and current_user.get("role") != "admin":
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Ingestion job not found"
+            )
+        return IngestionStatusResponse(**run.to_dict())
+    
+    # Unknown to this process (restarted or handled by another worker): fall back to the database
+    complaint = await repository.get_complaint(complaint_id, columns="id, user_id, status, ai_report")
+    if not complaint or (complaint["user_id"] != current_user["id"] and current_user.get("role") != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ingestion job not found"
+        )
+    
+    if complaint["status"] == PROCESSING_STATUS:
+        return IngestionStatusResponse(complaint_id=complaint_id, status=PROCESSING_STATUS)
+    
+    report = complaint.get("ai_report")
+    if isinstance(report, dict) and report.get("ingestion_failed"):
+        # Rejected by the worker pool after INGESTION_MAX_ATTEMPTS failed runs
+        return IngestionStatusResponse(
+            complaint_id=complaint_id,
+            status="failed",
+            error=f"Automatic processing failed after {report.get('ingestion_attempts')} attempts"
+        )
+    
+    return IngestionStatusResponse(complaint_id=complaint_id, status="completed")
+
+
+@router.get("/", response_model=Union[ComplaintListResponse, ComplaintSummaryListResponse])
 async def list_complaints(
     page: int = 1,
     page_size: int = 20,
     status_filter: Optional[str] = None,
+    cursor: Optional[str] = None,
+    count: str = "exact",
+    view: str = "full",
+    ai_fields: Optional[str] = None,
     user: Optional[Dict[str, Any]] = Depends(get_optional_user)
 ):
     """
@@ -206,11 +244,16 @@ async def list_complaints(
     
     Public endpoint - returns all complaints for the map view
     If authenticated, can filter by user's own complaints
+    
+    Pass `next_cursor` from the previous response as `cursor` for constant-cost
+    deep pagination (`page` is ignored then). `count` is exact, estimated or none.
+    `view=summary` returns only id, coordinates, category, status and created_at.
+    `ai_fields` (e.g. `prediction,confidence`) returns only those ai_report keys.
     """
     try:
-        offset = (page - 1) * page_size
-        
-        query = supabase_client.table("complaints").select("*", count="exact")
+        columns, row_schema, list_schema = list_view(view)
+        columns, fields = select_ai_fields(columns, ai_fields)
+        query = repository.table("complaints").select(columns, count=count_option(count))
         
         # Apply filters
         if status_filter:
@@ -221,17 +264,21 @@ async def list_complaints(
             query = query.eq("user_id", user["id"])
         
         # Execute query with pagination
-        response = query.order("created_at", desc=True).range(offset, offset + page_size - 1).execute()
+        response = await apply_keyset(query, cursor, page, page_size).execute()
+        rows, next_cursor = split_page(response.data, page_size)
         
-        complaints = [ComplaintResponse(**c) for c in response.data]
+        complaints = [row_schema(**fold_ai_report(c, fields)) for c in rows]
         
-        return ComplaintListResponse(
+        return list_schema(
             complaints=complaints,
-            total=response.count or 0,
+            total=response.count,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            next_cursor=next_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list complaints: {e}")
         raise HTTPException(
@@ -240,39 +287,134 @@ async def list_complaints(
         )
 
 
+@router.get("/geo", response_model=ComplaintGeoResponse)
+async def list_complaints_in_area(
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lng: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lng: Optional[float] = Query(None, ge=-180, le=180),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_m: Optional[float] = Query(None, gt=0, le=50000),
+    status_filter: Optional[str] = None,
+    limit: int = Query(2000, ge=1, le=5000)
+):
+    """
+    List complaints inside a map viewport or around a point
+    
+    Pass either a bounding box (min_lat, min_lng, max_lat, max_lng) or a
+    center and radius (lat, lng, radius_m). Returns compact rows, newest first.
+    
+    Public endpoint
+    """
+    bbox = (min_lat, min_lng, max_lat, max_lng)
+    has_bbox = all(v is not None for v in bbox)
+    has_radius = lat is not None and lng is not None and radius_m is not None
+    
+    if has_bbox == has_radius:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either min_lat, min_lng, max_lat, max_lng or lat, lng, radius_m"
+        )
+    if has_bbox and (min_lat > max_lat or min_lng > max_lng):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bounding box minimums must not exceed maximums"
+        )
+    
+    try:
+        # Fetch one extra row to report truncation
+        if has_bbox:
+            rows = await geo_search.in_bbox(*bbox, status_filter=status_filter, limit=limit + 1)
+        else:
+            rows = await geo_search.in_radius(lat, lng, radius_m, status_filter=status_filter, limit=limit + 1)
+        
+        complaints = [ComplaintSummary(**r) for r in rows[:limit]]
+        
+        return ComplaintGeoResponse(
+            complaints=complaints,
+            count=len(complaints),
+            truncated=len(rows) > limit
+        )
+        
+    except Exception as e:
+        logger.error(f"Geo complaint query failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve complaints"
+        )
+
+
+@router.get("/clusters/{z}/{x}/{y}", response_model=ClusterTileResponse)
+async def get_marker_clusters(
+    z: int,
+    x: int,
+    y: int,
+    status_filter: Optional[str] = None
+):
+    """
+    Get clustered complaint markers for a web-map tile (z/x/y, XYZ scheme)
+    
+    Each cluster carries its centroid and counts by status and category.
+    Results are cached per tile until a complaint in the tile changes.
+    
+    Public endpoint
+    """
+    if not 0 <= z <= MAX_ZOOM or not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid tile coordinates"
+        )
+    
+    try:
+        tile = await tile_cluster_cache.get_clusters(z, x, y, status_filter)
+        return ClusterTileResponse(
+            z=z,
+            x=x,
+            y=y,
+            clusters=[MarkerCluster(**c) for c in tile["clusters"]],
+            total=sum(c["count"] for c in tile["clusters"]),
+            truncated=tile["truncated"]
+        )
+        
+    except Exception as e:
+        logger.error(f"Failed to cluster tile {z}/{x}/{y}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve clusters"
+        )
+
+
 @router.get("/{complaint_id}", response_model=ComplaintDetailResponse)
 async def get_complaint_detail(
     complaint_id: str,
+    ai_fields: Optional[str] = None,
     user: Optional[Dict[str, Any]] = Depends(get_optional_user)
 ):
     """
     Get detailed information about a specific complaint including timeline
     
+    `ai_fields` (e.g. `prediction,confidence`) returns only those ai_report keys.
+    
     Public endpoint
     """
     try:
+        columns, fields = select_ai_fields("*", ai_fields)
+        
         # Fetch complaint
-        complaint_response = supabase_client.table("complaints").select("*").eq("id", complaint_id).execute()
+        complaint = await repository.get_complaint(complaint_id, columns=columns)
         
-        if not complaint_response.data:
+        if not complaint:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Complaint not found"
             )
         
-        complaint = complaint_response.data[0]
-        
         # Fetch actions (timeline)
-        actions_response = supabase_client.table("complaint_actions") \
-            .select("*") \
-            .eq("complaint_id", complaint_id) \
-            .order("created_at", desc=False) \
-            .execute()
-        
-        actions = [ComplaintActionResponse(**a) for a in actions_response.data]
+        actions = [ComplaintActionResponse(**a) for a in await repository.list_actions(complaint_id)]
         
         # Build response
-        detail = ComplaintDetailResponse(**complaint, actions=actions)
+        detail = ComplaintDetailResponse(**fold_ai_report(complaint, fields), actions=actions)
         
         return detail
         
@@ -299,7 +441,7 @@ async def submit_feedback(
     """
     try:
         # Verify complaint exists and belongs to user
-        complaint_response = supabase_client.table("complaints") \
+        complaint_response = await repository.table("complaints") \
             .select("*") \
             .eq("id", complaint_id) \
             .eq("user_id", current_user["id"]) \
@@ -321,11 +463,11 @@ async def submit_feedback(
             )
         
         # Update complaint with feedback
-        supabase_client.table("complaints").update({
+        await repository.update_complaint(complaint_id, {
             "user_rating": feedback.rating,
             "user_feedback": feedback.feedback,
             "updated_at": datetime.utcnow().isoformat()
-        }).eq("id", complaint_id).execute()
+        })
         
         # Log feedback action
         await log_complaint_action(
@@ -361,16 +503,14 @@ async def get_ai_explanation(
     """
     try:
         # Fetch complaint
-        complaint_response = supabase_client.table("complaints").select("*").eq("id", complaint_id).execute()
+        complaint = await repository.get_complaint(complaint_id)
         
-        if not complaint_response.data:
+        if not complaint:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Complaint not found"
             )
         
-        complaint = complaint_response.data[0]
-        
         # Calculate features (same as in agent_workflow)
         created_at = datetime.fromisoformat(complaint["created_at"].replace("Z", "+00:00"))
         now = datetime.now(created_at.tzinfo)
@@ -383,17 +523,12 @@ async def get_ai_explanation(
         # Get department priority
         category_priority = 5
         if complaint.get("assigned_department"):
-            dept_response = supabase_client.table("departments").select("priority_level").eq("id", complaint["assigned_department"]).execute()
-            if dept_response.data:
-                category_priority = dept_response.data[0].get("priority_level", 5)
+            dept = await department_registry.get(complaint["assigned_department"])
+            if dept:
+                category_priority = dept.get("priority_level", 5)
         
         # Count follow-ups
-        followups_response = supabase_client.table("complaint_actions") \
-            .select("id", count="exact") \
-            .eq("complaint_id", complaint_id) \
-            .eq("action_type", "follow_up") \
-            .execute()
-        num_followups = followups_response.count or 0
+        num_followups = await repository.count_followups(complaint_id)
         
         status_scores = {"submitted": 1, "in_progress": 2, "escalated": 3, "resolved": 4, "rejected": 0}
         status_score = status_scores.get(complaint["status"], 1)
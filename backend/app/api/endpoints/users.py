@@ -5,6 +5,7 @@ Handles user authentication operations (login, signup, etc.)
 
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, EmailStr
+import asyncio
 import logging
 from app.db.supabase import supabase_anon
 
@@ -37,7 +38,7 @@ async def signup(request: SignupRequest):
     """
     try:
         # Sign up user with Supabase
-        response = supabase_anon.auth.sign_up({
+        response = await asyncio.to_thread(supabase_anon.auth.sign_up, {
             "email": request.email,
             "password": request.password
         })
@@ -74,7 +75,7 @@ async def login(request: LoginRequest):
     """
     try:
         # Sign in with Supabase
-        response = supabase_anon.auth.sign_in_with_password({
+        response = await asyncio.to_thread(supabase_anon.auth.sign_in_with_password, {
             "email": request.email,
             "password": request.password
         })
@@ -0,0 +1,180 @@
+"""
+Keyset Pagination
+Opaque cursors over (created_at, id) and column projection for complaint list endpoints,
+including selection of individual ai_report keys
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+
+from app.schemas.complaint import (
+    ComplaintResponse,
+    ComplaintListResponse,
+    ComplaintSummary,
+    ComplaintSummaryListResponse,
+    COMPLAINT_SUMMARY_COLUMNS,
+    AI_REPORT_FIELDS
+)
+
+COUNT_MODES = {"exact", "estimated", "none"}
+
+# Newest first with the id tie-break the cursor relies on. Sent as one `order`
+# parameter: chained .order() calls add a second `order=` that PostgREST ignores
+KEYSET_ORDER = "created_at.desc,id.desc"
+
+# view -> (selected columns, row schema, list schema)
+LIST_VIEWS: Dict[str, Tuple[str, Type[BaseModel], Type[BaseModel]]] = {
+    "full": ("*", ComplaintResponse, ComplaintListResponse),
+    "summary": (COMPLAINT_SUMMARY_COLUMNS, ComplaintSummary, ComplaintSummaryListResponse),
+}
+
+
+def list_view(view: str) -> Tuple[str, Type[BaseModel], Type[BaseModel]]:
+    """
+    Resolve the `view` query parameter
+
+    Raises:
+        HTTPException: If the view is not full or summary
+    """
+    if view not in LIST_VIEWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="view must be one of: full, summary"
+        )
+    return LIST_VIEWS[view]
+
+
+# Every ComplaintResponse column except ai_report, which is projected per key
+COMPLAINT_COLUMNS_WITHOUT_AI_REPORT = ", ".join(
+    name for name in ComplaintResponse.model_fields if name != "ai_report"
+)
+AI_FIELD_ALIAS_PREFIX = "ai_report__"
+
+
+def select_ai_fields(columns: str, ai_fields: Optional[str]) -> Tuple[str, Optional[List[str]]]:
+    """
+    Narrow a `*` projection to the requested ai_report keys
+
+    Args:
+        columns: Columns chosen by list_view (only "*" is narrowed)
+        ai_fields: Comma-separated ai_report keys from the query string
+
+    Returns:
+        (columns to select, requested keys or None when the whole report is kept)
+
+    Raises:
+        HTTPException: If a key is not a known ai_report field
+    """
+    if not ai_fields or columns != "*":
+        return columns, None
+    fields = [f.strip() for f in ai_fields.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in AI_REPORT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ai_fields must be drawn from: {', '.join(AI_REPORT_FIELDS)}"
+        )
+    projected = ", ".join(f"{AI_FIELD_ALIAS_PREFIX}{f}:ai_report->{f}" for f in fields)
+    return f"{COMPLAINT_COLUMNS_WITHOUT_AI_REPORT}, {projected}", fields
+
+
+def fold_ai_report(row: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Gather projected ai_report keys back into the row's ai_report dict"""
+    if fields is None:
+        return row
+    report = {f: row.pop(f"{AI_FIELD_ALIAS_PREFIX}{f}", None) for f in fields}
+    row["ai_report"] = {k: v for k, v in report.items() if v is not None} or None
+    return row
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Build the cursor pointing just past a row"""
+    raw = json.dumps({"c": row["created_at"], "i": str(row["id"])}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a cursor into (created_at, id)
+
+    Both values are parsed and re-serialized, so nothing from the client
+    reaches the PostgREST filter string verbatim.
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(str(data["c"]).replace("Z", "+00:00"))
+        complaint_id = uuid.UUID(str(data["i"]))
+        return created_at.isoformat(), str(complaint_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def count_option(count: str) -> Optional[str]:
+    """
+    Map the `count` query parameter to the PostgREST count method
+
+    Raises:
+        HTTPException: If the mode is not exact, estimated or none
+    """
+    if count not in COUNT_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="count must be one of: exact, estimated, none"
+        )
+    return None if count == "none" else count
+
+
+def match_any(query, conditions: str):
+    """
+    AND a PostgREST `or` condition list (e.g. "a.eq.1,b.lt.2") onto a query
+
+    The pinned postgrest client has no `.or_()`. A second `or` on the same
+    query is combined with the first under `and`, since PostgREST reads only
+    one `or` parameter.
+    """
+    existing = query.params.get("or")
+    if existing is None:
+        query.params = query.params.add("or", f"({conditions})")
+    else:
+        query.params = query.params.remove("or").add("and", f"(or{existing},or({conditions}))")
+    return query
+
+
+def apply_keyset(query, cursor: Optional[str], page: int, page_size: int):
+    """
+    Order newest first and position the query at a cursor (or page offset)
+
+    One extra row is requested so the caller can tell whether a next page exists.
+    """
+    query.params = query.params.add("order", KEYSET_ORDER)
+    if cursor:
+        created_at, complaint_id = decode_cursor(cursor)
+        query = match_any(
+            query,
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{complaint_id}")'
+        )
+        return query.limit(page_size + 1)
+
+    offset = (page - 1) * page_size
+    return query.range(offset, offset + page_size)
+
+
+def split_page(rows: List[Dict[str, Any]], page_size: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim the look-ahead row and return (page rows, next cursor or None)"""
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
@@ -0,0 +1,179 @@
+"""
+Auth Cache
+Caches resolved users by token hash so an authenticated request does not need
+a Supabase Auth round trip, plus optional fully local token verification
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+
+import httpx
+from jose import JWTError, jwt
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def user_from_claims(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Build the user dict from verified Supabase JWT claims
+
+    Args:
+        payload: Decoded token payload
+
+    Returns:
+        User data dictionary, or None if the token has no subject
+    """
+    if not payload.get("sub"):
+        return None
+    metadata = payload.get("user_metadata") or {}
+    return {
+        "id": payload["sub"],
+        "email": payload.get("email"),
+        "role": metadata.get("role", "user")
+    }
+
+
+class JWKSVerifier:
+    """Verifies tokens against the auth server's JSON Web Key Set"""
+
+    def __init__(self, url: str, audience: str, algorithms: List[str], refresh_seconds: int = 3600):
+        self.url = url
+        self.audience = audience
+        self.algorithms = algorithms
+        self.refresh_seconds = refresh_seconds
+        self.jwks: Optional[Dict[str, Any]] = None
+        self.fetched_at = 0.0
+
+    async def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Decode a token, refetching the key set once if its key id is unknown
+
+        Only the configured algorithms are accepted; the token header cannot
+        choose another one.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            return None
+        if header.get("alg") not in self.algorithms:
+            logger.warning(f"Rejected token signed with disallowed algorithm {header.get('alg')!r}")
+            return None
+
+        if self.jwks is None or time.monotonic() - self.fetched_at > self.refresh_seconds:
+            await self._fetch()
+        elif not self._has_key(header.get("kid")):
+            await self._fetch()  # Key rotation
+
+        if not self.jwks:
+            return None
+        try:
+            return jwt.decode(
+                token,
+                self.jwks,
+                algorithms=self.algorithms,
+                audience=self.audience
+            )
+        except JWTError:
+            return None
+
+    def _has_key(self, kid: Optional[str]) -> bool:
+        return any(key.get("kid") == kid for key in (self.jwks or {}).get("keys", []))
+
+    async def _fetch(self):
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+                self.jwks = response.json()
+                self.fetched_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"Failed to fetch JWKS from {self.url}: {e}")
+
+
+class AuthCache:
+    """
+    LRU cache of resolved users keyed by SHA-256 of the bearer token
+
+    Entries expire at the token's `exp` or after `ttl_seconds`, whichever
+    comes first. Tokens themselves are never stored.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.remote_calls = 0
+        self.remote_seconds = 0.0
+        self.local_verifications = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Cached user for a token, or None"""
+        key = self.key(token)
+        entry = self.entries.get(key)
+        if entry and entry["expires_at"] <= time.time():
+            del self.entries[key]
+            entry = None
+        if not entry:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry["user"]
+
+    def put(self, token: str, user: Dict[str, Any], exp: Optional[float] = None):
+        """Cache a user until the token expires or the TTL elapses"""
+        expires_at = time.time() + self.ttl_seconds
+        if exp:
+            expires_at = min(expires_at, float(exp))
+        key = self.key(token)
+        self.entries[key] = {"user": user, "expires_at": expires_at}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def record_remote(self, seconds: float):
+        """Record the latency of a Supabase Auth lookup"""
+        self.remote_calls += 1
+        self.remote_seconds += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and estimated latency saved"""
+        lookups = self.hits + self.misses
+        avg_remote_ms = (self.remote_seconds / self.remote_calls * 1000) if self.remote_calls else None
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "remote_calls": self.remote_calls,
+            "local_verifications": self.local_verifications,
+            "avg_remote_ms": round(avg_remote_ms, 2) if avg_remote_ms is not None else None,
+            "latency_saved_ms": round(self.hits * avg_remote_ms, 1) if avg_remote_ms is not None else None
+        }
+
+
+# Global auth cache instance
+auth_cache = AuthCache(
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES
+)
+
+# JWKS verifier (local verification with asymmetric keys)
+jwks_verifier = (
+    JWKSVerifier(settings.AUTH_JWKS_URL, settings.AUTH_JWT_AUDIENCE, settings.AUTH_JWKS_ALGORITHMS)
+    if settings.AUTH_JWKS_URL else None
+)
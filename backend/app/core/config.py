@@ -18,11 +18,19 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = False
     
+    # Defer loading the decision model until first use (faster cold starts)
+    LAZY_STARTUP: bool = False
+    
     # Supabase Configuration
     SUPABASE_URL: str
     SUPABASE_ANON_KEY: str
     SUPABASE_SERVICE_ROLE_KEY: str
-    
+
+    # Async Repository Connection Pool
+    DB_POOL_MAX_CONNECTIONS: int = 20
+    DB_POOL_MAX_KEEPALIVE: int = 10
+    DB_REQUEST_TIMEOUT_SECONDS: float = 10.0
+
     # Google Gemini AI Configuration
     GEMINI_API_KEY: str
     
@@ -36,6 +44,16 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 43200  # 30 days for hackathon testing
     
+    # Auth Cache (resolved users keyed by token hash)
+    AUTH_CACHE_TTL_SECONDS: int = 300  # Capped by the token's own exp
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    # Trust verified token claims instead of calling Supabase Auth; role changes
+    # then take effect when the user's token is refreshed
+    AUTH_LOCAL_VERIFICATION: bool = False
+    AUTH_JWKS_URL: str = ""  # e.g. https://<project>.supabase.co/auth/v1/.well-known/jwks.json; empty = JWT secret
+    AUTH_JWT_AUDIENCE: str = "authenticated"
+    AUTH_JWKS_ALGORITHMS: List[str] = ["RS256", "ES256"]  # Tokens naming any other algorithm are rejected
+    
     # CORS Settings (accepts JSON string or list)
     BACKEND_CORS_ORIGINS: str = '["http://localhost:3000","http://localhost:3001","https://civicagent.vercel.app"]'
     
@@ -51,17 +69,89 @@ class Settings(BaseSettings):
     
     # Scheduler Settings
     SCHEDULER_TIMEZONE: str = "Asia/Kolkata"
-    FOLLOW_UP_CHECK_INTERVAL_MINUTES: int = 60  # Check every hour
+    FOLLOW_UP_CHECK_INTERVAL_MINUTES: int = 60  # Re-check cadence past 80% of SLA, and longest sweep sleep
+    DASHBOARD_RECONCILE_MINUTES: int = 10  # Recompute dashboard counters from the database
+    FOLLOWUP_SWEEP_CONCURRENCY: int = 20  # Follow-ups executed at once during a sweep
+    FOLLOWUP_DEPARTMENT_CONCURRENCY: int = 4  # ...of which at most this many per department
+    FOLLOWUP_ITEM_TIMEOUT_SECONDS: float = 30.0
+    FOLLOWUP_DIGEST_MODE: bool = False  # One follow-up email per department per sweep
+    # Leader election so only one worker runs scheduled jobs: "postgres" (lease
+    # row via RPC, sqlite if the RPCs are not deployed), "sqlite" (single host) or "none"
+    SCHEDULER_LEASE_BACKEND: str = "postgres"
+    SCHEDULER_LEASE_TTL_SECONDS: int = 30  # A standby takes over within this after the leader dies
+    SCHEDULER_LEASE_PATH: str = "scheduler_lease.db"
     
     # AI Model Settings - Using Gemini 2.0 Flash (best for student plan)
     VISION_MODEL_NAME: str = "gemini-2.0-flash-exp"
     REASONING_MODEL_NAME: str = "gemini-2.0-flash-exp"
     AI_TEMPERATURE: float = 0.7
     
+    # Gemini Client Limits (shared by vision and reasoning)
+    LLM_MAX_IN_FLIGHT: int = 4
+    LLM_REQUESTS_PER_MINUTE: float = 60
+    LLM_BURST: int = 5
+    LLM_TIMEOUT_SECONDS: float = 30.0
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_SECONDS: float = 1.0
+    
+    # Vision Result Cache (keyed by image content hash)
+    VISION_CACHE_ENABLED: bool = True
+    VISION_CACHE_TTL_SECONDS: int = 604800  # 7 days
+    VISION_CACHE_MAX_ENTRIES: int = 2048
+    VISION_CACHE_PATH: str = ""  # SQLite file for persistence; empty = memory only
+    VISION_CACHE_NEAR_DUPLICATES: bool = False  # Perceptual-hash matching (requires Pillow)
+    VISION_CACHE_PHASH_MAX_DISTANCE: int = 5
+    
+    # Department Registry (in-memory snapshot of the departments table)
+    DEPARTMENT_CACHE_TTL_SECONDS: int = 300
+    
+    # Geo Search fallback grid index, for local runs without the PostGIS RPCs.
+    # It loads every complaint, so it is off by default and only used when the
+    # RPCs are not deployed
+    GEO_FALLBACK_ENABLED: bool = False
+    GEO_INDEX_TTL_SECONDS: int = 60
+    GEO_GRID_CELL_DEGREES: float = 0.01  # ~1.1 km
+    
+    # Map Marker Clustering (GET /complaints/clusters/{z}/{x}/{y})
+    CLUSTER_GRID_SIZE: int = 8  # Cells per tile side
+    CLUSTER_CACHE_TTL_SECONDS: int = 300
+    CLUSTER_CACHE_MAX_TILES: int = 5000
+    CLUSTER_MAX_POINTS: int = 50000  # Per tile, in-process fallback only
+    
+    # Duplicate Detection (repeat reports are linked to the open original)
+    DEDUP_ENABLED: bool = True  # Requires the duplicate_of / image_phash columns
+    DEDUP_RADIUS_M: float = 50.0
+    DEDUP_WINDOW_DAYS: int = 14
+    DEDUP_MAX_CANDIDATES: int = 20
+    DEDUP_IMAGE_MATCH: bool = False  # Also require perceptual-hash similarity (requires Pillow)
+    DEDUP_PHASH_MAX_DISTANCE: int = 10
+    
+    # Asynchronous Ingestion (POST /complaints/ingest)
+    INGESTION_WORKERS: int = 4
+    INGESTION_JOB_HISTORY: int = 1000
+    INGESTION_QUEUE_SIZE: int = 100  # Accepted but unfinished per worker process; beyond this, 503
+    INGESTION_RESUME_AFTER_SECONDS: int = 600  # "processing" rows untouched this long are run again
+    INGESTION_MAX_ATTEMPTS: int = 3  # Then the complaint is rejected and the citizen asked to resubmit
+    
+    # Email Outbox (SQLite queue drained by a background sender)
+    EMAIL_OUTBOX_PATH: str = "email_outbox.db"
+    EMAIL_SEND_CONCURRENCY: int = 4
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_MAX_ATTEMPTS: int = 6
+    EMAIL_RETRY_BASE_SECONDS: float = 30.0  # Doubles per attempt
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5.0
+    EMAIL_OUTBOX_RETENTION_DAYS: int = 7  # Sent rows kept for inspection
+    EMAIL_CLAIM_TIMEOUT_SECONDS: float = 300.0  # A "sending" row older than this is resent (its sender died)
+    
     # File Upload Settings
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB in bytes
     ALLOWED_IMAGE_TYPES: list = ["image/jpeg", "image/png", "image/jpg", "image/webp"]
     
+    # Image Preprocessing (applied before storage upload and vision analysis)
+    IMAGE_MAX_DIMENSION: int = 1600  # Longest side in pixels
+    IMAGE_JPEG_QUALITY: int = 85
+    IMAGE_REENCODE_THRESHOLD_BYTES: int = 1048576  # Re-encode files larger than 1MB
+    
     # Supabase Storage
     STORAGE_BUCKET: str = "complaint-images"
     
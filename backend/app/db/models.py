@@ -4,7 +4,7 @@ Pydantic models representing database tables and their relationships
 """
 
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 from decimal import Decimal
 
@@ -37,7 +37,7 @@ class Complaint(BaseModel):
     # AI-powered fields
     ai_detected_category: Optional[str] = None
     ai_confidence: Optional[int] = None
-    ai_report: Optional[str] = None
+    ai_report: Optional[Dict[str, Any]] = None
     assigned_department: Optional[str] = None
     official_summary: Optional[str] = None
     
@@ -0,0 +1,314 @@
+"""
+Async Repository Layer
+Non-blocking data access for endpoints and services built on the async PostgREST
+and Storage clients, sharing one pooled HTTP connection set per process
+"""
+
+import asyncio
+import json
+import logging
+from typing import Optional, List, Dict, Any, Callable, Iterable
+
+import httpx
+from postgrest import AsyncPostgrestClient
+from storage3 import AsyncStorageClient
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Max ids per `in.(...)` filter, keeps request URLs well under proxy limits
+IN_FILTER_CHUNK_SIZE = 200
+
+# Per-row requests in flight when a bulk RPC has not been deployed
+FALLBACK_WRITE_CONCURRENCY = 10
+
+# PostgREST / Postgres error codes for "function does not exist"
+MISSING_FUNCTION_CODES = {"PGRST202", "42883"}
+
+
+def is_missing_function(error: Exception) -> bool:
+    """
+    True when an RPC failed because the database function is not deployed
+
+    Any other error (timeouts, network, constraint failures) is not a reason
+    to switch to a slower fallback path.
+    """
+    return getattr(error, "code", None) in MISSING_FUNCTION_CODES
+
+
+async def gather_bounded(coros: Iterable[Any], limit: int = FALLBACK_WRITE_CONCURRENCY) -> List[Any]:
+    """Await coroutines concurrently with at most `limit` in flight"""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+
+def chunked(items: List[Any], size: int = IN_FILTER_CHUNK_SIZE) -> Iterable[List[Any]]:
+    """Split a list into consecutive chunks"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """AsyncPostgrestClient whose httpx session uses explicit connection pool limits"""
+
+    def create_session(self, base_url, headers, timeout) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings.DB_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.DB_POOL_MAX_KEEPALIVE
+            )
+        )
+
+
+class SupabaseRepository:
+    """
+    Async data access for Supabase (PostgREST + Storage)
+
+    Query builders returned by `table()` and `rpc()` must be awaited via
+    `.execute()`, so a slow round trip never blocks the event loop.
+    Clients are created lazily and reused for the life of the process.
+    """
+
+    def __init__(self, supabase_url: str, service_key: str):
+        self.supabase_url = supabase_url.rstrip("/")
+        self.headers = {
+            "apikey": service_key,
+            "Authorization": f"Bearer {service_key}"
+        }
+        self._db: Optional[PooledPostgrestClient] = None
+        self._storage: Optional[AsyncStorageClient] = None
+
+    @property
+    def db(self) -> PooledPostgrestClient:
+        """Shared async PostgREST client"""
+        if self._db is None:
+            self._db = PooledPostgrestClient(
+                f"{self.supabase_url}/rest/v1",
+                headers=self.headers,
+                timeout=settings.DB_REQUEST_TIMEOUT_SECONDS
+            )
+        return self._db
+
+    @property
+    def storage(self) -> AsyncStorageClient:
+        """Shared async Storage client"""
+        if self._storage is None:
+            self._storage = AsyncStorageClient(f"{self.supabase_url}/storage/v1", self.headers)
+        return self._storage
+
+    def table(self, name: str):
+        """Start an async query on a table"""
+        return self.db.from_(name)
+
+    def rpc(self, func: str, params: Optional[Dict[str, Any]] = None):
+        """Call a Postgres function through PostgREST"""
+        return self.db.rpc(func, params or {})
+
+    async def fetch_all(self, build_query: Callable[[], Any], page_size: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Page through a query until exhausted (PostgREST caps rows per response)
+
+        Args:
+            build_query: Zero-arg callable returning a fresh, deterministically ordered query
+            page_size: Rows per request
+        """
+        rows: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            response = await build_query().range(start, start + page_size - 1).execute()
+            rows.extend(response.data)
+            if len(response.data) < page_size:
+                return rows
+            start += page_size
+
+    async def close(self):
+        """Close pooled connections (called on application shutdown)"""
+        if self._db is not None:
+            await self._db.aclose()
+            self._db = None
+        if self._storage is not None:
+            aclose = getattr(self._storage, "aclose", None)
+            if aclose:
+                await aclose()
+            self._storage = None
+
+    # ============= Complaints =============
+
+    async def get_complaint(self, complaint_id: str, columns: str = "*") -> Optional[Dict[str, Any]]:
+        """Fetch a single complaint row, or None if it does not exist"""
+        response = await self.table("complaints").select(columns).eq("id", complaint_id).execute()
+        return response.data[0] if response.data else None
+
+    async def insert_complaint(self, complaint_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Insert a complaint row"""
+        response = await self.table("complaints").insert(complaint_data).execute()
+        return response.data
+
+    async def update_complaint(self, complaint_id: str, values: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Update a complaint row and return the updated rows"""
+        response = await self.table("complaints").update(values).eq("id", complaint_id).execute()
+        return response.data
+
+    async def get_complaints_by_ids(self, complaint_ids: List[str], columns: str = "*") -> List[Dict[str, Any]]:
+        """Fetch many complaints by id using chunked `in` filters"""
+        rows: List[Dict[str, Any]] = []
+        for chunk in chunked(complaint_ids):
+            response = await self.table("complaints").select(columns).in_("id", chunk).execute()
+            rows.extend(response.data)
+        return rows
+
+    async def merge_ai_reports(self, patches: Dict[str, Dict[str, Any]]):
+        """
+        Merge partial AI reports into many complaints' JSONB `ai_report` via the
+        `merge_ai_reports` RPC, one round trip per IN_FILTER_CHUNK_SIZE reports
+        (keys in a patch overwrite stored keys, others are kept). Falls back to
+        reading, merging and rewriting each report only when the function has
+        not been deployed; other errors are raised.
+        """
+        if not patches:
+            return
+        payload = [{"id": complaint_id, "patch": patch} for complaint_id, patch in patches.items()]
+        try:
+            for chunk in chunked(payload):
+                await self.rpc("merge_ai_reports", {"updates": chunk}).execute()
+            return
+        except Exception as e:
+            if not is_missing_function(e):
+                raise
+            logger.warning(f"merge_ai_reports RPC not deployed ({e}), falling back to per-row updates")
+
+        stored = {
+            row["id"]: row.get("ai_report")
+            for row in await self.get_complaints_by_ids(list(patches), "id, ai_report")
+        }
+
+        def merged(complaint_id: str) -> Dict[str, Any]:
+            report = stored.get(complaint_id)
+            if isinstance(report, str):
+                try:
+                    report = json.loads(report)
+                except ValueError:
+                    report = None
+            return {**(report if isinstance(report, dict) else {}), **patches[complaint_id]}
+
+        await gather_bounded(
+            self.update_complaint(complaint_id, {"ai_report": merged(complaint_id)})
+            for complaint_id in patches
+        )
+
+    async def get_duplicates_of(self, complaint_ids: List[str], columns: str = "*") -> List[Dict[str, Any]]:
+        """Fetch complaints linked (via `duplicate_of`) to any of the given originals"""
+        rows: List[Dict[str, Any]] = []
+        for chunk in chunked(complaint_ids):
+            response = await self.table("complaints").select(columns).in_("duplicate_of", chunk).execute()
+            rows.extend(response.data)
+        return rows
+
+    async def bulk_update_complaints(self, complaint_ids: List[str], values: Dict[str, Any]):
+        """Apply the same update to many complaints"""
+        for chunk in chunked(complaint_ids):
+            await self.table("complaints").update(values).in_("id", chunk).execute()
+
+    async def bulk_update_next_checks(self, next_checks: Dict[str, str]):
+        """
+        Write many follow-up due times (`next_check_at`) via the
+        `bulk_update_next_checks` RPC, one round trip per IN_FILTER_CHUNK_SIZE
+        rows, falling back to bounded per-row updates only when the function has
+        not been deployed; other errors are raised
+        """
+        if not next_checks:
+            return
+        payload = [{"id": complaint_id, "next_check_at": at} for complaint_id, at in next_checks.items()]
+        try:
+            for chunk in chunked(payload):
+                await self.rpc("bulk_update_next_checks", {"updates": chunk}).execute()
+        except Exception as e:
+            if not is_missing_function(e):
+                raise
+            logger.warning(f"bulk_update_next_checks RPC not deployed ({e}), falling back to per-row updates")
+            await gather_bounded(
+                self.update_complaint(complaint_id, {"next_check_at": at})
+                for complaint_id, at in next_checks.items()
+            )
+
+    # ============= Complaint Actions =============
+
+    async def insert_actions(self, actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert one or more complaint_actions rows in a single request"""
+        if not actions:
+            return []
+        response = await self.table("complaint_actions").insert(actions).execute()
+        return response.data
+
+    async def list_actions(self, complaint_id: str) -> List[Dict[str, Any]]:
+        """Fetch the timeline for a complaint in chronological order"""
+        response = await self.table("complaint_actions") \
+            .select("*") \
+            .eq("complaint_id", complaint_id) \
+            .order("created_at", desc=False) \
+            .execute()
+        return response.data
+
+    async def count_followups(self, complaint_id: str) -> int:
+        """Count follow-up actions sent for a complaint"""
+        response = await self.table("complaint_actions") \
+            .select("id", count="exact") \
+            .eq("complaint_id", complaint_id) \
+            .eq("action_type", "follow_up") \
+            .execute()
+        return response.count or 0
+
+    async def count_followups_bulk(self, complaint_ids: List[str]) -> Dict[str, int]:
+        """Count follow-up actions for many complaints with chunked bulk queries"""
+        counts: Dict[str, int] = {complaint_id: 0 for complaint_id in complaint_ids}
+        for chunk in chunked(complaint_ids):
+            rows = await self.fetch_all(
+                lambda chunk=chunk: self.table("complaint_actions")
+                    .select("id, complaint_id")
+                    .eq("action_type", "follow_up")
+                    .in_("complaint_id", chunk)
+                    .order("id")
+            )
+            for row in rows:
+                counts[row["complaint_id"]] = counts.get(row["complaint_id"], 0) + 1
+        return counts
+
+    # ============= Departments =============
+
+    async def list_departments(self) -> List[Dict[str, Any]]:
+        """Fetch all departments"""
+        response = await self.table("departments").select("*").execute()
+        return response.data
+
+    async def get_department(self, department_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a single department row"""
+        response = await self.table("departments").select("*").eq("id", department_id).execute()
+        return response.data[0] if response.data else None
+
+    # ============= Storage =============
+
+    async def upload_image(self, path: str, data: bytes, content_type: str) -> str:
+        """Upload an image to the complaint bucket and return its public URL"""
+        bucket = self.storage.from_(settings.STORAGE_BUCKET)
+        await bucket.upload(path=path, file=data, file_options={"content-type": content_type})
+        return await bucket.get_public_url(path)
+
+    async def download_image(self, path: str) -> bytes:
+        """Download an image from the complaint bucket"""
+        return await self.storage.from_(settings.STORAGE_BUCKET).download(path)
+
+
+# Global repository instance
+repository = SupabaseRepository(
+    supabase_url=settings.SUPABASE_URL,
+    service_key=settings.SUPABASE_SERVICE_ROLE_KEY
+)
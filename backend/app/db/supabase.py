@@ -1,6 +1,7 @@
 """
 Supabase Client Initialization
-Provides async Supabase client for database operations
+Provides synchronous Supabase clients for Auth operations.
+Table and storage access from async code goes through app.db.repository.
 """
 
 from supabase import create_client, Client
@@ -12,6 +12,11 @@ from app.core.config import settings
 from app.api.endpoints import complaints, admin, users
 from app.services.scheduler import start_scheduler, stop_scheduler
 from app.services.decision_model import decision_model
+from app.db.repository import repository
+from app.services.complaint_pipeline import ingestion_pool
+from app.services.email_outbox import email_outbox
+from app.services.leader_election import leader_elector
+from app.services.email_service import email_service
 
 # Configure logging
 logging.basicConfig(
@@ -36,15 +41,27 @@ async def lifespan(app: FastAPI):
     
     try:
         # Load or train decision model
-        logger.info("Initializing decision model...")
-        decision_model.load()
-        logger.info("Decision model ready")
+        if settings.LAZY_STARTUP:
+            logger.info("Lazy startup enabled, decision model loads on first use")
+        else:
+            logger.info("Initializing decision model...")
+            decision_model.load()
+            logger.info("Decision model ready")
+        
+        # Compete for the scheduler lease; only the holder runs follow-up jobs
+        leader_elector.start()
         
         # Start scheduler
         logger.info("Starting task scheduler...")
         start_scheduler()
         logger.info("Task scheduler started")
         
+        # Start background ingestion workers
+        ingestion_pool.start()
+        
+        # Start the email outbox sender
+        email_outbox.start(email_service.deliver)
+        
         logger.info("CivicAgent API startup complete")
         
     except Exception as e:
@@ -57,9 +74,21 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down CivicAgent API...")
     
     try:
+        await ingestion_pool.stop()
+        logger.info("Ingestion workers stopped")
+        
+        await email_outbox.stop()
+        logger.info("Email outbox sender stopped")
+        
         stop_scheduler()
         logger.info("Task scheduler stopped")
         
+        # Release the lease so a standby worker takes over right away
+        await leader_elector.stop()
+        
+        await repository.close()
+        logger.info("Database connections closed")
+        
     except Exception as e:
         logger.error(f"Shutdown error: {e}")
     
@@ -4,7 +4,8 @@ Pydantic schemas for complaint-related endpoints
 """
 
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+import json
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 from decimal import Decimal
 
@@ -74,7 +75,7 @@ class ComplaintResponse(BaseModel):
     # AI fields
     ai_detected_category: Optional[str]
     ai_confidence: Optional[int]
-    ai_report: Optional[str]
+    ai_report: Optional[Dict[str, Any]]  # Only the requested keys when `ai_fields` is given
     assigned_department: Optional[str]
     official_summary: Optional[str]
     
@@ -86,13 +87,49 @@ class ComplaintResponse(BaseModel):
     user_rating: Optional[int]
     user_feedback: Optional[str]
     
+    # Set when this report was linked to an existing open complaint
+    duplicate_of: Optional[str] = None
+    
     created_at: datetime
     updated_at: datetime
     
+    @field_validator('ai_report', mode='before')
+    @classmethod
+    def parse_ai_report(cls, v):
+        # Rows written before the JSONB migration hold the report as a JSON string
+        if isinstance(v, str):
+            try:
+                return json.loads(v)
+            except ValueError:
+                return {"text": v}
+        return v
+    
     class Config:
         from_attributes = True
 
 
+# Keys stored in complaints.ai_report that can be requested via `ai_fields`
+AI_REPORT_FIELDS = [
+    "vision_summary", "vision_confidence", "detected_issue",
+    "prediction", "confidence", "explanation_text",
+    "shap_values", "feature_importance", "last_updated"
+]
+
+
+class ComplaintSummary(BaseModel):
+    """Compact complaint row for map markers and table views"""
+    id: str
+    latitude: Decimal
+    longitude: Decimal
+    category: str
+    status: str
+    created_at: datetime
+
+
+# Columns selected for ComplaintSummary (list endpoints with view=summary)
+COMPLAINT_SUMMARY_COLUMNS = "id, latitude, longitude, category, status, created_at"
+
+
 class ComplaintDetailResponse(ComplaintResponse):
     """Schema for detailed complaint with timeline"""
     actions: List[ComplaintActionResponse] = []
@@ -101,9 +138,46 @@ class ComplaintDetailResponse(ComplaintResponse):
 class ComplaintListResponse(BaseModel):
     """Schema for paginated complaint list"""
     complaints: List[ComplaintResponse]
+    total: Optional[int] = None  # None when count=none
+    page: int
+    page_size: int
+    next_cursor: Optional[str] = None  # Pass as `cursor` to fetch the next page
+
+
+class ComplaintGeoResponse(BaseModel):
+    """Schema for complaints inside a map viewport or radius"""
+    complaints: List[ComplaintSummary]
+    count: int
+    truncated: bool  # True when more complaints matched than `limit`
+
+
+class MarkerCluster(BaseModel):
+    """Aggregated complaints in one grid cell of a map tile"""
+    latitude: float  # Centroid
+    longitude: float
+    count: int
+    by_status: Dict[str, int]
+    by_category: Dict[str, int]
+    complaint_id: Optional[str] = None  # Set when the cluster is a single complaint
+
+
+class ClusterTileResponse(BaseModel):
+    """Schema for marker clusters of one map tile"""
+    z: int
+    x: int
+    y: int
+    clusters: List[MarkerCluster]
     total: int
+    truncated: bool = False  # Counts cover only the newest CLUSTER_MAX_POINTS complaints
+
+
+class ComplaintSummaryListResponse(BaseModel):
+    """Schema for paginated complaint list with view=summary"""
+    complaints: List[ComplaintSummary]
+    total: Optional[int] = None
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 
 class AIExplanationResponse(BaseModel):
@@ -135,3 +209,32 @@ class ComplaintCreateResponse(BaseModel):
     message: str
     complaint_id: str
     complaint: ComplaintResponse
+
+
+class ComplaintIngestResponse(BaseModel):
+    """Schema for a complaint accepted for asynchronous processing"""
+    success: bool
+    message: str
+    complaint_id: str
+    status: str
+    status_url: str
+
+
+class IngestionStageResponse(BaseModel):
+    """Schema for one pipeline stage of an ingestion job"""
+    name: str
+    status: str
+    started_at: datetime
+    duration_ms: Optional[float] = None
+
+
+class IngestionStatusResponse(BaseModel):
+    """Schema for ingestion job progress"""
+    complaint_id: str
+    status: str
+    error: Optional[str] = None
+    duplicate_of: Optional[str] = None
+    accepted_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    total_ms: Optional[float] = None
+    stages: List[IngestionStageResponse] = []
@@ -5,11 +5,16 @@ Core agentic state machine logic for autonomous complaint management
 
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import asyncio
-from app.db.supabase import supabase_client
+from app.core.config import settings
+from app.db.repository import repository
 from app.db.models import DecisionFeatures
 from app.services.decision_model import decision_model
+from app.services.department_registry import department_registry
+from app.services.dashboard_stats import dashboard_counters
+from app.services.clustering import tile_cluster_cache
+from app.services.geo_search import geo_search
 from app.services.email_service import email_service
 
 logger = logging.getLogger(__name__)
@@ -25,6 +30,172 @@ STATUS_SCORES = {
 }
 
 
+class WorkflowWriteBatch:
+    """
+    Collects workflow writes (timeline actions, escalations) so a sweep over
+    many complaints can flush them in a few bulk requests instead of one per row.
+    In digest mode it also groups follow-ups by department into one email each.
+    """
+    
+    def __init__(self):
+        self.actions: List[Dict[str, Any]] = []
+        self.escalated_ids: List[str] = []
+        self.escalated: List[Dict[str, Any]] = []
+        self.digests: Dict[str, Dict[str, Any]] = {}
+    
+    def add_followup(self, dept: Dict[str, Any], complaint: Dict[str, Any], days_pending: int):
+        digest = self.digests.setdefault(str(dept["id"]), {"dept": dept, "items": []})
+        digest["items"].append({
+            "complaint_id": complaint["id"],
+            "category": complaint["category"],
+            "days_pending": days_pending,
+            "due_at": complaint.get("next_check_at")
+        })
+    
+    def escalate(self, complaint: Dict[str, Any]):
+        self.escalated_ids.append(complaint["id"])
+        self.escalated.append(complaint)
+    
+    def add_action(
+        self,
+        complaint_id: str,
+        action_type: str,
+        description: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.actions.append({
+            "complaint_id": complaint_id,
+            "action_type": action_type,
+            "description": description,
+            "metadata": metadata or {}
+        })
+    
+    async def send_digests(self):
+        """Send one follow-up digest per department and buffer an action per complaint"""
+        for digest in self.digests.values():
+            dept, items = digest["dept"], digest["items"]
+            success = await email_service.send_follow_up_digest(
+                department_email=dept["contact_email"],
+                department_name=dept["name"],
+                complaints=items
+            )
+            if not success:
+                logger.warning(f"Follow-up digest to {dept['name']} ({len(items)} complaints) not queued (already queued or outbox error)")
+                continue
+            for item in items:
+                self.add_action(
+                    complaint_id=item["complaint_id"],
+                    action_type="follow_up",
+                    description=f"Follow-up digest sent to {dept['name']} (Day {item['days_pending']})",
+                    metadata={"days_pending": item["days_pending"], "digest_size": len(items)}
+                )
+            logger.info(f"Follow-up digest sent to {dept['name']} covering {len(items)} complaints")
+        self.digests = {}
+    
+    async def flush(self):
+        """Send pending digests, then write all buffered rows"""
+        await self.send_digests()
+        if self.escalated_ids:
+            await repository.bulk_update_complaints(self.escalated_ids, {
+                "status": "escalated",
+                "updated_at": datetime.utcnow().isoformat()
+            })
+            for complaint in self.escalated:
+                record_status_change(complaint, "escalated")
+            await propagate_status_to_duplicates(self.escalated_ids, "escalated")
+        await repository.insert_actions(self.actions)
+        logger.info(f"Flushed {len(self.actions)} actions and {len(self.escalated_ids)} escalations")
+        self.actions = []
+        self.escalated_ids = []
+        self.escalated = []
+
+
+def record_status_change(complaint: Dict[str, Any], new_status: str):
+    """
+    Update in-process views derived from complaint status (dashboard
+    counters, map cluster tiles, geo fallback index) after a status write
+    
+    Args:
+        complaint: Complaint row as it was before the change
+        new_status: Status that was written
+    """
+    dashboard_counters.record_transition(
+        complaint.get("status"),
+        new_status,
+        created_at=complaint.get("created_at"),
+        sla_hours=complaint.get("sla_hours")
+    )
+    tile_cluster_cache.invalidate_location(complaint.get("latitude"), complaint.get("longitude"))
+    geo_search.invalidate()
+
+
+async def propagate_status_to_duplicates(original_ids: List[str], new_status: str):
+    """
+    Copy a status change of original complaints to the repeat reports linked
+    to them, so every reporter sees the same progress
+    
+    Duplicates are not followed up on their own, so without this they would
+    stay "submitted" forever.
+    
+    Args:
+        original_ids: Complaints whose status changed
+        new_status: Status that was written
+    """
+    if not original_ids or not settings.DEDUP_ENABLED:
+        return
+    try:
+        duplicates = [
+            d for d in await repository.get_duplicates_of(
+                original_ids, "id, duplicate_of, status, created_at, sla_hours, latitude, longitude"
+            )
+            if d["status"] != new_status
+        ]
+        if not duplicates:
+            return
+        
+        await repository.bulk_update_complaints([d["id"] for d in duplicates], {
+            "status": new_status,
+            "updated_at": datetime.utcnow().isoformat()
+        })
+        for duplicate in duplicates:
+            record_status_change(duplicate, new_status)
+        await repository.insert_actions([
+            {
+                "complaint_id": d["id"],
+                "action_type": "status_change",
+                "description": f"Status changed to '{new_status}' with original complaint {d['duplicate_of']}",
+                "metadata": {"old_status": d["status"], "new_status": new_status, "original_id": d["duplicate_of"]}
+            }
+            for d in duplicates
+        ])
+        logger.info(f"Propagated status '{new_status}' to {len(duplicates)} linked duplicates")
+    except Exception as e:
+        logger.error(f"Failed to propagate status to duplicates: {e}")
+
+
+def ai_report_patch(shap_explanation: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keys of a complaint's stored AI report refreshed by a new SHAP explanation
+    
+    The patch is merged into the stored report server-side
+    (see repository.merge_ai_reports), so the report is never read back first.
+    
+    Args:
+        shap_explanation: Output of DecisionModel.explain_prediction
+        
+    Returns:
+        Partial report dictionary
+    """
+    return {
+        "shap_values": shap_explanation["shap_values"],
+        "feature_importance": shap_explanation["feature_importance"],
+        "prediction": shap_explanation["action"],
+        "confidence": shap_explanation["confidence"],
+        "explanation_text": shap_explanation["explanation_text"],
+        "last_updated": datetime.utcnow().isoformat()
+    }
+
+
 async def log_complaint_action(
     complaint_id: str,
     action_type: str,
@@ -41,12 +212,12 @@ async def log_complaint_action(
         metadata: Optional additional data
     """
     try:
-        supabase_client.table("complaint_actions").insert({
+        await repository.insert_actions([{
             "complaint_id": complaint_id,
             "action_type": action_type,
             "description": description,
             "metadata": metadata or {}
-        }).execute()
+        }])
         
         logger.info(f"Logged action '{action_type}' for complaint {complaint_id}")
     except Exception as e:
@@ -56,36 +227,21 @@ async def log_complaint_action(
 async def get_complaint_by_id(complaint_id: str) -> Optional[Dict[str, Any]]:
     """Fetch a complaint by ID"""
     try:
-        response = supabase_client.table("complaints").select("*").eq("id", complaint_id).execute()
-        if response.data:
-            return response.data[0]
-        return None
+        return await repository.get_complaint(complaint_id)
     except Exception as e:
         logger.error(f"Failed to fetch complaint {complaint_id}: {e}")
         return None
 
 
 async def get_department_by_id(department_id: str) -> Optional[Dict[str, Any]]:
-    """Fetch department details"""
-    try:
-        response = supabase_client.table("departments").select("*").eq("id", department_id).execute()
-        if response.data:
-            return response.data[0]
-        return None
-    except Exception as e:
-        logger.error(f"Failed to fetch department {department_id}: {e}")
-        return None
+    """Fetch department details from the department registry"""
+    return await department_registry.get(department_id)
 
 
 async def count_complaint_followups(complaint_id: str) -> int:
     """Count number of follow-up actions sent"""
     try:
-        response = supabase_client.table("complaint_actions") \
-            .select("id", count="exact") \
-            .eq("complaint_id", complaint_id) \
-            .eq("action_type", "follow_up") \
-            .execute()
-        return response.count or 0
+        return await repository.count_followups(complaint_id)
     except Exception as e:
         logger.error(f"Failed to count follow-ups: {e}")
         return 0
@@ -142,38 +298,13 @@ async def process_complaint_followup(complaint_id: str):
         )
         
         # Get AI decision with SHAP explanation
-        action, confidence = decision_model.predict_action(features)
         shap_explanation = decision_model.explain_prediction(features)
+        action, confidence = shap_explanation["action"], shap_explanation["confidence"]
         
         logger.info(f"Decision for {complaint_id}: {action} (confidence: {confidence:.2f})")
         
-        # Update complaint with latest AI analysis
-        import json
-        existing_report = complaint.get("ai_report")
-        
-        # Parse existing report or create new one
-        if existing_report:
-            try:
-                ai_report_data = json.loads(existing_report) if isinstance(existing_report, str) else existing_report
-            except:
-                ai_report_data = {}
-        else:
-            ai_report_data = {}
-        
-        # Update with latest SHAP data
-        ai_report_data.update({
-            "shap_values": shap_explanation["shap_values"],
-            "feature_importance": shap_explanation["feature_importance"],
-            "prediction": shap_explanation["action"],
-            "confidence": shap_explanation["confidence"],
-            "explanation_text": shap_explanation["explanation_text"],
-            "last_updated": datetime.utcnow().isoformat()
-        })
-        
-        # Write back to database
-        supabase_client.table("complaints").update({
-            "ai_report": json.dumps(ai_report_data)
-        }).eq("id", complaint_id).execute()
+        # Merge latest AI analysis into the stored report
+        await repository.merge_ai_reports({complaint_id: ai_report_patch(shap_explanation)})
         
         # Execute the recommended action
         if action == "escalate":
@@ -185,20 +316,43 @@ async def process_complaint_followup(complaint_id: str):
         logger.error(f"Error processing follow-up for {complaint_id}: {e}")
 
 
-async def execute_followup(complaint: Dict[str, Any], features: DecisionFeatures):
-    """Send a follow-up email to the department"""
+async def execute_followup(
+    complaint: Dict[str, Any],
+    features: DecisionFeatures,
+    dept: Optional[Dict[str, Any]] = None,
+    batch: Optional[WorkflowWriteBatch] = None
+) -> bool:
+    """
+    Send a follow-up email to the department
+    
+    Args:
+        complaint: Complaint row
+        features: Decision features computed for the complaint
+        dept: Prefetched department row (looked up when omitted)
+        batch: Optional write batch; when given, DB writes are buffered for bulk flush
+            (and, with FOLLOWUP_DIGEST_MODE, the email joins the department digest)
+    
+    Returns:
+        True if the follow-up was queued (or added to the digest)
+    """
     try:
         complaint_id = complaint["id"]
         department_id = complaint.get("assigned_department")
         
         if not department_id:
             logger.warning(f"No department assigned to complaint {complaint_id}")
-            return
+            return False
         
-        dept = await get_department_by_id(department_id)
+        if dept is None:
+            dept = await get_department_by_id(department_id)
         if not dept:
             logger.error(f"Department {department_id} not found")
-            return
+            return False
+        
+        if batch is not None and settings.FOLLOWUP_DIGEST_MODE:
+            # Sent with the department's other follow-ups when the batch is flushed
+            batch.add_followup(dept, complaint, int(features.days_since_submission))
+            return True
         
         # Send follow-up email
         success = await email_service.send_follow_up_email(
@@ -206,40 +360,64 @@ async def execute_followup(complaint: Dict[str, Any], features: DecisionFeatures
             department_name=dept["name"],
             complaint_id=complaint_id,
             category=complaint["category"],
-            days_pending=int(features.days_since_submission)
+            days_pending=int(features.days_since_submission),
+            due_at=complaint.get("next_check_at")
         )
         
         if success:
             # Log the action
-            await log_complaint_action(
+            action = dict(
                 complaint_id=complaint_id,
                 action_type="follow_up",
                 description=f"Follow-up email sent to {dept['name']} (Day {int(features.days_since_submission)})",
                 metadata={"days_pending": int(features.days_since_submission)}
             )
+            if batch is not None:
+                batch.add_action(**action)
+            else:
+                await log_complaint_action(**action)
             
             logger.info(f"Follow-up sent for complaint {complaint_id}")
         else:
-            logger.error(f"Failed to send follow-up for complaint {complaint_id}")
+            logger.warning(f"Follow-up for complaint {complaint_id} not queued (already queued or outbox error)")
+        return success
             
     except Exception as e:
         logger.error(f"Error executing follow-up: {e}")
+        return False
 
 
-async def execute_escalation(complaint: Dict[str, Any], features: DecisionFeatures):
-    """Escalate a complaint to supervisory level"""
+async def execute_escalation(
+    complaint: Dict[str, Any],
+    features: DecisionFeatures,
+    dept: Optional[Dict[str, Any]] = None,
+    batch: Optional[WorkflowWriteBatch] = None
+) -> bool:
+    """
+    Escalate a complaint to supervisory level
+    
+    Args:
+        complaint: Complaint row
+        features: Decision features computed for the complaint
+        dept: Prefetched department row (looked up when omitted)
+        batch: Optional write batch; when given, DB writes are buffered for bulk flush
+    
+    Returns:
+        True if the escalation email was queued and the escalation recorded
+    """
     try:
         complaint_id = complaint["id"]
         department_id = complaint.get("assigned_department")
         
         if not department_id:
             logger.warning(f"No department assigned to complaint {complaint_id}")
-            return
+            return False
         
-        dept = await get_department_by_id(department_id)
+        if dept is None:
+            dept = await get_department_by_id(department_id)
         if not dept:
             logger.error(f"Department {department_id} not found")
-            return
+            return False
         
         escalation_email = dept.get("escalation_email") or dept.get("contact_email")
         
@@ -257,30 +435,41 @@ async def execute_escalation(complaint: Dict[str, Any], features: DecisionFeatur
             department_name=dept["name"],
             complaint_id=complaint_id,
             category=complaint["category"],
-            reason=reason
+            reason=reason,
+            due_at=complaint.get("next_check_at")
         )
         
         if success:
-            # Update complaint status
-            supabase_client.table("complaints").update({
-                "status": "escalated",
-                "updated_at": datetime.utcnow().isoformat()
-            }).eq("id", complaint_id).execute()
-            
-            # Log the action
-            await log_complaint_action(
+            action = dict(
                 complaint_id=complaint_id,
                 action_type="escalated",
                 description=f"Complaint escalated to supervisor. Reason: {reason}",
                 metadata={"reason": reason, "escalation_email": escalation_email}
             )
             
+            if batch is not None:
+                batch.escalate(complaint)
+                batch.add_action(**action)
+            else:
+                # Update complaint status
+                await repository.update_complaint(complaint_id, {
+                    "status": "escalated",
+                    "updated_at": datetime.utcnow().isoformat()
+                })
+                record_status_change(complaint, "escalated")
+                await propagate_status_to_duplicates([complaint_id], "escalated")
+                
+                # Log the action
+                await log_complaint_action(**action)
+            
             logger.info(f"Complaint {complaint_id} escalated successfully")
         else:
-            logger.error(f"Failed to send escalation email for {complaint_id}")
+            logger.warning(f"Escalation email for {complaint_id} not queued (already queued or outbox error)")
+        return success
             
     except Exception as e:
         logger.error(f"Error executing escalation: {e}")
+        return False
 
 
 async def initialize_complaint_workflow(
@@ -0,0 +1,207 @@
+"""
+Marker Clustering Service
+Aggregates complaints into grid clusters per web-map tile (z/x/y) with counts
+by status and category, computed by the `complaint_clusters` RPC or in process,
+and cached per tile until a complaint in that tile is created or changes status
+"""
+
+import logging
+import math
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional, Dict, Any, List, Tuple
+
+from app.core.config import settings
+from app.db.repository import repository, is_missing_function
+from app.services.geo_search import geo_search
+
+logger = logging.getLogger(__name__)
+
+MAX_ZOOM = 22
+
+# (z, x, y, status_filter)
+TileKey = Tuple[int, int, int, Optional[str]]
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lng, max_lat, max_lng) of a web-mercator tile"""
+    n = 2 ** z
+
+    def lat(tile_y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0
+
+
+def tile_for_point(lat: float, lng: float, z: int) -> Tuple[int, int]:
+    """Tile (x, y) containing a point at zoom z"""
+    n = 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def cluster_rows(
+    rows: List[Dict[str, Any]],
+    bounds: Tuple[float, float, float, float],
+    grid_size: int
+) -> List[Dict[str, Any]]:
+    """
+    Group complaint rows into a grid_size x grid_size grid over the tile
+
+    Returns:
+        One cluster per non-empty cell with centroid, count, per-status and
+        per-category counts, and the complaint id when the cell holds one complaint
+    """
+    min_lat, min_lng, max_lat, max_lng = bounds
+    lat_span = (max_lat - min_lat) or 1e-12
+    lng_span = (max_lng - min_lng) or 1e-12
+
+    cells: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    for row in rows:
+        lat, lng = float(row["latitude"]), float(row["longitude"])
+        cx = min(grid_size - 1, max(0, int((lng - min_lng) / lng_span * grid_size)))
+        cy = min(grid_size - 1, max(0, int((lat - min_lat) / lat_span * grid_size)))
+        cell = cells.get((cx, cy))
+        if cell is None:
+            cell = cells[(cx, cy)] = {
+                "lat_sum": 0.0, "lng_sum": 0.0, "count": 0,
+                "by_status": defaultdict(int), "by_category": defaultdict(int), "id": str(row["id"])
+            }
+        cell["lat_sum"] += lat
+        cell["lng_sum"] += lng
+        cell["count"] += 1
+        cell["by_status"][row.get("status") or "unknown"] += 1
+        cell["by_category"][row.get("category") or "Other"] += 1
+
+    return [
+        {
+            "latitude": cell["lat_sum"] / cell["count"],
+            "longitude": cell["lng_sum"] / cell["count"],
+            "count": cell["count"],
+            "by_status": dict(cell["by_status"]),
+            "by_category": dict(cell["by_category"]),
+            "complaint_id": cell["id"] if cell["count"] == 1 else None
+        }
+        for cell in cells.values()
+    ]
+
+
+class TileClusterCache:
+    """
+    LRU + TTL cache of cluster lists per tile
+
+    Invalidation is per process: a status change made by another worker (for
+    example an escalation by the scheduler leader) is only reflected here
+    once the tile's CLUSTER_CACHE_TTL_SECONDS expires.
+    """
+
+    def __init__(self, ttl_seconds: int, max_tiles: int, grid_size: int, max_points: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_tiles = max_tiles
+        self.grid_size = grid_size
+        self.max_points = max_points
+        self.tiles: "OrderedDict[TileKey, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_clusters(self, z: int, x: int, y: int, status_filter: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Clusters for a tile, computed on a cache miss
+
+        Returns:
+            {"clusters": [...], "truncated": bool}; truncated is True when the
+            in-process fallback hit CLUSTER_MAX_POINTS and counts are partial
+        """
+        key = (z, x, y, status_filter)
+        entry = self.tiles.get(key)
+        if entry and entry["expires_at"] > time.time():
+            self.tiles.move_to_end(key)
+            self.hits += 1
+            return entry["tile"]
+
+        self.misses += 1
+        tile = await self._compute(tile_bounds(z, x, y), status_filter)
+        self.tiles[key] = {"tile": tile, "expires_at": time.time() + self.ttl_seconds}
+        self.tiles.move_to_end(key)
+        while len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+        return tile
+
+    def invalidate_location(self, latitude: Any = None, longitude: Any = None):
+        """
+        Drop cached tiles containing a point (every zoom level and status filter)
+
+        Clears the whole cache when the location is unknown.
+        """
+        try:
+            lat, lng = float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            self.invalidations += len(self.tiles)
+            self.tiles.clear()
+            return
+
+        point_tiles: Dict[int, Tuple[int, int]] = {}
+        for key in list(self.tiles):
+            z = key[0]
+            if z not in point_tiles:
+                point_tiles[z] = tile_for_point(lat, lng, z)
+            if (key[1], key[2]) == point_tiles[z]:
+                del self.tiles[key]
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "tiles": len(self.tiles),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+    async def _compute(self, bounds: Tuple[float, float, float, float], status_filter: Optional[str]) -> Dict[str, Any]:
+        min_lat, min_lng, max_lat, max_lng = bounds
+        try:
+            response = await repository.rpc("complaint_clusters", {
+                "min_lat": min_lat, "min_lng": min_lng, "max_lat": max_lat, "max_lng": max_lng,
+                "grid_size": self.grid_size, "status_filter": status_filter
+            }).execute()
+            clusters = [
+                {
+                    "latitude": r["latitude"],
+                    "longitude": r["longitude"],
+                    "count": r["count"],
+                    "by_status": r["by_status"] or {},
+                    "by_category": r["by_category"] or {},
+                    "complaint_id": r.get("complaint_id")
+                }
+                for r in response.data
+            ]
+            return {"clusters": clusters, "truncated": False}
+        except Exception as e:
+            if not is_missing_function(e):
+                raise
+            logger.warning(f"complaint_clusters RPC not deployed, clustering in process: {e}")
+
+        # Only the newest max_points rows are clustered here
+        rows = await geo_search.in_bbox(
+            min_lat, min_lng, max_lat, max_lng,
+            status_filter=status_filter,
+            limit=self.max_points
+        )
+        return {
+            "clusters": cluster_rows(rows, bounds, self.grid_size),
+            "truncated": len(rows) >= self.max_points
+        }
+
+
+# Global tile cache instance
+tile_cluster_cache = TileClusterCache(
+    ttl_seconds=settings.CLUSTER_CACHE_TTL_SECONDS,
+    max_tiles=settings.CLUSTER_CACHE_MAX_TILES,
+    grid_size=settings.CLUSTER_GRID_SIZE,
+    max_points=settings.CLUSTER_MAX_POINTS
+)
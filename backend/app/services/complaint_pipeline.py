@@ -0,0 +1,636 @@
+"""
+Complaint Ingestion Pipeline
+Stage-by-stage processing of a new complaint (upload, AI analysis, persistence,
+notification) with per-stage timing, runnable inline or on a background worker pool.
+Complaints accepted for background processing are stored as "processing" rows
+first, so they survive a restart and are resumed by any worker
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.db.models import DecisionFeatures
+from app.db.repository import repository
+from app.services.image_processing import preprocess_image
+from app.services.vision_model import analyze_image_for_civic_issue
+from app.services.gen_ai import reason_about_complaint
+from app.services.agent_workflow import initialize_complaint_workflow, log_complaint_action
+from app.services.scheduler import schedule_complaint_followup
+from app.services.decision_model import decision_model
+from app.services.dashboard_stats import dashboard_counters
+from app.services.clustering import tile_cluster_cache
+from app.services.geo_search import geo_search
+from app.services.deduplication import find_duplicate
+from app.services.vision_cache import perceptual_hash
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {"image/jpeg": "jpg", "image/jpg": "jpg", "image/png": "png", "image/webp": "webp"}
+CONTENT_TYPES = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+# Status of a complaint accepted via POST /complaints/ingest until its pipeline completes
+PROCESSING_STATUS = "processing"
+RESUME_COLUMNS = "id, user_id, category, description, landmark, latitude, longitude, image_url, ai_report, created_at, updated_at"
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the ingestion workers already hold INGESTION_QUEUE_SIZE complaints"""
+
+
+class ComplaintSubmission(BaseModel):
+    """Raw complaint as received from the citizen"""
+    complaint_id: str
+    user_id: str
+    category: str
+    description: str
+    latitude: float
+    longitude: float
+    landmark: Optional[str] = None
+    image_bytes: bytes
+    image_filename: Optional[str] = None
+    image_content_type: Optional[str] = None
+
+
+class PipelineRun:
+    """Progress and timing of one complaint moving through the pipeline"""
+
+    def __init__(self, complaint_id: str, user_id: str):
+        self.complaint_id = complaint_id
+        self.user_id = user_id
+        self.status = "processing"
+        self.error: Optional[str] = None
+        self.duplicate_of: Optional[str] = None
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.accepted_at = datetime.utcnow()
+        self.completed_at: Optional[datetime] = None
+        self._start = time.perf_counter()
+        self.total_ms: Optional[float] = None
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        """Record status and duration of a stage"""
+        record = {"name": name, "status": "running", "started_at": datetime.utcnow(), "duration_ms": None}
+        self.stages[name] = record
+        start = time.perf_counter()
+        try:
+            yield
+            record["status"] = "completed"
+        except Exception:
+            record["status"] = "failed"
+            raise
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    def finish(self, error: Optional[str] = None):
+        self.status = "failed" if error else "completed"
+        self.error = error
+        self.completed_at = datetime.utcnow()
+        self.total_ms = round((time.perf_counter() - self._start) * 1000, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "complaint_id": self.complaint_id,
+            "status": self.status,
+            "error": self.error,
+            "duplicate_of": self.duplicate_of,
+            "accepted_at": self.accepted_at,
+            "completed_at": self.completed_at,
+            "total_ms": self.total_ms,
+            "stages": list(self.stages.values())
+        }
+
+
+def image_storage_path(user_id: str, complaint_id: str, file_extension: str) -> str:
+    """Storage object path of a complaint photo"""
+    return f"{user_id}/{complaint_id}.{file_extension}"
+
+
+async def store_complaint(complaint_data: Dict[str, Any], accepted: bool) -> List[Dict[str, Any]]:
+    """
+    Write a processed complaint: insert it, or complete the "processing" row
+    written by accept_complaint
+    """
+    if accepted:
+        values = {k: v for k, v in complaint_data.items() if k not in ("id", "user_id")}
+        stored = await repository.update_complaint(complaint_data["id"], values)
+        dashboard_counters.record_transition(PROCESSING_STATUS, complaint_data["status"])
+    else:
+        stored = await repository.insert_complaint(complaint_data)
+        dashboard_counters.record_created(complaint_data["status"])
+    tile_cluster_cache.invalidate_location(float(complaint_data["latitude"]), float(complaint_data["longitude"]))
+    geo_search.invalidate()
+    return stored
+
+
+async def accept_complaint(run: "PipelineRun", submission: ComplaintSubmission) -> str:
+    """
+    Preprocess and store the photo, then insert the complaint as a
+    "processing" row, so an accepted complaint is not lost if the process
+    stops before a worker finishes it
+
+    The submission's image is replaced with the preprocessed one.
+
+    Returns:
+        Public URL of the stored image
+    """
+    async with run.stage("preprocess"):
+        image_bytes, content_type = await asyncio.to_thread(
+            preprocess_image,
+            submission.image_bytes,
+            submission.image_content_type or "image/jpeg"
+        )
+    submission.image_bytes = image_bytes
+    submission.image_content_type = content_type
+
+    image_url = await upload_complaint_image(run, submission, image_bytes, content_type)
+
+    async with run.stage("accept"):
+        await repository.insert_complaint({
+            "id": submission.complaint_id,
+            "user_id": submission.user_id,
+            "category": submission.category,
+            "description": submission.description,
+            "landmark": submission.landmark,
+            "latitude": str(submission.latitude),
+            "longitude": str(submission.longitude),
+            "image_url": image_url,
+            "status": PROCESSING_STATUS,
+            "ai_report": {"ingestion_attempts": 1}
+        })
+        dashboard_counters.record_created(PROCESSING_STATUS)
+        tile_cluster_cache.invalidate_location(submission.latitude, submission.longitude)
+        geo_search.invalidate()
+    return image_url
+
+
+async def upload_complaint_image(
+    run: PipelineRun,
+    submission: ComplaintSubmission,
+    image_bytes: bytes,
+    content_type: str
+) -> str:
+    """Upload the complaint photo to Supabase Storage and return its public URL"""
+    async with run.stage("upload"):
+        file_extension = IMAGE_EXTENSIONS.get(content_type)
+        if not file_extension:
+            file_extension = submission.image_filename.split(".")[-1] if submission.image_filename else "jpg"
+        storage_path = image_storage_path(submission.user_id, submission.complaint_id, file_extension)
+        url = await repository.upload_image(
+            path=storage_path,
+            data=image_bytes,
+            content_type=content_type
+        )
+        logger.info(f"Image uploaded successfully: {url}")
+        return url
+
+
+async def link_duplicate_complaint(
+    run: PipelineRun,
+    submission: ComplaintSubmission,
+    original: Dict[str, Any],
+    image_bytes: bytes,
+    content_type: str,
+    image_phash: Optional[int],
+    image_url: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Store a repeat report linked to the original complaint
+
+    The AI analysis, department assignment and SLA are reused from the
+    original; no Gemini calls, emails or follow-up timers are triggered.
+    `image_url` is set when accept_complaint already stored the photo and row.
+    """
+    accepted = image_url is not None
+    if not accepted:
+        image_url = await upload_complaint_image(run, submission, image_bytes, content_type)
+
+    async with run.stage("persist"):
+        complaint_data = {
+            "id": submission.complaint_id,
+            "user_id": submission.user_id,
+            "category": submission.category,
+            "description": submission.description,
+            "landmark": submission.landmark,
+            "latitude": str(submission.latitude),
+            "longitude": str(submission.longitude),
+            "image_url": image_url,
+            "status": "submitted",
+            "duplicate_of": original["id"],
+            "ai_detected_category": original.get("ai_detected_category"),
+            "ai_confidence": original.get("ai_confidence"),
+            "ai_report": original.get("ai_report"),
+            "assigned_department": original.get("assigned_department"),
+            "official_summary": original.get("official_summary"),
+            "sla_hours": original.get("sla_hours"),
+            "sla_deadline": original.get("sla_deadline")
+        }
+        if image_phash is not None:
+            complaint_data["image_phash"] = format(image_phash, "016x")
+
+        inserted = await store_complaint(complaint_data, accepted)
+
+        await repository.insert_actions([
+            {
+                "complaint_id": submission.complaint_id,
+                "action_type": "submitted",
+                "description": f"Complaint submitted by user and linked to existing complaint {original['id']}",
+                "metadata": {"duplicate_of": original["id"]}
+            },
+            {
+                "complaint_id": original["id"],
+                "action_type": "duplicate_reported",
+                "description": "Another citizen reported the same issue",
+                "metadata": {"duplicate_id": submission.complaint_id}
+            }
+        ])
+
+    run.duplicate_of = original["id"]
+    run.finish()
+    logger.info(f"Complaint {submission.complaint_id} linked to {original['id']} in {run.total_ms:.0f} ms")
+    return inserted[0] if inserted else complaint_data
+
+
+async def run_complaint_pipeline(
+    run: PipelineRun,
+    submission: ComplaintSubmission,
+    image_url: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Process a complaint end to end
+
+    When `image_url` is given, accept_complaint has already preprocessed and
+    stored the photo and inserted a "processing" row: preprocess and upload
+    are skipped and persist completes that row.
+
+    Stages:
+    1. preprocess      - downsize / re-encode large photos
+       dedup           - link to an open complaint of the same category nearby
+                         (skips every stage below except upload and persist)
+    2. upload / vision - store the image in Supabase Storage while the same
+                         in-memory bytes go to AI vision analysis, concurrently
+    3. reasoning       - AI reasoning (department, summary, SLA)
+    4. explanation     - initial SHAP explanation
+    5. persist         - insert (or complete) complaint row and "submitted" action
+    6. notify / schedule - department email and follow-up timer, run concurrently
+
+    Returns:
+        The stored complaint row
+    """
+    complaint_id = submission.complaint_id
+    accepted = image_url is not None
+
+    try:
+        if accepted:
+            image_bytes, content_type = submission.image_bytes, submission.image_content_type or "image/jpeg"
+        else:
+            async with run.stage("preprocess"):
+                image_bytes, content_type = await asyncio.to_thread(
+                    preprocess_image,
+                    submission.image_bytes,
+                    submission.image_content_type or "image/jpeg"
+                )
+
+        image_phash = None
+        if settings.DEDUP_ENABLED:
+            async with run.stage("dedup"):
+                if settings.DEDUP_IMAGE_MATCH:
+                    image_phash = await asyncio.to_thread(perceptual_hash, image_bytes)
+                original = await find_duplicate(
+                    submission.latitude,
+                    submission.longitude,
+                    submission.category,
+                    image_phash
+                )
+            if original:
+                return await link_duplicate_complaint(
+                    run, submission, original, image_bytes, content_type, image_phash, image_url
+                )
+
+        async def vision():
+            async with run.stage("vision"):
+                return await analyze_image_for_civic_issue(image_bytes, mime_type=content_type)
+
+        if accepted:
+            vision_result = await vision()
+        else:
+            # Storage upload and vision analysis both only need the image bytes
+            image_url, vision_result = await asyncio.gather(
+                upload_complaint_image(run, submission, image_bytes, content_type),
+                vision()
+            )
+
+        async with run.stage("reasoning"):
+            reasoning_result = await reason_about_complaint(
+                vision_result=vision_result,
+                user_description=submission.description,
+                latitude=submission.latitude,
+                longitude=submission.longitude
+            )
+
+        async with run.stage("explanation"):
+            initial_features = DecisionFeatures(
+                time_since_sla_breach=-reasoning_result.sla_hours,  # Negative = before breach
+                category_priority=reasoning_result.priority_level,
+                number_of_followups=0,
+                days_since_submission=0.0,
+                status_score=1  # Just submitted
+            )
+            shap_explanation = decision_model.explain_prediction(initial_features)
+
+        async with run.stage("persist"):
+            sla_deadline = datetime.utcnow() + timedelta(hours=reasoning_result.sla_hours)
+
+            # Comprehensive AI report with vision + SHAP data
+            ai_report_data = {
+                "vision_summary": vision_result.summary,
+                "vision_confidence": vision_result.confidence,
+                "detected_issue": vision_result.issue,
+                "shap_values": shap_explanation["shap_values"],
+                "feature_importance": shap_explanation["feature_importance"],
+                "prediction": shap_explanation["action"],
+                "confidence": shap_explanation["confidence"],
+                "explanation_text": shap_explanation["explanation_text"]
+            }
+
+            complaint_data = {
+                "id": complaint_id,
+                "user_id": submission.user_id,
+                "category": submission.category,
+                "description": submission.description,
+                "landmark": submission.landmark,
+                "latitude": str(submission.latitude),
+                "longitude": str(submission.longitude),
+                "image_url": image_url,
+                "status": "submitted",
+                "ai_detected_category": vision_result.issue,
+                "ai_confidence": int(vision_result.confidence * 100),
+                "ai_report": ai_report_data,
+                "assigned_department": reasoning_result.department_id,
+                "official_summary": reasoning_result.official_summary,
+                "sla_hours": reasoning_result.sla_hours,
+                "sla_deadline": sla_deadline.isoformat()
+            }
+            if image_phash is not None:
+                complaint_data["image_phash"] = format(image_phash, "016x")
+
+            inserted = await store_complaint(complaint_data, accepted)
+
+            await log_complaint_action(
+                complaint_id=complaint_id,
+                action_type="submitted",
+                description=f"Complaint submitted by user. AI detected: {vision_result.issue} (confidence: {int(vision_result.confidence * 100)}%)",
+                metadata={
+                    "ai_category": vision_result.issue,
+                    "ai_confidence": vision_result.confidence,
+                    "assigned_department": reasoning_result.department_name,
+                    "initial_prediction": shap_explanation["action"],
+                    "ml_confidence": shap_explanation["confidence"]
+                }
+            )
+
+        # Notification email and follow-up scheduling are independent
+        async def notify():
+            async with run.stage("notify"):
+                location_text = submission.landmark if submission.landmark else f"({submission.latitude}, {submission.longitude})"
+                await initialize_complaint_workflow(
+                    complaint_id=complaint_id,
+                    department_id=reasoning_result.department_id,
+                    category=submission.category,
+                    summary=reasoning_result.official_summary,
+                    location_text=location_text,
+                    image_url=image_url
+                )
+
+        async def schedule():
+            async with run.stage("schedule"):
+                await schedule_complaint_followup(complaint_id, reasoning_result.sla_hours)
+
+        await asyncio.gather(notify(), schedule())
+
+        run.finish()
+        logger.info(f"Complaint {complaint_id} processed in {run.total_ms:.0f} ms")
+        return inserted[0] if inserted else complaint_data
+
+    except Exception as e:
+        run.finish(error=str(e))
+        logger.error(f"Pipeline failed for complaint {complaint_id}: {e}")
+        raise
+
+
+class IngestionWorkerPool:
+    """
+    Background workers that drain accepted complaints through the pipeline
+
+    At most `max_queued` complaints are accepted but unfinished per process;
+    beyond that `accept` raises IngestionQueueFull. Accepted complaints are
+    stored as "processing" rows before being queued. Rows still "processing"
+    `resume_after_seconds` after their last claim (the accepting process
+    stopped or the run failed) are claimed by whichever worker checks first
+    and run again, up to `max_attempts` runs.
+
+    Runs are kept in a bounded in-memory registry so their status can be
+    polled; only the process that ran a complaint knows its stage timings.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        history_size: int,
+        max_queued: int,
+        resume_after_seconds: int,
+        max_attempts: int
+    ):
+        self.workers = workers
+        self.history_size = history_size
+        self.max_queued = max_queued
+        self.resume_after_seconds = resume_after_seconds
+        self.max_attempts = max_attempts
+        self.runs: "OrderedDict[str, PipelineRun]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._reserved = 0  # Accepted or resumed complaints not yet finished
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        """Start worker tasks and the resume loop on the running event loop"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._resume_loop(), name="ingestion-resume"))
+        logger.info(f"Started {self.workers} ingestion workers")
+
+    async def stop(self):
+        """Cancel workers; unfinished complaints stay "processing" and are resumed later"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._reserved = 0
+
+    @property
+    def is_full(self) -> bool:
+        return self._queue is None or self._reserved >= self.max_queued
+
+    async def accept(self, submission: ComplaintSubmission) -> PipelineRun:
+        """
+        Store a complaint as "processing" and queue it for background processing
+
+        Raises:
+            IngestionQueueFull: The workers are at capacity; nothing was stored
+        """
+        if self._queue is None:
+            raise RuntimeError("Ingestion worker pool is not running")
+        if self.is_full:
+            raise IngestionQueueFull(f"{self._reserved} complaints already queued")
+        self._reserved += 1
+        run = self._track(PipelineRun(submission.complaint_id, submission.user_id))
+        try:
+            image_url = await accept_complaint(run, submission)
+        except Exception as e:
+            self._reserved -= 1
+            run.finish(error=str(e))
+            raise
+        # The reservation guarantees a free slot
+        self._queue.put_nowait((run, submission, image_url))
+        return run
+
+    def get_run(self, complaint_id: str) -> Optional[PipelineRun]:
+        return self.runs.get(complaint_id)
+
+    def _track(self, run: PipelineRun) -> PipelineRun:
+        self.runs[run.complaint_id] = run
+        while len(self.runs) > self.history_size:
+            self.runs.popitem(last=False)
+        return run
+
+    async def _worker(self, index: int):
+        while True:
+            run, submission, image_url = await self._queue.get()
+            try:
+                await run_complaint_pipeline(run, submission, image_url)
+            except Exception:
+                pass  # Failure is recorded on the run; the row is resumed later
+            finally:
+                self._reserved -= 1
+                self._queue.task_done()
+
+    async def _resume_loop(self):
+        while True:
+            try:
+                resumed = await self.resume_stale()
+                if resumed:
+                    logger.info(f"Resumed {resumed} unfinished complaints")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to resume unfinished complaints: {e}")
+            await asyncio.sleep(max(1, self.resume_after_seconds / 2))
+
+    async def resume_stale(self) -> int:
+        """
+        Claim and queue "processing" complaints whose last claim is older than
+        resume_after_seconds, as far as free capacity allows
+
+        Returns:
+            Number of complaints queued
+        """
+        free = self.max_queued - self._reserved
+        if free <= 0:
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.resume_after_seconds)
+        response = await repository.table("complaints") \
+            .select(RESUME_COLUMNS) \
+            .eq("status", PROCESSING_STATUS) \
+            .lt("updated_at", cutoff.isoformat()) \
+            .order("updated_at") \
+            .limit(free) \
+            .execute()
+
+        resumed = 0
+        for row in response.data:
+            if self.is_full:
+                break
+            report = row.get("ai_report") if isinstance(row.get("ai_report"), dict) else {}
+            attempts = int(report.get("ingestion_attempts") or 1)
+            if attempts >= self.max_attempts:
+                await self._give_up(row, attempts)
+                continue
+
+            # Conditional on the row's last claim so only one worker resumes it
+            claimed = await repository.table("complaints") \
+                .update({"ai_report": {"ingestion_attempts": attempts + 1}}) \
+                .eq("id", row["id"]) \
+                .eq("status", PROCESSING_STATUS) \
+                .eq("updated_at", row["updated_at"]) \
+                .execute()
+            if not claimed.data:
+                continue
+
+            self._reserved += 1
+            try:
+                submission = await self._load_submission(row)
+            except Exception as e:
+                self._reserved -= 1
+                logger.error(f"Cannot resume complaint {row['id']}, image unavailable: {e}")
+                continue
+            run = self._track(PipelineRun(submission.complaint_id, submission.user_id))
+            self._queue.put_nowait((run, submission, row["image_url"]))
+            resumed += 1
+        return resumed
+
+    async def _load_submission(self, row: Dict[str, Any]) -> ComplaintSubmission:
+        file_extension = row["image_url"].rsplit(".", 1)[-1].lower()
+        image_bytes = await repository.download_image(
+            image_storage_path(row["user_id"], row["id"], file_extension)
+        )
+        return ComplaintSubmission(
+            complaint_id=row["id"],
+            user_id=row["user_id"],
+            category=row["category"],
+            description=row["description"],
+            latitude=float(row["latitude"]),
+            longitude=float(row["longitude"]),
+            landmark=row.get("landmark"),
+            image_bytes=image_bytes,
+            image_content_type=CONTENT_TYPES.get(file_extension, "image/jpeg")
+        )
+
+    async def _give_up(self, row: Dict[str, Any], attempts: int):
+        """Reject a complaint whose processing keeps failing, telling the citizen to resubmit"""
+        updated = await repository.table("complaints") \
+            .update({"status": "rejected", "ai_report": {"ingestion_attempts": attempts, "ingestion_failed": True}}) \
+            .eq("id", row["id"]) \
+            .eq("status", PROCESSING_STATUS) \
+            .execute()
+        if not updated.data:
+            return
+        dashboard_counters.record_transition(PROCESSING_STATUS, "rejected", created_at=row.get("created_at"))
+        await log_complaint_action(
+            complaint_id=row["id"],
+            action_type="rejected",
+            description=f"Automatic processing failed after {attempts} attempts. Please submit the complaint again.",
+            metadata={"ingestion_attempts": attempts}
+        )
+        logger.error(f"Gave up on complaint {row['id']} after {attempts} processing attempts")
+
+
+# Global worker pool instance
+ingestion_pool = IngestionWorkerPool(
+    workers=settings.INGESTION_WORKERS,
+    history_size=settings.INGESTION_JOB_HISTORY,
+    max_queued=settings.INGESTION_QUEUE_SIZE,
+    resume_after_seconds=settings.INGESTION_RESUME_AFTER_SECONDS,
+    max_attempts=settings.INGESTION_MAX_ATTEMPTS
+)
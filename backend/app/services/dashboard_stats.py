@@ -0,0 +1,246 @@
+"""
+Dashboard Statistics Service
+Admin dashboard counts and performance metrics, computed by the
+`get_dashboard_stats` RPC (with a NumPy fallback over a single columnar pull
+when it is not deployed) and kept current in process by incrementally
+maintained counters
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Union
+
+import numpy as np
+
+from app.db.repository import repository, is_missing_function
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ["submitted", "in_progress", "escalated", "resolved", "rejected"]
+CLOSED_STATUSES = {"resolved", "rejected"}
+STATS_COLUMNS = "id, status, created_at, updated_at, sla_hours"
+
+
+def timestamps_to_epoch(values: List[Optional[str]]) -> np.ndarray:
+    """
+    Convert ISO-8601 timestamps to epoch seconds as a float array
+
+    PostgREST returns timestamptz in UTC, so the common "+00:00"/"Z" suffix is
+    stripped and the strings are parsed by NumPy in one pass; any other
+    offset falls back to datetime parsing. Missing values become NaN.
+    """
+    normalized = []
+    for value in values:
+        if not value:
+            normalized.append("NaT")
+        elif value.endswith("+00:00"):
+            normalized.append(value[:-6])
+        elif value.endswith("Z"):
+            normalized.append(value[:-1])
+        else:
+            normalized.append(datetime.fromisoformat(value).timestamp())
+
+    if all(isinstance(v, str) for v in normalized):
+        parsed = np.array(normalized, dtype="datetime64[us]")
+        epoch = parsed.astype("int64").astype(float) / 1e6
+        epoch[np.isnat(parsed)] = np.nan
+        return epoch
+
+    return np.array([
+        v if isinstance(v, float)
+        else np.nan if v == "NaT"
+        else np.datetime64(v, "us").astype("int64") / 1e6
+        for v in normalized
+    ], dtype=float)
+
+
+def compute_stats_from_rows(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compute dashboard statistics from complaint rows with NumPy
+
+    Matches the RPC: average resolution time over resolved complaints, and
+    SLA compliance as the share of closed (resolved or rejected) complaints
+    closed within their SLA.
+    """
+    status_values = np.array([r.get("status") for r in rows], dtype=object)
+    stats: Dict[str, Any] = {"total_complaints": len(rows)}
+    for status_name in STATUSES:
+        stats[status_name] = int(np.count_nonzero(status_values == status_name))
+
+    closed = np.isin(status_values, ["resolved", "rejected"])
+    closed_rows = [r for r, is_closed in zip(rows, closed) if is_closed]
+
+    stats["avg_resolution_time_hours"] = None
+    stats["sla_compliance_rate"] = None
+    if not closed_rows:
+        return stats
+
+    created = timestamps_to_epoch([r.get("created_at") for r in closed_rows])
+    updated = timestamps_to_epoch([r.get("updated_at") for r in closed_rows])
+    sla_hours = np.array([r.get("sla_hours") or 0 for r in closed_rows], dtype=float)
+    hours = (updated - created) / 3600
+    resolved = status_values[closed] == "resolved"
+
+    if resolved.any():
+        stats["avg_resolution_time_hours"] = float(np.nanmean(hours[resolved]))
+
+    compliant = (sla_hours > 0) & (hours <= sla_hours)
+    stats["sla_compliance_rate"] = float(np.count_nonzero(compliant) / len(closed_rows) * 100)
+    return stats
+
+
+async def get_dashboard_stats() -> Dict[str, Any]:
+    """
+    Dashboard statistics in one round trip via the RPC
+
+    The full-table fallback runs only when the function has not been
+    deployed; other RPC errors (timeouts, 5xx) are raised so callers keep
+    their cached counters instead of scanning every complaint.
+
+    Returns:
+        Dict matching DashboardStatsResponse fields
+    """
+    try:
+        response = await repository.rpc("get_dashboard_stats").execute()
+        if response.data:
+            return response.data[0] if isinstance(response.data, list) else response.data
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        logger.warning(f"get_dashboard_stats RPC not deployed, computing in process: {e}")
+
+    rows = await repository.fetch_all(
+        lambda: repository.table("complaints").select(STATS_COLUMNS).order("id")
+    )
+    return compute_stats_from_rows(rows)
+
+
+class DashboardCounters:
+    """
+    Materialized dashboard statistics updated on every status change
+
+    Holds per-status counts, the sum of resolution hours and the number of
+    closed complaints closed within SLA, so reads are O(1). Writes in other
+    processes and reopened complaints (whose original close time is unknown)
+    are not tracked exactly; `reconcile()` reloads the true values and runs
+    periodically to correct drift.
+    """
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {s: 0 for s in STATUSES}
+        self.total = 0
+        self.resolution_hours_sum = 0.0
+        self.sla_compliant = 0.0
+        self.loaded_at: Optional[datetime] = None
+        self.updates = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    async def reconcile(self) -> Dict[str, Any]:
+        """Reload counters from the database"""
+        async with self._lock:
+            stats = await get_dashboard_stats()
+            self.counts = {s: int(stats.get(s) or 0) for s in STATUSES}
+            self.total = int(stats.get("total_complaints") or 0)
+            resolved = self.counts["resolved"]
+            closed = resolved + self.counts["rejected"]
+            self.resolution_hours_sum = (stats.get("avg_resolution_time_hours") or 0.0) * resolved
+            self.sla_compliant = (stats.get("sla_compliance_rate") or 0.0) * closed / 100
+            self.loaded_at = datetime.now(timezone.utc)
+            self.updates = 0
+            return self.snapshot()
+
+    async def get(self) -> Dict[str, Any]:
+        """Current statistics, loading them on first use"""
+        if not self.is_loaded:
+            return await self.reconcile()
+        return self.snapshot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Statistics in DashboardStatsResponse shape"""
+        resolved = self.counts["resolved"]
+        closed = resolved + self.counts["rejected"]
+        return {
+            "total_complaints": self.total,
+            **self.counts,
+            "avg_resolution_time_hours": self.resolution_hours_sum / resolved if resolved > 0 else None,
+            "sla_compliance_rate": self.sla_compliant / closed * 100 if closed > 0 else None
+        }
+
+    def record_created(self, status: str = "submitted"):
+        """Count a newly inserted complaint"""
+        if not self.is_loaded:
+            return
+        self.total += 1
+        if status in self.counts:
+            self.counts[status] += 1
+        self.updates += 1
+
+    def record_transition(
+        self,
+        old_status: Optional[str],
+        new_status: str,
+        created_at: Union[str, datetime, None] = None,
+        sla_hours: Optional[float] = None,
+        changed_at: Optional[datetime] = None
+    ):
+        """
+        Apply a status change
+
+        Args:
+            old_status: Status before the change
+            new_status: Status after the change
+            created_at: Complaint creation time (needed to account a close)
+            sla_hours: Complaint SLA in hours
+            changed_at: Time of the change (defaults to now)
+        """
+        if not self.is_loaded or old_status == new_status:
+            return
+
+        resolved = self.counts["resolved"]
+        closed = resolved + self.counts["rejected"]
+
+        # Reopening: the original close time is unknown, remove an average share
+        if old_status == "resolved" and resolved > 0:
+            self.resolution_hours_sum -= self.resolution_hours_sum / resolved
+        if old_status in CLOSED_STATUSES and closed > 0:
+            self.sla_compliant -= self.sla_compliant / closed
+
+        if old_status in self.counts:
+            self.counts[old_status] = max(0, self.counts[old_status] - 1)
+        if new_status in self.counts:
+            self.counts[new_status] += 1
+
+        if new_status in CLOSED_STATUSES:
+            hours = None
+            if created_at:
+                if isinstance(created_at, str):
+                    created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+                if created_at.tzinfo is None:
+                    created_at = created_at.replace(tzinfo=timezone.utc)
+                changed_at = changed_at or datetime.now(timezone.utc)
+                hours = (changed_at - created_at).total_seconds() / 3600
+
+            if new_status == "resolved":
+                if hours is not None:
+                    self.resolution_hours_sum += hours
+                elif resolved > 0:
+                    self.resolution_hours_sum += self.resolution_hours_sum / resolved
+            if hours is not None and sla_hours and hours <= sla_hours:
+                self.sla_compliant += 1
+
+        self.updates += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded_at": self.loaded_at,
+            "updates_since_reconcile": self.updates
+        }
+
+
+# Global counters instance
+dashboard_counters = DashboardCounters()
@@ -4,22 +4,42 @@ Scikit-learn based decision model with SHAP explainability for escalation decisi
 """
 
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import StandardScaler
-import shap
-import joblib
 import logging
+import threading
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, List, Optional, Union, Sequence
 from app.db.models import DecisionFeatures
 
 logger = logging.getLogger(__name__)
 
+# Accepted inputs for batch inference: one or many DecisionFeatures, or an (N x 5) matrix
+FeatureInput = Union[DecisionFeatures, Sequence[DecisionFeatures], np.ndarray]
+
 # Model persistence paths
 MODEL_DIR = Path(__file__).parent.parent.parent / "models"
 MODEL_PATH = MODEL_DIR / "decision_model.pkl"
 SCALER_PATH = MODEL_DIR / "scaler.pkl"
+BACKGROUND_PATH = MODEL_DIR / "shap_background.pkl"
+
+
+class LinearShapExplainer:
+    """
+    Closed-form SHAP explainer for a linear model in log-odds space
+    
+    For a linear model with independent (interventional) features the SHAP
+    value of feature j is exactly coef_j * (x_j - E[x_j]) over the background
+    data, which is what shap.LinearExplainer computes. Only the background
+    mean is needed, so explanations are deterministic and need no `shap` import.
+    """
+    
+    def __init__(self, model, background_mean: np.ndarray):
+        self.coef = np.asarray(model.coef_, dtype=float).reshape(-1)
+        self.background_mean = np.asarray(background_mean, dtype=float).reshape(-1)
+        self.expected_value = float(model.intercept_[0] + self.coef @ self.background_mean)
+    
+    def shap_values(self, X_scaled: np.ndarray) -> np.ndarray:
+        """SHAP values (N x n_features) for already-scaled rows"""
+        return (np.asarray(X_scaled, dtype=float) - self.background_mean) * self.coef
 
 
 class DecisionModel:
@@ -40,34 +60,50 @@ class DecisionModel:
             "status_score"
         ]
         
+    @staticmethod
+    def generate_training_data() -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Generate the deterministic synthetic training set
+        
+        Returns:
+            Tuple of (X, y) with X shaped (500 x 5)
+        """
+        np.random.seed(42)
+        n_samples = 500
+        
+        # Features
+        time_breach = np.random.uniform(-24, 120, n_samples)  # Hours before/after SLA
+        priority = np.random.randint(1, 11, n_samples)  # 1-10
+        followups = np.random.randint(0, 5, n_samples)  # Number of follow-ups
+        days_since = np.random.uniform(0, 30, n_samples)  # Days since submission
+        status_score = np.random.choice([1, 2, 3, 4], n_samples)  # Status encoding
+        
+        X = np.column_stack([time_breach, priority, followups, days_since, status_score])
+        
+        # Labels: Escalate if SLA breached significantly OR high priority with multiple follow-ups
+        y = np.where(
+            (time_breach > 24) | ((priority >= 8) & (followups >= 2)) | (days_since > 14),
+            1,  # Escalate
+            0   # Follow-up
+        ).astype(int)
+        
+        return X, y
+    
     def train(self):
         """
         Train the decision model on synthetic data
         Action classes: 0 = send_follow_up, 1 = escalate
         """
+        import joblib
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import StandardScaler
+        
         try:
             # Create MODEL_DIR if it doesn't exist
             MODEL_DIR.mkdir(parents=True, exist_ok=True)
             
             # Generate synthetic training data
-            np.random.seed(42)
-            n_samples = 500
-            
-            # Features
-            time_breach = np.random.uniform(-24, 120, n_samples)  # Hours before/after SLA
-            priority = np.random.randint(1, 11, n_samples)  # 1-10
-            followups = np.random.randint(0, 5, n_samples)  # Number of follow-ups
-            days_since = np.random.uniform(0, 30, n_samples)  # Days since submission
-            status_score = np.random.choice([1, 2, 3, 4], n_samples)  # Status encoding
-            
-            X = np.column_stack([time_breach, priority, followups, days_since, status_score])
-            
-            # Labels: Escalate if SLA breached significantly OR high priority with multiple follow-ups
-            y = np.where(
-                (time_breach > 24) | ((priority >= 8) & (followups >= 2)) | (days_since > 14),
-                1,  # Escalate
-                0   # Follow-up
-            ).astype(int)
+            X, y = self.generate_training_data()
             
             # Train scaler
             self.scaler = StandardScaler()
@@ -77,12 +113,14 @@ class DecisionModel:
             self.model = LogisticRegression(random_state=42, max_iter=1000)
             self.model.fit(X_scaled, y)
             
-            # Initialize SHAP explainer
-            self.explainer = shap.LinearExplainer(self.model, X_scaled)
+            # Initialize SHAP explainer from the training background
+            background_mean = X_scaled.mean(axis=0)
+            self.explainer = LinearShapExplainer(self.model, background_mean)
             
             # Save models
             joblib.dump(self.model, MODEL_PATH)
             joblib.dump(self.scaler, SCALER_PATH)
+            joblib.dump(background_mean, BACKGROUND_PATH)
             
             logger.info(f"Decision model trained successfully. Accuracy: {self.model.score(X_scaled, y):.2f}")
             
@@ -92,10 +130,22 @@ class DecisionModel:
     
     def load(self):
         """Load pre-trained model and scaler"""
+        import joblib
+        
         try:
             if MODEL_PATH.exists() and SCALER_PATH.exists():
                 self.model = joblib.load(MODEL_PATH)
                 self.scaler = joblib.load(SCALER_PATH)
+                
+                if BACKGROUND_PATH.exists():
+                    background_mean = joblib.load(BACKGROUND_PATH)
+                else:
+                    # Older model directories predate the stored background; the
+                    # scaler was fit on the training data, so its mean is zero in scaled space
+                    background_mean = np.zeros(len(self.feature_names))
+                    joblib.dump(background_mean, BACKGROUND_PATH)
+                self.explainer = LinearShapExplainer(self.model, background_mean)
+                
                 logger.info("Decision model loaded successfully")
             else:
                 logger.warning("Model files not found. Training new model...")
@@ -105,38 +155,96 @@ class DecisionModel:
             logger.info("Training new model...")
             self.train()
     
-    def predict_action(self, features: DecisionFeatures) -> Tuple[str, float]:
+    def features_to_matrix(self, features: FeatureInput) -> np.ndarray:
         """
-        Predict the recommended action for a complaint
+        Convert features to an (N x 5) float matrix in `feature_names` order
         
         Args:
-            features: DecisionFeatures object with complaint metrics
+            features: A DecisionFeatures, a sequence of DecisionFeatures, or an
+                      array-like already shaped (N x 5) / (5,); empty input
+                      gives a (0 x 5) matrix
+        """
+        if isinstance(features, DecisionFeatures):
+            features = [features]
+        if not isinstance(features, np.ndarray) and len(features) == 0:
+            return np.empty((0, len(self.feature_names)), dtype=float)
+        if not isinstance(features, np.ndarray) and isinstance(features[0], DecisionFeatures):
+            return np.array(
+                [[getattr(f, name) for name in self.feature_names] for f in features],
+                dtype=float
+            )
+        X = np.asarray(features, dtype=float)
+        if X.size == 0:
+            return np.empty((0, len(self.feature_names)), dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} feature columns, got {X.shape[1]}")
+        return X
+    
+    def predict_batch(self, features: FeatureInput) -> Tuple[List[str], np.ndarray]:
+        """
+        Predict recommended actions for many complaints in one scaler/model pass
+        
+        Args:
+            features: (N x 5) matrix or list of DecisionFeatures
             
         Returns:
-            Tuple of (action, confidence) where action is "follow_up" or "escalate"
+            Tuple of (actions, confidences) with one entry per row
         """
         if self.model is None:
             self.load()
         
-        # Prepare feature vector
-        X = np.array([[
-            features.time_since_sla_breach,
-            features.category_priority,
-            features.number_of_followups,
-            features.days_since_submission,
-            features.status_score
-        ]])
+        X = self.features_to_matrix(features)
+        if len(X) == 0:
+            return [], np.empty(0)
         
-        # Scale features
         X_scaled = self.scaler.transform(X)
+        return self._predict_scaled(X_scaled)
+    
+    def explain_batch(self, features: FeatureInput) -> Dict[str, Any]:
+        """
+        Predict and compute SHAP values for many complaints in one
+        scaler, model and explainer pass
+        
+        Args:
+            features: (N x 5) matrix or list of DecisionFeatures
+            
+        Returns:
+            Dictionary with "actions" (list), "confidences" (N,) and
+            "shap_values" (N x 5, escalate class, columns in `feature_names` order)
+        """
+        self._ensure_explainer()
         
-        # Predict
-        prediction = self.model.predict(X_scaled)[0]
-        confidence = np.max(self.model.predict_proba(X_scaled)[0])
+        X = self.features_to_matrix(features)
+        if len(X) == 0:
+            return {
+                "actions": [],
+                "confidences": np.empty(0),
+                "shap_values": np.empty((0, len(self.feature_names)))
+            }
         
-        action = "escalate" if prediction == 1 else "follow_up"
+        X_scaled = self.scaler.transform(X)
+        actions, confidences = self._predict_scaled(X_scaled)
         
-        return action, confidence
+        return {
+            "actions": actions,
+            "confidences": confidences,
+            "shap_values": self.explainer.shap_values(X_scaled)
+        }
+    
+    def predict_action(self, features: DecisionFeatures) -> Tuple[str, float]:
+        """
+        Predict the recommended action for a complaint
+        
+        Args:
+            features: DecisionFeatures object with complaint metrics
+            
+        Returns:
+            Tuple of (action, confidence) where action is "follow_up" or "escalate"
+        """
+        actions, confidences = self.predict_batch(features)
+        return actions[0], float(confidences[0])
     
     def explain_prediction(self, features: DecisionFeatures) -> Dict[str, Any]:
         """
@@ -148,40 +256,29 @@ class DecisionModel:
         Returns:
             Dictionary with SHAP values and explanation
         """
-        if self.model is None or self.explainer is None:
-            self.load()
-            # Re-initialize explainer if needed
-            if self.explainer is None:
-                dummy_data = np.random.randn(100, 5)
-                X_scaled = self.scaler.transform(dummy_data)
-                self.explainer = shap.LinearExplainer(self.model, X_scaled)
-        
-        # Prepare features
-        X = np.array([[
-            features.time_since_sla_breach,
-            features.category_priority,
-            features.number_of_followups,
-            features.days_since_submission,
-            features.status_score
-        ]])
-        
-        X_scaled = self.scaler.transform(X)
-        
-        # Get prediction
-        action, confidence = self.predict_action(features)
-        
-        # Calculate SHAP values
-        shap_values = self.explainer.shap_values(X_scaled)
+        batch = self.explain_batch(features)
+        return self.format_explanation(batch, 0, features)
+    
+    def format_explanation(
+        self,
+        batch: Dict[str, Any],
+        row: int,
+        features: Optional[DecisionFeatures] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the per-complaint explanation dictionary for one row of an
+        `explain_batch` result
         
-        # Handle different SHAP value formats
-        if isinstance(shap_values, list):
-            shap_values_class = shap_values[1][0]  # For escalate class
-        else:
-            shap_values_class = shap_values[0]
+        Args:
+            batch: Output of explain_batch
+            row: Row index within the batch
+            features: Features for that row (used for the explanation text)
+        """
+        action = batch["actions"][row]
         
         # Build explanation
         shap_dict = {
-            name: float(value) for name, value in zip(self.feature_names, shap_values_class)
+            name: float(value) for name, value in zip(self.feature_names, batch["shap_values"][row])
         }
         
         # Feature importance (absolute SHAP values)
@@ -189,24 +286,40 @@ class DecisionModel:
             name: abs(value) for name, value in shap_dict.items()
         }
         
-        # Sort by importance
-        sorted_features = sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)
-        
-        # Generate explanation text
-        top_feature = sorted_features[0][0]
+        # Generate explanation text from the most important feature
+        top_feature = max(feature_importance, key=feature_importance.get)
         explanation_text = self._generate_explanation_text(action, features, top_feature)
         
         return {
             "action": action,
-            "confidence": float(confidence),
+            "confidence": float(batch["confidences"][row]),
             "shap_values": shap_dict,
             "feature_importance": feature_importance,
             "explanation_text": explanation_text
         }
     
-    def _generate_explanation_text(self, action: str, features: DecisionFeatures, top_feature: str) -> str:
+    def _predict_scaled(self, X_scaled: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        """Actions and confidences for already-scaled rows"""
+        proba = self.model.predict_proba(X_scaled)
+        predictions = self.model.classes_[np.argmax(proba, axis=1)]
+        actions = ["escalate" if p == 1 else "follow_up" for p in predictions]
+        return actions, proba.max(axis=1)
+    
+    def _ensure_explainer(self):
+        """Load the model and make sure a SHAP explainer is available"""
+        if self.model is None or self.explainer is None:
+            self.load()
+    
+    def _generate_explanation_text(
+        self,
+        action: str,
+        features: Optional[DecisionFeatures],
+        top_feature: str
+    ) -> str:
         """Generate human-readable explanation"""
         if action == "escalate":
+            if features is None:
+                return "Escalation recommended based on overall complaint metrics."
             if top_feature == "time_since_sla_breach":
                 return f"Escalation recommended because the SLA has been breached by {features.time_since_sla_breach:.1f} hours."
             elif top_feature == "category_priority":
@@ -219,5 +332,36 @@ class DecisionModel:
             return "Follow-up email recommended. Issue is within SLA parameters and escalation not yet warranted."
 
 
+class LazyDecisionModel:
+    """
+    Proxy that creates and loads the DecisionModel on first use
+    
+    Attribute access is forwarded to the real model, so callers use it exactly
+    like a DecisionModel. Loading (joblib, scikit-learn unpickling) happens either
+    at startup via `load()` or on the first prediction when LAZY_STARTUP is set.
+    """
+    
+    def __init__(self):
+        self._model: Optional[DecisionModel] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+    
+    def load(self) -> DecisionModel:
+        """Create and load the underlying model if not done yet"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    model = DecisionModel()
+                    model.load()
+                    self._model = model
+        return self._model
+    
+    def __getattr__(self, name: str):
+        return getattr(self.load(), name)
+
+
 # Global model instance
-decision_model = DecisionModel()
+decision_model = LazyDecisionModel()
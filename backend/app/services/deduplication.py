@@ -0,0 +1,87 @@
+"""
+Duplicate Complaint Detection
+Finds an open complaint of the same category near a new submission so repeat
+reports can be linked to it instead of going through AI analysis and email again
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any
+
+from app.core.config import settings
+from app.db.repository import repository
+from app.services.geo_search import geo_search, haversine_m
+from app.services.vision_cache import hamming_distance
+
+logger = logging.getLogger(__name__)
+
+CLOSED_STATUSES = {"resolved", "rejected"}
+# Accepted complaints still being analysed have nothing to reuse (and include the submission itself)
+UNLINKABLE_STATUSES = CLOSED_STATUSES | {"processing"}
+
+
+async def find_duplicate(
+    latitude: float,
+    longitude: float,
+    category: str,
+    image_phash: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Find the original complaint a new submission duplicates
+
+    A match is an open, non-duplicate complaint of the same category within
+    DEDUP_RADIUS_M metres submitted in the last DEDUP_WINDOW_DAYS days. When
+    both sides have a perceptual hash, the images must also be within
+    DEDUP_PHASH_MAX_DISTANCE bits.
+
+    Args:
+        latitude: Submission latitude
+        longitude: Submission longitude
+        category: Submission category
+        image_phash: Perceptual hash of the submitted image, if computed
+
+    Returns:
+        The nearest matching complaint row, or None (also when the radius
+        search fails, so a submission is never rejected because of dedup)
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.DEDUP_WINDOW_DAYS)
+    try:
+        # Filtered in the query, so DEDUP_MAX_CANDIDATES counts only plausible originals
+        nearby = await geo_search.in_radius(
+            latitude,
+            longitude,
+            settings.DEDUP_RADIUS_M,
+            limit=settings.DEDUP_MAX_CANDIDATES,
+            category=category,
+            exclude_statuses=UNLINKABLE_STATUSES,
+            created_after=cutoff
+        )
+    except Exception as e:
+        logger.warning(f"Duplicate check skipped, radius search failed: {e}")
+        return None
+
+    candidate_ids = [str(r["id"]) for r in nearby]
+    if not candidate_ids:
+        return None
+
+    candidates = [
+        c for c in await repository.get_complaints_by_ids(candidate_ids)
+        if not c.get("duplicate_of")
+    ]
+
+    if image_phash is not None:
+        candidates = [
+            c for c in candidates
+            if not c.get("image_phash")
+            or hamming_distance(image_phash, int(c["image_phash"], 16)) <= settings.DEDUP_PHASH_MAX_DISTANCE
+        ]
+
+    if not candidates:
+        return None
+
+    original = min(
+        candidates,
+        key=lambda c: haversine_m(latitude, longitude, float(c["latitude"]), float(c["longitude"]))
+    )
+    logger.info(f"Submission matches open complaint {original['id']} ({category})")
+    return original
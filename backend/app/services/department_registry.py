@@ -0,0 +1,99 @@
+"""
+Department Registry
+In-memory snapshot of the departments table indexed by id and by name,
+refreshed on a TTL and invalidated explicitly when departments change
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, Any, List
+
+from app.core.config import settings
+from app.db.repository import repository
+
+logger = logging.getLogger(__name__)
+
+
+class DepartmentRegistry:
+    """
+    Cached view of the departments table
+
+    The table has a handful of rows that rarely change, so every reader
+    shares one snapshot instead of querying per complaint. A failed refresh
+    keeps serving the previous snapshot.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.departments: List[Dict[str, Any]] = []
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        self.loaded_at: Optional[float] = None
+        self.hits = 0
+        self.refreshes = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= self.ttl_seconds
+
+    async def all(self) -> List[Dict[str, Any]]:
+        """All departments"""
+        await self._ensure_fresh()
+        return self.departments
+
+    async def get(self, department_id: Any) -> Optional[Dict[str, Any]]:
+        """Department by id, or None"""
+        await self._ensure_fresh()
+        return self.by_id.get(str(department_id))
+
+    async def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """Department by name (case-insensitive), or None"""
+        await self._ensure_fresh()
+        return self.by_name.get(name.strip().lower())
+
+    async def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Id -> department map for bulk lookups"""
+        await self._ensure_fresh()
+        return self.by_id
+
+    def invalidate(self):
+        """Force the next read to reload from the database"""
+        self.loaded_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "departments": len(self.departments),
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+            "age_seconds": None if self.loaded_at is None else round(time.monotonic() - self.loaded_at, 1)
+        }
+
+    async def _ensure_fresh(self):
+        if not self.is_stale:
+            self.hits += 1
+            return
+        async with self._lock:
+            if not self.is_stale:
+                self.hits += 1
+                return
+            try:
+                rows = await repository.list_departments()
+            except Exception as e:
+                logger.error(f"Failed to refresh departments: {e}")
+                if self.loaded_at is not None:
+                    # Serve the previous snapshot; retry after another TTL
+                    self.loaded_at = time.monotonic()
+                return
+
+            self.departments = rows
+            self.by_id = {str(d["id"]): d for d in rows}
+            self.by_name = {d["name"].strip().lower(): d for d in rows if d.get("name")}
+            self.loaded_at = time.monotonic()
+            self.refreshes += 1
+            logger.info(f"Department registry refreshed ({len(rows)} departments)")
+
+
+# Global registry instance
+department_registry = DepartmentRegistry(ttl_seconds=settings.DEPARTMENT_CACHE_TTL_SECONDS)
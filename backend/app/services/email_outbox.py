@@ -0,0 +1,307 @@
+"""
+Email Outbox
+Durable SQLite queue of outgoing emails drained by a background sender with
+bounded concurrency, exponential-backoff retries and idempotency keys
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses from Brevo that will not succeed on retry
+PERMANENT_ERROR_STATUSES = {400, 401, 403, 404}
+
+
+class EmailOutbox:
+    """
+    Outgoing email queue
+
+    Callers enqueue and return immediately; delivery happens on a background
+    task. An idempotency key makes re-enqueueing the same logical email
+    (e.g. a retried sweep) a no-op. Each claimed row records which sender
+    claimed it and when; a "sending" row whose claim is older than
+    claim_timeout_seconds (its sender crashed) is claimed again by any sender
+    sharing the file. SQLite work runs in a worker thread under a lock.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        concurrency: int,
+        batch_size: int,
+        max_attempts: int,
+        retry_base_seconds: float,
+        poll_seconds: float,
+        retention_days: int,
+        claim_timeout_seconds: float
+    ):
+        self.path = path
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.poll_seconds = poll_seconds
+        self.retention_days = retention_days
+        self.claim_timeout_seconds = claim_timeout_seconds
+        self.sender_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._deliver_fn: Optional[Callable[..., Awaitable[Optional[str]]]] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS email_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT NOT NULL UNIQUE,
+                    recipient_email TEXT NOT NULL,
+                    recipient_name TEXT,
+                    subject TEXT NOT NULL,
+                    html_content TEXT NOT NULL,
+                    tags TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    message_id TEXT,
+                    created_at REAL NOT NULL,
+                    sent_at REAL,
+                    claimed_by TEXT,
+                    claimed_at REAL
+                )"""
+            )
+            # Outbox files created before claims were recorded
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(email_outbox)")}
+            for column, column_type in (("claimed_by", "TEXT"), ("claimed_at", "REAL")):
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE email_outbox ADD COLUMN {column} {column_type}")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(status, next_attempt_at)"
+            )
+            self._db.commit()
+        return self._db
+
+    async def enqueue(
+        self,
+        recipient_email: str,
+        subject: str,
+        html_content: str,
+        recipient_name: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        idempotency_key: Optional[str] = None
+    ) -> bool:
+        """
+        Queue an email for delivery
+
+        Args:
+            recipient_email: Email address of the recipient
+            subject: Email subject line
+            html_content: HTML body of the email
+            recipient_name: Optional recipient name
+            tags: Brevo tags
+            idempotency_key: Key identifying this logical email; duplicates are ignored
+
+        Returns:
+            True if the email was queued by this call, False if the key was
+            already queued or on storage failure
+        """
+        now = time.time()
+        row = (idempotency_key or str(uuid.uuid4()), recipient_email, recipient_name,
+               subject, html_content, json.dumps(tags or []), now, now)
+        try:
+            inserted = await asyncio.to_thread(self._insert, row)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to queue email to {recipient_email}: {e}")
+            return False
+
+        if not inserted:
+            logger.info(f"Email {idempotency_key} already queued, skipping")
+            return False
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def start(self, deliver: Callable[..., Awaitable[Optional[str]]]):
+        """
+        Start the background sender on the running event loop
+
+        Args:
+            deliver: Coroutine function that sends one email and returns the
+                provider message id, raising on failure
+        """
+        if self._task:
+            return
+        self._deliver_fn = deliver
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="email-outbox-sender")
+        logger.info(f"Email outbox sender started ({self.path})")
+
+    async def stop(self):
+        """Stop the sender; undelivered emails stay queued for the next start"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def stats(self) -> Dict[str, Any]:
+        counts = await asyncio.to_thread(self._count_by_status)
+        return {
+            "pending": counts.get("pending", 0),
+            "sending": counts.get("sending", 0),
+            "failed": counts.get("failed", 0),
+            "sent_since_start": self.sent,
+            "retries_since_start": self.retried,
+            "failures_since_start": self.failed
+        }
+
+    async def _run(self):
+        try:
+            await asyncio.to_thread(self._purge_sent)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to purge sent emails: {e}")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        while True:
+            self._wakeup.clear()
+            try:
+                rows = await asyncio.to_thread(self._claim_due)
+                if rows:
+                    await asyncio.gather(*(self._deliver(semaphore, row) for row in rows))
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox sender error: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _count_by_status(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.db.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status").fetchall())
+
+    def _insert(self, row: tuple) -> bool:
+        with self._lock:
+            cursor = self.db.execute(
+                """INSERT OR IGNORE INTO email_outbox
+                   (idempotency_key, recipient_email, recipient_name, subject, html_content, tags, next_attempt_at, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                row
+            )
+            self.db.commit()
+            return cursor.rowcount == 1
+
+    def _purge_sent(self):
+        with self._lock:
+            self.db.execute(
+                "DELETE FROM email_outbox WHERE status = 'sent' AND sent_at < ?",
+                (time.time() - self.retention_days * 86400,)
+            )
+            self.db.commit()
+
+    def _claim_due(self) -> List[tuple]:
+        now = time.time()
+        stale_before = now - self.claim_timeout_seconds
+        with self._lock:
+            rows = self.db.execute(
+                """SELECT id, recipient_email, recipient_name, subject, html_content, tags, attempts, status
+                   FROM email_outbox
+                   WHERE (status = 'pending' AND next_attempt_at <= ?)
+                      OR (status = 'sending' AND COALESCE(claimed_at, 0) < ?)
+                   ORDER BY next_attempt_at LIMIT ?""",
+                (now, stale_before, self.batch_size)
+            ).fetchall()
+            claimed = []
+            for row in rows:
+                # Conditional update so another sender sharing the file cannot claim the same row
+                cursor = self.db.execute(
+                    """UPDATE email_outbox SET status = 'sending', claimed_by = ?, claimed_at = ?
+                       WHERE id = ? AND (status = 'pending' OR (status = 'sending' AND COALESCE(claimed_at, 0) < ?))""",
+                    (self.sender_id, now, row[0], stale_before)
+                )
+                if cursor.rowcount == 1:
+                    if row[7] == "sending":
+                        logger.warning(f"Reclaiming email {row[0]} from a sender that did not finish it")
+                    claimed.append(row[:7])
+            self.db.commit()
+            return claimed
+
+    def _mark_sent(self, outbox_id: int, attempts: int, message_id: Optional[str]):
+        with self._lock:
+            self.db.execute(
+                "UPDATE email_outbox SET status = 'sent', attempts = ?, message_id = ?, sent_at = ?, last_error = NULL WHERE id = ?",
+                (attempts, message_id, time.time(), outbox_id)
+            )
+            self.db.commit()
+
+    async def _deliver(self, semaphore: asyncio.Semaphore, row: tuple):
+        outbox_id, recipient_email, recipient_name, subject, html_content, tags, attempts = row
+        async with semaphore:
+            try:
+                message_id = await self._deliver_fn(
+                    recipient_email=recipient_email,
+                    subject=subject,
+                    html_content=html_content,
+                    recipient_name=recipient_name,
+                    tags=json.loads(tags)
+                )
+            except Exception as e:
+                await asyncio.to_thread(self._record_failure, outbox_id, recipient_email, attempts + 1, e)
+                return
+
+        await asyncio.to_thread(self._mark_sent, outbox_id, attempts + 1, message_id)
+        self.sent += 1
+        logger.info(f"Email sent successfully to {recipient_email}. Message ID: {message_id}")
+
+    def _record_failure(self, outbox_id: int, recipient_email: str, attempts: int, error: Exception):
+        permanent = getattr(error, "status", None) in PERMANENT_ERROR_STATUSES
+        with self._lock:
+            if permanent or attempts >= self.max_attempts:
+                self.db.execute(
+                    "UPDATE email_outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                    (attempts, str(error)[:1000], outbox_id)
+                )
+                self.failed += 1
+                logger.error(f"Giving up on email to {recipient_email} after {attempts} attempts: {error}")
+            else:
+                delay = self.retry_base_seconds * (2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+                self.db.execute(
+                    "UPDATE email_outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (attempts, time.time() + delay, str(error)[:1000], outbox_id)
+                )
+                self.retried += 1
+                logger.warning(f"Email to {recipient_email} failed ({error}), retrying in {delay:.0f}s")
+            self.db.commit()
+
+
+# Global outbox instance
+email_outbox = EmailOutbox(
+    path=settings.EMAIL_OUTBOX_PATH,
+    concurrency=settings.EMAIL_SEND_CONCURRENCY,
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    retry_base_seconds=settings.EMAIL_RETRY_BASE_SECONDS,
+    poll_seconds=settings.EMAIL_OUTBOX_POLL_SECONDS,
+    retention_days=settings.EMAIL_OUTBOX_RETENTION_DAYS,
+    claim_timeout_seconds=settings.EMAIL_CLAIM_TIMEOUT_SECONDS
+)
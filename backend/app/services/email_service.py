@@ -1,13 +1,16 @@
 """
 Email Service
-Handles sending transactional emails via Brevo (SendinBlue)
+Handles sending transactional emails via Brevo (SendinBlue).
+Emails are queued in the outbox and delivered by its background sender.
 """
 
-import sib_api_v3_sdk
-from sib_api_v3_sdk.rest import ApiException
+import asyncio
+import hashlib
 import logging
-from typing import Optional, Dict, Any
+from datetime import datetime
+from typing import Optional, Dict, Any, List
 from app.core.config import settings
+from app.services.email_outbox import email_outbox
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +19,22 @@ class EmailService:
     """Email service using Brevo API"""
     
     def __init__(self):
-        # Configure Brevo API client
-        configuration = sib_api_v3_sdk.Configuration()
-        configuration.api_key['api-key'] = settings.BREVO_API_KEY
-        
-        self.api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-            sib_api_v3_sdk.ApiClient(configuration)
-        )
+        self._api_instance = None
+    
+    @property
+    def api_instance(self):
+        """Brevo API client, built on first use so the SDK is not imported at startup"""
+        if self._api_instance is None:
+            import sib_api_v3_sdk
+            
+            # Configure Brevo API client
+            configuration = sib_api_v3_sdk.Configuration()
+            configuration.api_key['api-key'] = settings.BREVO_API_KEY
+            
+            self._api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
+                sib_api_v3_sdk.ApiClient(configuration)
+            )
+        return self._api_instance
     
     async def send_transactional_email(
         self,
@@ -30,10 +42,11 @@ class EmailService:
         subject: str,
         html_content: str,
         recipient_name: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None
     ) -> bool:
         """
-        Send a transactional email via Brevo
+        Queue a transactional email for background delivery via Brevo
         
         Args:
             recipient_email: Email address of the recipient
@@ -41,43 +54,62 @@ class EmailService:
             html_content: HTML body of the email
             recipient_name: Optional recipient name
             metadata: Optional metadata for tracking
+            idempotency_key: Key identifying this logical email; re-queueing it is a no-op
             
         Returns:
-            True if email sent successfully, False otherwise
+            True if the email was queued, False if it was already queued or could not be stored
         """
-        try:
-            # Prepare recipient
-            to = [{"email": recipient_email}]
-            if recipient_name:
-                to[0]["name"] = recipient_name
-            
-            # Prepare sender
-            sender = {
-                "email": settings.BREVO_SENDER_EMAIL,
-                "name": settings.BREVO_SENDER_NAME
-            }
-            
-            # Create send email object
-            send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-                to=to,
-                sender=sender,
-                subject=subject,
-                html_content=html_content,
-                tags=["civicagent", metadata.get("tag", "notification")] if metadata else ["civicagent"]
-            )
-            
-            # Send email
-            api_response = self.api_instance.send_transac_email(send_smtp_email)
-            
-            logger.info(f"Email sent successfully to {recipient_email}. Message ID: {api_response.message_id}")
-            return True
+        return await email_outbox.enqueue(
+            recipient_email=recipient_email,
+            subject=subject,
+            html_content=html_content,
+            recipient_name=recipient_name,
+            tags=["civicagent", metadata.get("tag", "notification")] if metadata else ["civicagent"],
+            idempotency_key=idempotency_key
+        )
+    
+    async def deliver(
+        self,
+        recipient_email: str,
+        subject: str,
+        html_content: str,
+        recipient_name: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> Optional[str]:
+        """
+        Send one email through Brevo (used by the outbox sender)
+        
+        Returns:
+            Brevo message ID
             
-        except ApiException as e:
-            logger.error(f"Brevo API exception when sending email: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Failed to send email to {recipient_email}: {e}")
-            return False
+        Raises:
+            sib_api_v3_sdk.rest.ApiException or transport errors on failure
+        """
+        import sib_api_v3_sdk
+        
+        # Prepare recipient
+        to = [{"email": recipient_email}]
+        if recipient_name:
+            to[0]["name"] = recipient_name
+        
+        # Prepare sender
+        sender = {
+            "email": settings.BREVO_SENDER_EMAIL,
+            "name": settings.BREVO_SENDER_NAME
+        }
+        
+        # Create send email object
+        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+            to=to,
+            sender=sender,
+            subject=subject,
+            html_content=html_content,
+            tags=tags or ["civicagent"]
+        )
+        
+        # Sync SDK call, kept off the event loop
+        api_response = await asyncio.to_thread(self.api_instance.send_transac_email, send_smtp_email)
+        return api_response.message_id
     
     async def send_complaint_notification(
         self,
@@ -157,7 +189,8 @@ class EmailService:
             subject=subject,
             html_content=html_content,
             recipient_name=department_name,
-            metadata={"tag": "complaint_notification", "complaint_id": complaint_id}
+            metadata={"tag": "complaint_notification", "complaint_id": complaint_id},
+            idempotency_key=f"complaint_notification:{complaint_id}"
         )
     
     async def send_follow_up_email(
@@ -166,9 +199,15 @@ class EmailService:
         department_name: str,
         complaint_id: str,
         category: str,
-        days_pending: int
+        days_pending: int,
+        due_at: Optional[str] = None
     ) -> bool:
-        """Send follow-up reminder to department"""
+        """
+        Send follow-up reminder to department
+        
+        `due_at` is the complaint's `next_check_at` this follow-up serves; a sweep
+        re-run for the same due time (e.g. by a new leader) queues nothing new.
+        """
         subject = f"[CivicAgent] Follow-up Required - {complaint_id[:8]} ({days_pending} days pending)"
         
         html_content = f"""
@@ -210,7 +249,89 @@ class EmailService:
             recipient_email=department_email,
             subject=subject,
             html_content=html_content,
-            metadata={"tag": "follow_up", "complaint_id": complaint_id}
+            metadata={"tag": "follow_up", "complaint_id": complaint_id},
+            idempotency_key=f"follow_up:{complaint_id}:{due_at or datetime.utcnow().date().isoformat()}"
+        )
+    
+    async def send_follow_up_digest(
+        self,
+        department_email: str,
+        department_name: str,
+        complaints: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        Send one follow-up reminder listing all of a department's pending complaints
+        
+        Args:
+            department_email: Department contact email
+            department_name: Name of the department
+            complaints: Items with complaint_id, category, days_pending and due_at
+            
+        Returns:
+            True if queued successfully
+        """
+        complaints = sorted(complaints, key=lambda c: c["days_pending"], reverse=True)
+        subject = f"[CivicAgent] Follow-up Required - {len(complaints)} pending complaint{'s' if len(complaints) != 1 else ''}"
+        
+        rows = "".join(
+            f"""
+                    <tr>
+                        <td><a href="https://civicagent.vercel.app/admin-complaints/{c['complaint_id']}">{c['complaint_id'][:8]}</a></td>
+                        <td>{c['category']}</td>
+                        <td>{c['days_pending']}</td>
+                    </tr>"""
+            for c in complaints
+        )
+        
+        html_content = f"""
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .header {{ background-color: #f59e0b; color: white; padding: 20px; text-align: center; }}
+                .content {{ padding: 20px; }}
+                .warning-box {{ background-color: #fef3c7; border-left: 4px solid #f59e0b; padding: 15px; margin: 20px 0; }}
+                table {{ border-collapse: collapse; width: 100%; }}
+                th, td {{ border-bottom: 1px solid #e5e7eb; padding: 8px; text-align: left; }}
+                .footer {{ background-color: #f9fafb; padding: 15px; text-align: center; font-size: 12px; color: #6b7280; }}
+            </style>
+        </head>
+        <body>
+            <div class="header">
+                <h1>⚠️ CivicAgent - Follow-up Reminder</h1>
+            </div>
+            <div class="content">
+                <p>Dear {department_name} Team,</p>
+                
+                <div class="warning-box">
+                    <h3>{len(complaints)} Pending Complaint{'s' if len(complaints) != 1 else ''} Require Attention</h3>
+                    <p>Please update the status or provide an update for each complaint below.</p>
+                </div>
+                
+                <table>
+                    <tr><th>Complaint ID</th><th>Category</th><th>Days Pending</th></tr>{rows}
+                </table>
+            </div>
+            <div class="footer">
+                <p>Automated follow-up from CivicAgent</p>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # Same complaints at the same due times is one logical email
+        today = datetime.utcnow().date().isoformat()
+        ids_hash = hashlib.sha256(",".join(sorted(
+            f"{c['complaint_id']}@{c.get('due_at') or today}" for c in complaints
+        )).encode()).hexdigest()[:16]
+        
+        return await self.send_transactional_email(
+            recipient_email=department_email,
+            subject=subject,
+            html_content=html_content,
+            recipient_name=department_name,
+            metadata={"tag": "follow_up_digest"},
+            idempotency_key=f"follow_up_digest:{department_email}:{ids_hash}"
         )
     
     async def send_escalation_email(
@@ -219,9 +340,10 @@ class EmailService:
         department_name: str,
         complaint_id: str,
         category: str,
-        reason: str
+        reason: str,
+        due_at: Optional[str] = None
     ) -> bool:
-        """Send escalation notification to supervisor"""
+        """Send escalation notification to supervisor (`due_at` as in send_follow_up_email)"""
         subject = f"[CivicAgent] ESCALATED - {complaint_id[:8]} - {category}"
         
         html_content = f"""
@@ -263,7 +385,8 @@ class EmailService:
             recipient_email=escalation_email,
             subject=subject,
             html_content=html_content,
-            metadata={"tag": "escalation", "complaint_id": complaint_id}
+            metadata={"tag": "escalation", "complaint_id": complaint_id},
+            idempotency_key=f"escalation:{complaint_id}:{due_at or datetime.utcnow().date().isoformat()}"
         )
 
 
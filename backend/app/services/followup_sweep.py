@@ -0,0 +1,292 @@
+"""
+Follow-up Sweep Engine
+Set-based version of the periodic complaint check: loads the complaints whose
+follow-up due time (`next_check_at`) has passed, builds decision features for
+all of them in one vectorized pass, writes results back in bulk and schedules
+each complaint's next check, so sweep cost tracks due work rather than backlog
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.models import DecisionFeatures
+from app.db.repository import repository
+from app.services.agent_workflow import (
+    STATUS_SCORES,
+    WorkflowWriteBatch,
+    ai_report_patch,
+    execute_followup,
+    execute_escalation
+)
+from app.services.decision_model import decision_model
+from app.services.department_registry import department_registry
+from app.services.leader_election import leader_elector
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_COLUMNS = "id, created_at, status, sla_hours, assigned_department, category, latitude, longitude, next_check_at"
+DEFAULT_SLA_HOURS = 72
+DEFAULT_PRIORITY = 5
+
+# Report from the most recent sweep, exposed to admins
+last_sweep_report: Optional[Dict[str, Any]] = None
+
+
+class SweepTimer:
+    """Records wall-clock duration of each sweep stage in milliseconds"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._start = time.perf_counter()
+        self._mark = self._start
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.stages[stage] = round((now - self._mark) * 1000, 2)
+        self._mark = now
+
+    @property
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self._start) * 1000, 2)
+
+
+def open_complaints(query):
+    """Restrict a complaints query to rows the follow-up workflow still tracks"""
+    query = query.not_.in_("status", ["resolved", "rejected"])
+    if settings.DEDUP_ENABLED:
+        # Linked repeat reports are followed up through their original
+        query = query.is_("duplicate_of", "null")
+    return query
+
+
+async def load_due(now: datetime) -> List[Dict[str, Any]]:
+    """Fetch open complaints whose next check is due, with only the columns needed for scoring"""
+    return await repository.fetch_all(
+        lambda: open_complaints(repository.table("complaints").select(CANDIDATE_COLUMNS))
+            .lte("next_check_at", now.isoformat())
+            .order("id")
+    )
+
+
+async def next_due_at() -> Optional[datetime]:
+    """Earliest pending `next_check_at` among open complaints, or None"""
+    response = await open_complaints(repository.table("complaints").select("next_check_at")) \
+        .not_.is_("next_check_at", "null") \
+        .order("next_check_at") \
+        .limit(1) \
+        .execute()
+    if not response.data:
+        return None
+    return datetime.fromisoformat(response.data[0]["next_check_at"].replace("Z", "+00:00"))
+
+
+def build_feature_matrix(
+    candidates: List[Dict[str, Any]],
+    departments: Dict[str, Dict[str, Any]],
+    followup_counts: Dict[str, int],
+    now: datetime
+) -> Dict[str, np.ndarray]:
+    """
+    Compute decision features for all due complaints at once
+
+    Returns:
+        Dict of column arrays (hours_since_creation, sla_hours and one per
+        DecisionModel feature), each of length len(candidates)
+    """
+    created_ts = np.array([
+        datetime.fromisoformat(c["created_at"].replace("Z", "+00:00")).timestamp()
+        for c in candidates
+    ], dtype=float)
+    sla_hours = np.array([c.get("sla_hours") or DEFAULT_SLA_HOURS for c in candidates], dtype=float)
+    priority = np.array([
+        departments.get(c.get("assigned_department"), {}).get("priority_level") or DEFAULT_PRIORITY
+        for c in candidates
+    ], dtype=float)
+    followups = np.array([followup_counts.get(c["id"], 0) for c in candidates], dtype=float)
+    status_score = np.array([STATUS_SCORES.get(c["status"], 1) for c in candidates], dtype=float)
+
+    hours_since_creation = (now.timestamp() - created_ts) / 3600
+
+    return {
+        "hours_since_creation": hours_since_creation,
+        "sla_hours": sla_hours,
+        "time_since_sla_breach": hours_since_creation - sla_hours,
+        "category_priority": priority,
+        "number_of_followups": followups,
+        "days_since_submission": hours_since_creation / 24,
+        "status_score": status_score
+    }
+
+
+def next_check_hours(hours_since_creation, sla_hours, recheck_hours: float):
+    """
+    Age (hours since creation) at which each complaint should next be checked:
+    daily on each 24-hour anniversary, and every recheck_hours once past 80%
+    of SLA. Works on scalars and NumPy arrays.
+    """
+    hours = np.asarray(hours_since_creation, dtype=float)
+    sla_threshold = np.asarray(sla_hours, dtype=float) * 0.8
+    next_daily = (np.floor(hours / 24) + 1) * 24
+    return np.where(hours >= sla_threshold, hours + recheck_hours, np.minimum(next_daily, sla_threshold))
+
+
+def features_at(matrix: Dict[str, np.ndarray], i: int) -> DecisionFeatures:
+    """Materialize DecisionFeatures for one row of the matrix"""
+    return DecisionFeatures(
+        time_since_sla_breach=float(matrix["time_since_sla_breach"][i]),
+        category_priority=int(matrix["category_priority"][i]),
+        number_of_followups=int(matrix["number_of_followups"][i]),
+        days_since_submission=float(matrix["days_since_submission"][i]),
+        status_score=int(matrix["status_score"][i])
+    )
+
+
+async def dispatch_decisions(
+    decisions: List[tuple],
+    departments: Dict[str, Dict[str, Any]],
+    batch: WorkflowWriteBatch,
+    term: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Execute follow-up/escalation decisions concurrently
+
+    At most FOLLOWUP_SWEEP_CONCURRENCY items run at once and at most
+    FOLLOWUP_DEPARTMENT_CONCURRENCY per department, so a large backlog in one
+    department cannot crowd out the rest. Each item gets
+    FOLLOWUP_ITEM_TIMEOUT_SECONDS; a timeout or error is counted and the
+    remaining items carry on. When `term` is given, items not yet started are
+    skipped once the scheduler lease is lost.
+
+    Returns:
+        Counts of escalations, follow_ups, timed_out, failed and skipped items
+    """
+    global_limit = asyncio.Semaphore(settings.FOLLOWUP_SWEEP_CONCURRENCY)
+    department_limits: Dict[Any, asyncio.Semaphore] = defaultdict(
+        lambda: asyncio.Semaphore(settings.FOLLOWUP_DEPARTMENT_CONCURRENCY)
+    )
+    counts = {"escalations": 0, "follow_ups": 0, "timed_out": 0, "failed": 0, "skipped": 0}
+
+    async def run_one(complaint: Dict[str, Any], features: DecisionFeatures, action: str):
+        department_id = complaint.get("assigned_department")
+        execute = execute_escalation if action == "escalate" else execute_followup
+        # Department slot first so items queued behind a busy department do not hold global slots
+        async with department_limits[department_id], global_limit:
+            if term is not None and not leader_elector.holds(term):
+                counts["skipped"] += 1
+                return
+            try:
+                ok = await asyncio.wait_for(
+                    execute(complaint, features, dept=departments.get(department_id), batch=batch),
+                    settings.FOLLOWUP_ITEM_TIMEOUT_SECONDS
+                )
+                if ok:
+                    counts["escalations" if action == "escalate" else "follow_ups"] += 1
+                else:
+                    # execute_* log their own errors and report them through the result
+                    counts["failed"] += 1
+            except asyncio.TimeoutError:
+                counts["timed_out"] += 1
+                logger.error(f"Follow-up for complaint {complaint['id']} timed out")
+            except Exception as e:
+                counts["failed"] += 1
+                logger.error(f"Follow-up for complaint {complaint['id']} failed: {e}")
+
+    await asyncio.gather(*(run_one(*decision) for decision in decisions))
+    return counts
+
+
+async def run_followup_sweep(term: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run one follow-up sweep over the open complaints that are due
+
+    Args:
+        term: Scheduler lease term the sweep runs under; the sweep stops with
+            LeaseLost between stages (and skips unstarted items) if the lease
+            is lost meanwhile
+
+    Returns:
+        Sweep report with row counts and per-stage timings (ms)
+    """
+    global last_sweep_report
+    timer = SweepTimer()
+    now = datetime.now(timezone.utc)
+
+    due = await load_due(now)
+    timer.lap("load_due")
+
+    departments = await department_registry.snapshot()
+    timer.lap("load_departments")
+
+    followup_counts = await repository.count_followups_bulk([c["id"] for c in due])
+    timer.lap("load_followup_counts")
+
+    if due:
+        matrix = build_feature_matrix(due, departments, followup_counts, now)
+    timer.lap("build_features")
+
+    decisions = []
+    ai_reports: Dict[str, Dict[str, Any]] = {}
+    if due:
+        # One scaler/model/explainer pass over every due complaint
+        due_matrix = np.column_stack([matrix[name] for name in decision_model.feature_names])
+        scores = decision_model.explain_batch(due_matrix)
+        for i, complaint in enumerate(due):
+            features = features_at(matrix, i)
+            explanation = decision_model.format_explanation(scores, i, features)
+            decisions.append((complaint, features, explanation["action"]))
+            ai_reports[complaint["id"]] = ai_report_patch(explanation)
+    timer.lap("score")
+
+    if term is not None:
+        leader_elector.check(term)
+    await repository.merge_ai_reports(ai_reports)
+    timer.lap("write_reports")
+
+    batch = WorkflowWriteBatch()
+    outcomes = await dispatch_decisions(decisions, departments, batch, term)
+    timer.lap("execute_actions")
+
+    # Record what was done even if the lease was lost mid-dispatch; next checks
+    # are left for the new leader. The outbox is a per-host SQLite file on
+    # ephemeral disk, so a leader on another host (or after a restart) does not
+    # see these sends and may email the same complaints again
+    await batch.flush()
+    timer.lap("write_actions")
+    if term is not None:
+        leader_elector.check(term)
+
+    next_checks: Dict[str, str] = {}
+    if due:
+        hours = matrix["hours_since_creation"]
+        next_hours = next_check_hours(hours, matrix["sla_hours"], settings.FOLLOW_UP_CHECK_INTERVAL_MINUTES / 60)
+        next_ts = now.timestamp() + (next_hours - hours) * 3600
+        next_checks = {
+            complaint["id"]: datetime.fromtimestamp(ts, timezone.utc).isoformat()
+            for complaint, ts in zip(due, next_ts)
+        }
+    await repository.bulk_update_next_checks(next_checks)
+    next_due = await next_due_at()
+    timer.lap("schedule_next")
+
+    report = {
+        "started_at": now.isoformat(),
+        "due": len(due),
+        **outcomes,
+        "next_due_at": next_due.isoformat() if next_due else None,
+        "total_ms": timer.total_ms,
+        "stages_ms": timer.stages
+    }
+    last_sweep_report = report
+    logger.info(
+        f"Follow-up sweep: {report['due']} due, {outcomes['escalations']} escalations, "
+        f"{outcomes['timed_out'] + outcomes['failed']} failed in "
+        f"{report['total_ms']:.0f} ms, next due {report['next_due_at']} {timer.stages}"
+    )
+    return report
@@ -3,16 +3,13 @@ AI Reasoning Agent Service
 Uses Google Gemini Pro for civic complaint reasoning and report generation
 """
 
-import google.generativeai as genai
 from typing import Dict, Any
 import json
 import logging
 from app.core.config import settings
+from app.services.llm_client import llm_client
 from app.db.models import AIAnalysisResult, AIReasoningResult
-from app.db.supabase import supabase_client
-
-# Configure Gemini API
-genai.configure(api_key=settings.GEMINI_API_KEY)
+from app.services.department_registry import department_registry
 
 logger = logging.getLogger(__name__)
 
@@ -43,13 +40,8 @@ CATEGORY_PRIORITY = {
 
 
 async def get_all_departments() -> list:
-    """Fetch all departments from database"""
-    try:
-        response = supabase_client.table("departments").select("*").execute()
-        return response.data
-    except Exception as e:
-        logger.error(f"Failed to fetch departments: {e}")
-        return []
+    """Fetch all departments from the department registry"""
+    return await department_registry.all()
 
 
 async def reason_about_complaint(
@@ -89,9 +81,6 @@ async def reason_about_complaint(
             for dept in departments
         ])
         
-        # Initialize reasoning model
-        model = genai.GenerativeModel(settings.REASONING_MODEL_NAME)
-        
         # Craft detailed reasoning prompt
         prompt = f"""
         You are a Civic Agent AI Reasoner for a smart city complaint management system.
@@ -133,7 +122,7 @@ async def reason_about_complaint(
         """
         
         # Generate reasoning response
-        response = model.generate_content(prompt)
+        response = await llm_client.generate(settings.REASONING_MODEL_NAME, prompt)
         result_text = response.text.strip()
         
         # Extract JSON from markdown
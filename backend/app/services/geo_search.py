@@ -0,0 +1,210 @@
+"""
+Geospatial Complaint Search
+Viewport (bounding box) and radius queries for the map, served by PostGIS RPCs
+over the GiST-indexed `location` column, with an opt-in in-memory grid index
+fallback for local runs where the RPCs are not deployed
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+from app.core.config import settings
+from app.db.repository import repository, is_missing_function
+from app.schemas.complaint import COMPLAINT_SUMMARY_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def radius_to_bbox(lat: float, lng: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """Bounding box (min_lat, min_lng, max_lat, max_lng) enclosing a circle"""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    dlng = math.degrees(radius_m / (EARTH_RADIUS_M * max(math.cos(math.radians(lat)), 1e-6)))
+    return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+
+
+class GridIndex:
+    """
+    Uniform lat/lng grid of complaint rows
+
+    A bbox query only visits the cells overlapping the box, so cost scales
+    with the viewport rather than the number of complaints.
+    """
+
+    def __init__(self, cell_degrees: float = 0.01):
+        self.cell_degrees = cell_degrees
+        self.cells: Dict[Tuple[int, int], List[Dict[str, Any]]] = defaultdict(list)
+        self.size = 0
+
+    def cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def add(self, row: Dict[str, Any]):
+        try:
+            lat, lng = float(row["latitude"]), float(row["longitude"])
+        except (KeyError, TypeError, ValueError):
+            return
+        self.cells[self.cell(lat, lng)].append({**row, "latitude": lat, "longitude": lng})
+        self.size += 1
+
+    def query_bbox(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> List[Dict[str, Any]]:
+        """Rows inside the box (inclusive)"""
+        (lat0, lng0), (lat1, lng1) = self.cell(min_lat, min_lng), self.cell(max_lat, max_lng)
+        results = []
+        if (lat1 - lat0 + 1) * (lng1 - lng0 + 1) > len(self.cells):
+            keys = [k for k in self.cells if lat0 <= k[0] <= lat1 and lng0 <= k[1] <= lng1]
+        else:
+            keys = [(i, j) for i in range(lat0, lat1 + 1) for j in range(lng0, lng1 + 1) if (i, j) in self.cells]
+        for key in keys:
+            for row in self.cells[key]:
+                if min_lat <= row["latitude"] <= max_lat and min_lng <= row["longitude"] <= max_lng:
+                    results.append(row)
+        return results
+
+    def query_radius(self, lat: float, lng: float, radius_m: float) -> List[Dict[str, Any]]:
+        """Rows within radius_m of a point"""
+        return [
+            row for row in self.query_bbox(*radius_to_bbox(lat, lng, radius_m))
+            if haversine_m(lat, lng, row["latitude"], row["longitude"]) <= radius_m
+        ]
+
+
+class GeoSearch:
+    """
+    Spatial queries over complaints
+
+    The grid index fallback is used only when `fallback_enabled` and the RPC
+    does not exist; other RPC errors (e.g. timeouts) are raised rather than
+    turned into a full-table load.
+    """
+
+    def __init__(self, index_ttl_seconds: int, cell_degrees: float, fallback_enabled: bool = False):
+        self.fallback_enabled = fallback_enabled
+        self.index_ttl_seconds = index_ttl_seconds
+        self.cell_degrees = cell_degrees
+        self.index: Optional[GridIndex] = None
+        self.index_built_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def in_bbox(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        status_filter: Optional[str] = None,
+        limit: int = 2000
+    ) -> List[Dict[str, Any]]:
+        """Complaints inside a viewport, newest first"""
+        try:
+            response = await repository.rpc("complaints_in_bbox", {
+                "min_lat": min_lat, "min_lng": min_lng, "max_lat": max_lat, "max_lng": max_lng,
+                "status_filter": status_filter, "max_rows": limit
+            }).execute()
+            return response.data
+        except Exception as e:
+            if not (self.fallback_enabled and is_missing_function(e)):
+                raise
+            logger.warning(f"complaints_in_bbox RPC not deployed, using grid index: {e}")
+
+        index = await self._get_index()
+        rows = index.query_bbox(min_lat, min_lng, max_lat, max_lng)
+        return self._finish(rows, status_filter, limit)
+
+    async def in_radius(
+        self,
+        lat: float,
+        lng: float,
+        radius_m: float,
+        status_filter: Optional[str] = None,
+        limit: int = 2000,
+        category: Optional[str] = None,
+        exclude_statuses: Optional[Iterable[str]] = None,
+        created_after: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Complaints within radius_m of a point, newest first
+
+        `category`, `exclude_statuses` and `created_after` filter before
+        `limit` is applied.
+        """
+        params: Dict[str, Any] = {
+            "center_lat": lat, "center_lng": lng, "radius_m": radius_m,
+            "status_filter": status_filter, "max_rows": limit
+        }
+        if category is not None:
+            params["category_filter"] = category
+        if exclude_statuses is not None:
+            params["exclude_statuses"] = sorted(exclude_statuses)
+        if created_after is not None:
+            params["created_after"] = created_after.isoformat()
+        try:
+            response = await repository.rpc("complaints_in_radius", params).execute()
+            return response.data
+        except Exception as e:
+            if not (self.fallback_enabled and is_missing_function(e)):
+                raise
+            logger.warning(f"complaints_in_radius RPC not deployed, using grid index: {e}")
+
+        index = await self._get_index()
+        rows = index.query_radius(lat, lng, radius_m)
+        if category is not None:
+            rows = [r for r in rows if r.get("category") == category]
+        if exclude_statuses is not None:
+            excluded = set(exclude_statuses)
+            rows = [r for r in rows if r.get("status") not in excluded]
+        if created_after is not None:
+            rows = [
+                r for r in rows
+                if datetime.fromisoformat(str(r["created_at"]).replace("Z", "+00:00")) >= created_after
+            ]
+        return self._finish(rows, status_filter, limit)
+
+    def invalidate(self):
+        """Drop the fallback index so the next query rebuilds it (call after inserts and status changes)"""
+        self.index = None
+
+    def _finish(self, rows: List[Dict[str, Any]], status_filter: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        if status_filter:
+            rows = [r for r in rows if r.get("status") == status_filter]
+        rows.sort(key=lambda r: (r["created_at"], str(r["id"])), reverse=True)
+        return rows[:limit]
+
+    async def _get_index(self) -> GridIndex:
+        if self.index is not None and time.monotonic() - self.index_built_at < self.index_ttl_seconds:
+            return self.index
+        async with self._lock:
+            if self.index is not None and time.monotonic() - self.index_built_at < self.index_ttl_seconds:
+                return self.index
+            rows = await repository.fetch_all(
+                lambda: repository.table("complaints").select(COMPLAINT_SUMMARY_COLUMNS).order("id")
+            )
+            index = GridIndex(self.cell_degrees)
+            for row in rows:
+                index.add(row)
+            self.index, self.index_built_at = index, time.monotonic()
+            logger.info(f"Built geo grid index with {index.size} complaints in {len(index.cells)} cells")
+            return index
+
+
+# Global geo search instance
+geo_search = GeoSearch(
+    index_ttl_seconds=settings.GEO_INDEX_TTL_SECONDS,
+    cell_degrees=settings.GEO_GRID_CELL_DEGREES,
+    fallback_enabled=settings.GEO_FALLBACK_ENABLED
+)
@@ -0,0 +1,60 @@
+"""
+Image Processing Service
+Downsizes and re-encodes large complaint photos before storage upload and
+vision analysis. Uses Pillow when available; otherwise images pass through.
+"""
+
+import io
+import logging
+from typing import Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def preprocess_image(image_bytes: bytes, content_type: str) -> Tuple[bytes, str]:
+    """
+    Fit an image within IMAGE_MAX_DIMENSION and re-encode it as JPEG
+
+    Images already within the size limits are returned unchanged. EXIF
+    orientation is applied before resizing so the stored photo is upright.
+
+    Args:
+        image_bytes: Raw uploaded image
+        content_type: Uploaded MIME type
+
+    Returns:
+        Tuple of (image bytes, MIME type)
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return image_bytes, content_type
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        max_dimension = settings.IMAGE_MAX_DIMENSION
+
+        if max(image.size) <= max_dimension and len(image_bytes) <= settings.IMAGE_REENCODE_THRESHOLD_BYTES:
+            return image_bytes, content_type
+
+        original_size = image.size
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=settings.IMAGE_JPEG_QUALITY, optimize=True)
+        processed = output.getvalue()
+
+        logger.info(
+            f"Preprocessed image {original_size[0]}x{original_size[1]} ({len(image_bytes) // 1024} KB) -> "
+            f"{image.size[0]}x{image.size[1]} ({len(processed) // 1024} KB)"
+        )
+        return processed, "image/jpeg"
+
+    except Exception as e:
+        logger.warning(f"Image preprocessing failed, using original: {e}")
+        return image_bytes, content_type
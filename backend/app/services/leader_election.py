@@ -0,0 +1,201 @@
+"""
+Leader Election
+Time-limited lease that lets exactly one worker process run scheduled
+background work while the others stay on standby, ready to take over
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Optional, Dict, Any
+
+from app.core.config import settings
+from app.db.repository import repository, is_missing_function
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLost(Exception):
+    """Raised by `LeaderElector.check` when work started as leader must stop"""
+
+
+class SQLiteLeaseStore:
+    """Lease table in a local SQLite file, shared by processes on one host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+        return self._db
+
+    async def acquire(self, name: str, holder: str, ttl_seconds: int) -> bool:
+        # BEGIN IMMEDIATE waits up to the connection timeout for the write lock
+        return await asyncio.to_thread(self._acquire, name, holder, ttl_seconds)
+
+    async def release(self, name: str, holder: str):
+        await asyncio.to_thread(self._release, name, holder)
+
+    def _acquire(self, name: str, holder: str, ttl_seconds: int) -> bool:
+        now = time.time()
+        try:
+            self.db.execute("BEGIN IMMEDIATE")
+            row = self.db.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            acquired = row is None or row[0] == holder or row[1] < now
+            if acquired:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                    (name, holder, now + ttl_seconds)
+                )
+            self.db.execute("COMMIT")
+            return acquired
+        except sqlite3.Error as e:
+            if self.db.in_transaction:
+                self.db.execute("ROLLBACK")
+            logger.warning(f"SQLite lease check failed: {e}")
+            return False
+
+    def _release(self, name: str, holder: str):
+        self.db.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+
+class PostgresLeaseStore:
+    """
+    Lease row in Postgres via the `try_acquire_lease` / `release_lease` RPCs
+
+    A lease table is used rather than advisory locks because PostgREST runs
+    each request on a pooled connection, so session-level locks cannot be held.
+    """
+
+    async def acquire(self, name: str, holder: str, ttl_seconds: int) -> bool:
+        response = await repository.rpc("try_acquire_lease", {
+            "lease_name": name,
+            "lease_holder": holder,
+            "ttl_seconds": ttl_seconds
+        }).execute()
+        return response.data is True
+
+    async def release(self, name: str, holder: str):
+        await repository.rpc("release_lease", {"lease_name": name, "lease_holder": holder}).execute()
+
+
+class LeaderElector:
+    """
+    Keeps trying to acquire (or renew) a named lease in the background
+
+    `is_leader` is True while this process holds the lease. The lease is
+    renewed every ttl/3 seconds, so a crashed leader is replaced within one TTL.
+    A failed renewal counts as losing the lease for that tick; long-running
+    jobs call `check(term)` between steps so they stop instead of overlapping
+    with the next leader.
+    """
+
+    def __init__(self, name: str, ttl_seconds: int, backend: str, sqlite_path: str):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = backend == "none"
+        self.leader_since: Optional[float] = None
+        self.sqlite = SQLiteLeaseStore(sqlite_path)
+        self.postgres = PostgresLeaseStore()
+        self.term = 0  # Incremented each time the lease is (re)acquired after being lost
+        self._postgres_available = backend == "postgres"
+        self._postgres_confirmed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the lease loop on the running event loop"""
+        if self.backend == "none":
+            logger.info("Leader election disabled, this process runs scheduled jobs")
+            return
+        if not self._task:
+            self._task = asyncio.create_task(self._run(), name="leader-election")
+
+    async def stop(self):
+        """Stop renewing and release the lease so a standby can take over immediately"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader and self.backend != "none":
+            try:
+                await self._store().release(self.name, self.holder)
+                logger.info(f"Released {self.name} lease")
+            except Exception as e:
+                logger.warning(f"Failed to release {self.name} lease: {e}")
+            self.is_leader = False
+
+    def holds(self, term: int) -> bool:
+        """True if this process has held the lease continuously since `term` was read"""
+        return self.is_leader and self.term == term
+
+    def check(self, term: int):
+        """Raise LeaseLost unless `holds(term)`"""
+        if not self.holds(term):
+            raise LeaseLost(f"{self.name} lease lost during term {term}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "holder": self.holder,
+            "is_leader": self.is_leader,
+            "backend": self.backend if self.backend != "postgres" or self._postgres_available else "sqlite",
+            "leader_for_seconds": round(time.time() - self.leader_since, 1) if self.is_leader and self.leader_since else None
+        }
+
+    def _store(self):
+        return self.postgres if self._postgres_available else self.sqlite
+
+    async def _run(self):
+        while True:
+            try:
+                acquired = await self._acquire()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Lease check for {self.name} failed: {e}")
+                acquired = False
+
+            if acquired and not self.is_leader:
+                self.term += 1
+                self.leader_since = time.time()
+                logger.info(f"Acquired {self.name} lease as {self.holder}, running scheduled jobs")
+            elif not acquired and self.is_leader:
+                logger.warning(f"Lost {self.name} lease, standing by")
+            self.is_leader = acquired
+
+            await asyncio.sleep(max(1.0, self.ttl_seconds / 3))
+
+    async def _acquire(self) -> bool:
+        if self._postgres_available:
+            try:
+                acquired = await self.postgres.acquire(self.name, self.holder, self.ttl_seconds)
+                self._postgres_confirmed = True
+                return acquired
+            except Exception as e:
+                # Only a missing function before the RPC has ever answered means
+                # the lease SQL is not deployed; anything else is retried next tick
+                if self._postgres_confirmed or not is_missing_function(e):
+                    raise
+                logger.warning(f"try_acquire_lease RPC not deployed, using local SQLite lease: {e}")
+                self._postgres_available = False
+        return await self.sqlite.acquire(self.name, self.holder, self.ttl_seconds)
+
+
+# Global elector for the background scheduler
+leader_elector = LeaderElector(
+    name="scheduler",
+    ttl_seconds=settings.SCHEDULER_LEASE_TTL_SECONDS,
+    backend=settings.SCHEDULER_LEASE_BACKEND,
+    sqlite_path=settings.SCHEDULER_LEASE_PATH
+)
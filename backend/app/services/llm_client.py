@@ -0,0 +1,167 @@
+"""
+LLM Client
+Shared access to Google Gemini: the SDK is imported and configured on first use,
+model instances are reused, and every call goes through a token-bucket rate
+limit, an in-flight cap, a per-call timeout and jittered retries
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_genai = None
+_genai_lock = threading.Lock()
+
+# google.api_core exception class names worth retrying (quota, overload, transient)
+RETRYABLE_ERRORS = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "DeadlineExceeded",
+    "GatewayTimeout",
+}
+
+
+def get_genai():
+    """Return the configured `google.generativeai` module, importing it on first call"""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+
+                # Configure Gemini API
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                _genai = genai
+                logger.info("Gemini SDK initialized")
+    return _genai
+
+
+class TokenBucket:
+    """Async token bucket: `rate_per_minute` sustained, up to `burst` at once"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class LLMClient:
+    """Bounded-concurrency async Gemini client shared by all AI services"""
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        requests_per_minute: float,
+        burst: int,
+        timeout_seconds: float,
+        max_retries: int,
+        retry_base_seconds: float
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.bucket = TokenBucket(requests_per_minute, burst)
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.models: Dict[str, Any] = {}
+        self.in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def model(self, model_name: str):
+        """Get a reusable GenerativeModel instance"""
+        if model_name not in self.models:
+            self.models[model_name] = get_genai().GenerativeModel(model_name)
+        return self.models[model_name]
+
+    async def generate(self, model_name: str, contents: Any, timeout: Optional[float] = None):
+        """
+        Generate content with rate limiting, concurrency cap, timeout and retries
+
+        Args:
+            model_name: Gemini model name
+            contents: Prompt or list of prompt parts (text and image blobs)
+            timeout: Per-attempt timeout override in seconds
+
+        Returns:
+            The SDK's GenerateContentResponse
+
+        Raises:
+            asyncio.TimeoutError or the SDK error after retries are exhausted
+        """
+        model = self.model(model_name)
+        timeout = timeout or self.timeout_seconds
+
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            async with self.semaphore:
+                self.in_flight += 1
+                self.calls += 1
+                try:
+                    return await asyncio.wait_for(self._call(model, contents), timeout)
+                except asyncio.TimeoutError as e:
+                    self.timeouts += 1
+                    error = e
+                except Exception as e:
+                    if type(e).__name__ not in RETRYABLE_ERRORS:
+                        self.failures += 1
+                        raise
+                    error = e
+                finally:
+                    self.in_flight -= 1
+
+            if attempt < self.max_retries:
+                self.retries += 1
+                delay = self.retry_base_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning(f"Gemini call failed ({type(error).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        self.failures += 1
+        raise error
+
+    async def _call(self, model, contents):
+        if hasattr(model, "generate_content_async"):
+            return await model.generate_content_async(contents)
+        return await asyncio.to_thread(model.generate_content, contents)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "failures": self.failures
+        }
+
+
+# Global client instance
+llm_client = LLMClient(
+    max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    burst=settings.LLM_BURST,
+    timeout_seconds=settings.LLM_TIMEOUT_SECONDS,
+    max_retries=settings.LLM_MAX_RETRIES,
+    retry_base_seconds=settings.LLM_RETRY_BASE_SECONDS
+)
@@ -1,16 +1,24 @@
 """
 Scheduler Service
 APScheduler configuration for autonomous follow-up checks
+
+Every worker runs a scheduler, but follow-up jobs only do work in the worker
+holding the scheduler lease (see leader_election); the others stay on standby.
+Each complaint's next follow-up due time is stored in `complaints.next_check_at`;
+the sweep job wakes at the earliest one rather than on a fixed interval.
 """
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
 from typing import Optional
 from app.core.config import settings
-from app.services.agent_workflow import process_complaint_followup
-from app.db.supabase import supabase_client
+from app.db.repository import repository
+from app.services.followup_sweep import run_followup_sweep, next_check_hours
+from app.services.dashboard_stats import dashboard_counters
+from app.services.leader_election import leader_elector, LeaseLost
 
 logger = logging.getLogger(__name__)
 
@@ -26,85 +34,97 @@ def get_scheduler() -> AsyncIOScheduler:
     return scheduler
 
 
+SWEEP_JOB_ID = 'periodic_complaint_check'
+
+
+def schedule_sweep_at(run_date: datetime, only_if_earlier: bool = False):
+    """
+    Set when the follow-up sweep job next runs
+    
+    Args:
+        run_date: Time to wake (timezone-aware)
+        only_if_earlier: Keep the current wake-up if it is already sooner
+    """
+    scheduler_instance = get_scheduler()
+    if only_if_earlier:
+        job = scheduler_instance.get_job(SWEEP_JOB_ID)
+        if job and job.next_run_time and job.next_run_time <= run_date:
+            return
+    
+    scheduler_instance.add_job(
+        func=check_pending_complaints,
+        trigger=DateTrigger(run_date=run_date),
+        id=SWEEP_JOB_ID,
+        name='Periodic Complaint Check',
+        misfire_grace_time=None,  # A late wake-up must still run, or the job never re-arms
+        replace_existing=True
+    )
+
+
 async def check_pending_complaints():
     """
-    Periodic job to check all pending complaints and trigger follow-ups
-    This runs every hour (configurable)
+    Due-time job that follows up on complaints whose next check has passed
+    
+    Runs on the lease holder only, then re-arms itself for the earliest
+    pending `next_check_at`, waking at least every
+    FOLLOW_UP_CHECK_INTERVAL_MINUTES to pick up complaints scheduled by other
+    workers. Standbys re-check for leadership every lease TTL, and a sweep
+    stops early if this worker loses the lease while it runs.
     """
+    now = datetime.now(timezone.utc)
+    if not leader_elector.is_leader:
+        schedule_sweep_at(now + timedelta(seconds=settings.SCHEDULER_LEASE_TTL_SECONDS))
+        return
+    
+    wake_at = now + timedelta(minutes=settings.FOLLOW_UP_CHECK_INTERVAL_MINUTES)
     try:
         logger.info("Running periodic complaint check...")
-        
-        # Fetch all non-resolved complaints
-        response = supabase_client.table("complaints") \
-            .select("id, created_at, status, sla_hours") \
-            .not_.in_("status", ["resolved", "rejected"]) \
-            .execute()
-        
-        pending_complaints = response.data
-        logger.info(f"Found {len(pending_complaints)} pending complaints")
-        
-        # Process each complaint
-        for complaint in pending_complaints:
-            complaint_id = complaint["id"]
-            
-            # Check if it's time for a follow-up
-            created_at = datetime.fromisoformat(complaint["created_at"].replace("Z", "+00:00"))
-            now = datetime.now(created_at.tzinfo)
-            hours_since_creation = (now - created_at).total_seconds() / 3600
-            
-            sla_hours = complaint.get("sla_hours", 72)
-            
-            # Follow up if:
-            # 1. More than 24 hours old, OR
-            # 2. SLA deadline approaching (80% of SLA time), OR
-            # 3. SLA already breached
-            should_followup = (
-                hours_since_creation >= 24 and
-                (hours_since_creation % 24 < 1)  # Check once per day
-            ) or hours_since_creation >= (sla_hours * 0.8)
-            
-            if should_followup:
-                logger.info(f"Triggering follow-up for complaint {complaint_id}")
-                await process_complaint_followup(complaint_id)
-        
+        report = await run_followup_sweep(term=leader_elector.term)
         logger.info("Periodic complaint check completed")
         
+        if report["next_due_at"]:
+            next_due = datetime.fromisoformat(report["next_due_at"])
+            wake_at = max(min(next_due, wake_at), datetime.now(timezone.utc) + timedelta(seconds=1))
+        
+    except LeaseLost as e:
+        logger.warning(f"Stopped periodic complaint check: {e}")
+        wake_at = datetime.now(timezone.utc) + timedelta(seconds=settings.SCHEDULER_LEASE_TTL_SECONDS)
     except Exception as e:
         logger.error(f"Error in periodic complaint check: {e}")
+    
+    schedule_sweep_at(wake_at)
 
 
-def schedule_complaint_followup(complaint_id: str, sla_hours: int):
+async def reconcile_dashboard_counters():
     """
-    Schedule a specific follow-up check for a complaint
+    Periodic job to correct drift in the in-process dashboard counters
+    Runs in every worker since each holds its own counters
+    """
+    try:
+        await dashboard_counters.reconcile()
+        logger.info("Dashboard counters reconciled")
+    except Exception as e:
+        logger.error(f"Error reconciling dashboard counters: {e}")
+
+
+async def schedule_complaint_followup(complaint_id: str, sla_hours: int):
+    """
+    Schedule the first follow-up check for a new complaint
     
     Args:
         complaint_id: UUID of the complaint
         sla_hours: SLA deadline in hours
     """
     try:
-        scheduler_instance = get_scheduler()
-        
-        # Schedule first check at 80% of SLA time
-        first_check_hours = sla_hours * 0.8
-        run_date = datetime.now() + timedelta(hours=first_check_hours)
+        # First check at the 24-hour mark or 80% of SLA, whichever is sooner
+        first_check_hours = float(next_check_hours(0.0, sla_hours, 0.0))
+        run_date = datetime.now(timezone.utc) + timedelta(hours=first_check_hours)
         
-        job_id = f"complaint_{complaint_id}_followup"
+        await repository.update_complaint(complaint_id, {"next_check_at": run_date.isoformat()})
         
-        # Check if job already exists
-        existing_job = scheduler_instance.get_job(job_id)
-        if existing_job:
-            logger.info(f"Job {job_id} already exists, updating...")
-            scheduler_instance.reschedule_job(job_id, trigger='date', run_date=run_date)
-        else:
-            scheduler_instance.add_job(
-                func=process_complaint_followup,
-                args=[complaint_id],
-                trigger='date',
-                run_date=run_date,
-                id=job_id,
-                name=f"Follow-up check for complaint {complaint_id[:8]}",
-                replace_existing=True
-            )
+        # Wake this worker's sweep sooner if it is the leader and would sleep past it
+        if leader_elector.is_leader:
+            schedule_sweep_at(run_date, only_if_earlier=True)
         
         logger.info(f"Scheduled follow-up for complaint {complaint_id} at {run_date}")
         
@@ -117,12 +137,14 @@ def start_scheduler():
     try:
         scheduler_instance = get_scheduler()
         
-        # Add periodic job to check all pending complaints
+        # First sweep shortly after startup; it re-arms itself for the next due time
+        schedule_sweep_at(datetime.now(timezone.utc) + timedelta(seconds=settings.SCHEDULER_LEASE_TTL_SECONDS))
+        
         scheduler_instance.add_job(
-            func=check_pending_complaints,
-            trigger=IntervalTrigger(minutes=settings.FOLLOW_UP_CHECK_INTERVAL_MINUTES),
-            id='periodic_complaint_check',
-            name='Periodic Complaint Check',
+            func=reconcile_dashboard_counters,
+            trigger=IntervalTrigger(minutes=settings.DASHBOARD_RECONCILE_MINUTES),
+            id='dashboard_reconcile',
+            name='Dashboard Counter Reconcile',
             replace_existing=True
         )
         
@@ -0,0 +1,238 @@
+"""
+Vision Result Cache
+Content-addressed cache for Gemini vision analysis results, keyed by the
+SHA-256 of the image bytes with optional perceptual-hash matching for
+near-duplicate photos. LRU + TTL in memory, optionally persisted to SQLite.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+from app.core.config import settings
+from app.db.models import AIAnalysisResult
+
+logger = logging.getLogger(__name__)
+
+# (sha256 hex, perceptual hash or None)
+Fingerprint = Tuple[str, Optional[int]]
+
+
+def perceptual_hash(image_bytes: bytes) -> Optional[int]:
+    """
+    64-bit difference hash (dHash) of an image
+
+    Returns None when Pillow is not installed or the image cannot be decoded.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes)).convert("L").resize((9, 8))
+    except Exception as e:
+        logger.warning(f"Could not compute perceptual hash: {e}")
+        return None
+
+    pixels = list(image.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+class VisionResultCache:
+    """
+    LRU + TTL cache of AIAnalysisResult by image content
+
+    The in-memory map is authoritative for lookups. When a SQLite path is
+    configured, entries are also written there and reloaded on startup so
+    the cache survives restarts. Methods are blocking (hashing, near-duplicate
+    scan, SQLite commits); async callers run them in a worker thread, and a
+    lock serializes access to the entries.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        max_entries: int,
+        sqlite_path: Optional[str] = None,
+        near_duplicates: bool = False,
+        phash_max_distance: int = 5
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.near_duplicates = near_duplicates
+        self.phash_max_distance = phash_max_distance
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.near_duplicate_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+        if sqlite_path:
+            self._open_sqlite(sqlite_path)
+
+    def fingerprint(self, image_bytes: bytes) -> Fingerprint:
+        """Compute the cache keys for an image"""
+        content_hash = hashlib.sha256(image_bytes).hexdigest()
+        phash = perceptual_hash(image_bytes) if self.near_duplicates else None
+        return content_hash, phash
+
+    def get(self, fingerprint: Fingerprint) -> Optional[AIAnalysisResult]:
+        """Look up a cached analysis by exact content, then by perceptual similarity"""
+        with self._lock:
+            return self._get(fingerprint)
+
+    def _get(self, fingerprint: Fingerprint) -> Optional[AIAnalysisResult]:
+        content_hash, phash = fingerprint
+        now = time.time()
+
+        entry = self.entries.get(content_hash)
+        if entry and entry["expires_at"] <= now:
+            self._remove(content_hash)
+            entry = None
+        if entry:
+            self.entries.move_to_end(content_hash)
+            self.hits += 1
+            return AIAnalysisResult(**entry["result"])
+
+        if phash is not None:
+            key = self._find_near_duplicate(phash, now)
+            if key:
+                self.entries.move_to_end(key)
+                self.near_duplicate_hits += 1
+                return AIAnalysisResult(**self.entries[key]["result"])
+
+        self.misses += 1
+        return None
+
+    def put(self, fingerprint: Fingerprint, result: AIAnalysisResult):
+        """Store an analysis result"""
+        with self._lock:
+            self._put(fingerprint, result)
+
+    def _put(self, fingerprint: Fingerprint, result: AIAnalysisResult):
+        content_hash, phash = fingerprint
+        entry = {
+            "result": result.model_dump(),
+            "phash": phash,
+            "expires_at": time.time() + self.ttl_seconds
+        }
+        self.entries[content_hash] = entry
+        self.entries.move_to_end(content_hash)
+
+        while len(self.entries) > self.max_entries:
+            oldest, _ = self.entries.popitem(last=False)
+            self._delete_persisted(oldest)
+            self.evictions += 1
+
+        if self._db is not None:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO vision_cache (content_hash, phash, result, expires_at) VALUES (?, ?, ?, ?)",
+                    (content_hash, None if phash is None else format(phash, "016x"),
+                     json.dumps(entry["result"]), entry["expires_at"])
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Vision cache write failed: {e}")
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self.entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM vision_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        lookups = self.hits + self.near_duplicate_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "near_duplicate_hits": self.near_duplicate_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.near_duplicate_hits) / lookups, 4) if lookups else None,
+            "persistent": self._db is not None
+        }
+
+    def _find_near_duplicate(self, phash: int, now: float) -> Optional[str]:
+        best_key, best_distance = None, self.phash_max_distance + 1
+        for key, entry in self.entries.items():
+            if entry["phash"] is None or entry["expires_at"] <= now:
+                continue
+            distance = hamming_distance(phash, entry["phash"])
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def _remove(self, content_hash: str):
+        self.entries.pop(content_hash, None)
+        self._delete_persisted(content_hash)
+
+    def _delete_persisted(self, content_hash: str):
+        if self._db is not None:
+            try:
+                self._db.execute("DELETE FROM vision_cache WHERE content_hash = ?", (content_hash,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Vision cache delete failed: {e}")
+
+    def _open_sqlite(self, path: str):
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS vision_cache (
+                    content_hash TEXT PRIMARY KEY,
+                    phash TEXT,
+                    result TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )"""
+            )
+            self._db.execute("DELETE FROM vision_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+
+            rows = self._db.execute(
+                "SELECT content_hash, phash, result, expires_at FROM vision_cache ORDER BY expires_at DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            for content_hash, phash, result, expires_at in reversed(rows):
+                self.entries[content_hash] = {
+                    "result": json.loads(result),
+                    "phash": None if phash is None else int(phash, 16),
+                    "expires_at": expires_at
+                }
+            logger.info(f"Vision cache loaded {len(rows)} entries from {path}")
+        except sqlite3.Error as e:
+            logger.error(f"Vision cache SQLite backend unavailable, using memory only: {e}")
+            self._db = None
+
+
+# Global cache instance
+vision_cache = VisionResultCache(
+    ttl_seconds=settings.VISION_CACHE_TTL_SECONDS,
+    max_entries=settings.VISION_CACHE_MAX_ENTRIES,
+    sqlite_path=settings.VISION_CACHE_PATH or None,
+    near_duplicates=settings.VISION_CACHE_NEAR_DUPLICATES,
+    phash_max_distance=settings.VISION_CACHE_PHASH_MAX_DISTANCE
+)
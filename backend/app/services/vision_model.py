@@ -3,25 +3,28 @@ AI Vision Model Service
 Handles image analysis using Google Gemini Pro Vision API
 """
 
-import google.generativeai as genai
 from typing import Dict, Any
+import asyncio
 import json
 import logging
 from app.core.config import settings
+from app.services.llm_client import llm_client
 from app.db.models import AIAnalysisResult
-
-# Configure Gemini API
-genai.configure(api_key=settings.GEMINI_API_KEY)
+from app.services.vision_cache import vision_cache
 
 logger = logging.getLogger(__name__)
 
 
-async def analyze_image_for_civic_issue(image_url: str) -> AIAnalysisResult:
+async def analyze_image_for_civic_issue(image_bytes: bytes, mime_type: str = "image/jpeg") -> AIAnalysisResult:
     """
     Analyze an uploaded image to detect civic issues using Gemini Pro Vision
     
+    The image bytes are sent inline to the model; results are cached by
+    image content hash.
+    
     Args:
-        image_url: Public URL of the uploaded image
+        image_bytes: Raw (preprocessed) image content
+        mime_type: MIME type of the image
         
     Returns:
         AIAnalysisResult containing detected issue, confidence, and summary
@@ -29,10 +32,16 @@ async def analyze_image_for_civic_issue(image_url: str) -> AIAnalysisResult:
     Raises:
         Exception: If AI analysis fails
     """
+    fingerprint = None
+    if settings.VISION_CACHE_ENABLED:
+        # Hashing, the near-duplicate scan and SQLite I/O are blocking
+        fingerprint = await asyncio.to_thread(vision_cache.fingerprint, image_bytes)
+        cached = await asyncio.to_thread(vision_cache.get, fingerprint)
+        if cached:
+            logger.info(f"Vision cache hit: {cached.issue} (confidence: {cached.confidence})")
+            return cached
+    
     try:
-        # Initialize the vision model
-        model = genai.GenerativeModel(settings.VISION_MODEL_NAME)
-        
         # Craft a detailed prompt for civic issue detection
         prompt = """
         You are an expert civic issue analyzer for a municipal complaint system in India.
@@ -63,7 +72,10 @@ async def analyze_image_for_civic_issue(image_url: str) -> AIAnalysisResult:
         """
         
         # Generate content with the image
-        response = model.generate_content([prompt, {"mime_type": "image/jpeg", "data": image_url}])
+        response = await llm_client.generate(
+            settings.VISION_MODEL_NAME,
+            [prompt, {"mime_type": mime_type, "data": image_bytes}]
+        )
         
         # Parse the JSON response
         result_text = response.text.strip()
@@ -86,6 +98,10 @@ async def analyze_image_for_civic_issue(image_url: str) -> AIAnalysisResult:
         )
         
         logger.info(f"Vision analysis complete: {analysis.issue} (confidence: {analysis.confidence})")
+        
+        if fingerprint is not None:
+            await asyncio.to_thread(vision_cache.put, fingerprint, analysis)
+        
         return analysis
         
     except json.JSONDecodeError as e:
@@ -103,19 +119,18 @@ async def analyze_image_for_civic_issue(image_url: str) -> AIAnalysisResult:
         raise Exception(f"AI vision analysis failed: {str(e)}")
 
 
-async def validate_image_quality(image_url: str) -> Dict[str, Any]:
+async def validate_image_quality(image_bytes: bytes, mime_type: str = "image/jpeg") -> Dict[str, Any]:
     """
     Validate if the image is suitable for analysis (not blurry, has sufficient lighting, etc.)
     
     Args:
-        image_url: Public URL of the image
+        image_bytes: Raw image content
+        mime_type: MIME type of the image
         
     Returns:
         Dictionary with quality metrics
     """
     try:
-        model = genai.GenerativeModel(settings.VISION_MODEL_NAME)
-        
         prompt = """
         Assess the quality of this image for civic issue detection.
         
@@ -130,7 +145,10 @@ async def validate_image_quality(image_url: str) -> Dict[str, Any]:
         Consider: clarity, lighting, focus, relevance to civic issues.
         """
         
-        response = model.generate_content([prompt, {"mime_type": "image/jpeg", "data": image_url}])
+        response = await llm_client.generate(
+            settings.VISION_MODEL_NAME,
+            [prompt, {"mime_type": mime_type, "data": image_bytes}]
+        )
         result_text = response.text.strip()
         
         if "```json" in result_text:
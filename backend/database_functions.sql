@@ -0,0 +1,380 @@
+-- ============================================================================
+-- CIVICAGENT BACKEND DATABASE FUNCTIONS
+-- RPC functions and indexes used by the backend for bulk and aggregate work
+-- Safe to run multiple times - uses CREATE OR REPLACE / IF NOT EXISTS
+-- ============================================================================
+
+-- ============================================================================
+-- SECTION 1: AI REPORTS (JSONB, merged in place by the follow-up sweep)
+-- ============================================================================
+
+-- Convert ai_report from text to jsonb once; text that is not valid JSON is
+-- kept under a "text" key
+create or replace function public.ai_report_text_to_jsonb(report text)
+returns jsonb as $$
+begin
+  if report is null or btrim(report) = '' then
+    return null;
+  end if;
+  return report::jsonb;
+exception when others then
+  return jsonb_build_object('text', report);
+end;
+$$ language plpgsql immutable;
+
+do $$
+begin
+  if exists (
+    select 1 from information_schema.columns
+    where table_schema = 'public' and table_name = 'complaints'
+      and column_name = 'ai_report' and data_type = 'text'
+  ) then
+    alter table public.complaints
+      alter column ai_report type jsonb using public.ai_report_text_to_jsonb(ai_report);
+  end if;
+end;
+$$;
+
+-- Replaced by merge_ai_reports
+drop function if exists public.bulk_update_ai_reports(jsonb);
+
+-- Merge partial reports into many ai_report values in one statement; keys in
+-- a patch overwrite stored keys, all other stored keys are kept
+-- updates: [{"id": "<complaint id>", "patch": {"prediction": ..., ...}}, ...]
+create or replace function public.merge_ai_reports(updates jsonb)
+returns integer as $$
+  with changed as (
+    update public.complaints c
+    set ai_report = coalesce(c.ai_report, '{}'::jsonb) || u.patch
+    from jsonb_to_recordset(updates) as u(id uuid, patch jsonb)
+    where c.id = u.id
+    returning 1
+  )
+  select count(*)::integer from changed;
+$$ language sql security definer set search_path = public;
+
+-- Writes bypass row level security, so only the backend's service role may call it
+revoke execute on function public.merge_ai_reports(jsonb) from public, anon, authenticated;
+grant execute on function public.merge_ai_reports(jsonb) to service_role;
+
+-- Follow-up counts are looked up by complaint and action type on every sweep
+create index if not exists idx_complaint_actions_complaint_type
+  on public.complaint_actions(complaint_id, action_type);
+
+-- ============================================================================
+-- SECTION 2: DASHBOARD STATISTICS (admin dashboard)
+-- ============================================================================
+
+-- All admin dashboard counts and metrics in a single scan
+-- SLA compliance = closed (resolved/rejected) complaints closed within sla_hours
+create or replace function public.get_dashboard_stats()
+returns jsonb as $$
+  select jsonb_build_object(
+    'total_complaints', count(*),
+    'submitted', count(*) filter (where status = 'submitted'),
+    'in_progress', count(*) filter (where status = 'in_progress'),
+    'escalated', count(*) filter (where status = 'escalated'),
+    'resolved', count(*) filter (where status = 'resolved'),
+    'rejected', count(*) filter (where status = 'rejected'),
+    'avg_resolution_time_hours',
+      avg(extract(epoch from (updated_at - created_at)) / 3600) filter (where status = 'resolved'),
+    'sla_compliance_rate',
+      100.0 * count(*) filter (
+        where status in ('resolved', 'rejected')
+          and sla_hours > 0
+          and extract(epoch from (updated_at - created_at)) / 3600 <= sla_hours
+      ) / nullif(count(*) filter (where status in ('resolved', 'rejected')), 0)
+  )
+  from public.complaints;
+$$ language sql stable security definer set search_path = public;
+
+-- Aggregates every complaint regardless of row level security; backend only
+revoke execute on function public.get_dashboard_stats() from public, anon, authenticated;
+grant execute on function public.get_dashboard_stats() to service_role;
+
+-- ============================================================================
+-- SECTION 3: KEYSET PAGINATION (complaint lists)
+-- ============================================================================
+
+-- Complaint lists are ordered by (created_at desc, id desc) and paged by cursor
+create index if not exists idx_complaints_created_at_id
+  on public.complaints(created_at desc, id desc);
+
+create index if not exists idx_complaints_user_created_at_id
+  on public.complaints(user_id, created_at desc, id desc);
+
+-- ============================================================================
+-- SECTION 4: GEOSPATIAL QUERIES (map viewport / radius)
+-- ============================================================================
+
+create extension if not exists postgis;
+
+alter table public.complaints add column if not exists location geography(Point);
+
+-- Keep location in sync with the latitude/longitude the backend writes
+create or replace function public.set_complaint_location()
+returns trigger as $$
+begin
+  if new.latitude is not null and new.longitude is not null then
+    new.location := st_setsrid(
+      st_makepoint(new.longitude::double precision, new.latitude::double precision), 4326
+    )::geography;
+  end if;
+  return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists set_complaint_location on public.complaints;
+create trigger set_complaint_location
+  before insert or update of latitude, longitude on public.complaints
+  for each row execute function public.set_complaint_location();
+
+-- Backfill rows written before the trigger existed
+update public.complaints
+set location = st_setsrid(st_makepoint(longitude::double precision, latitude::double precision), 4326)::geography
+where location is null and latitude is not null and longitude is not null;
+
+create index if not exists idx_complaints_location
+  on public.complaints using gist(location);
+
+-- Complaints inside a viewport, newest first
+create or replace function public.complaints_in_bbox(
+  min_lat double precision,
+  min_lng double precision,
+  max_lat double precision,
+  max_lng double precision,
+  status_filter text default null,
+  max_rows integer default 2000
+)
+returns table (
+  id text,
+  latitude double precision,
+  longitude double precision,
+  category text,
+  status text,
+  created_at timestamptz
+) as $$
+  select c.id::text, c.latitude::double precision, c.longitude::double precision,
+         c.category, c.status::text, c.created_at
+  from public.complaints c
+  where c.location && st_makeenvelope(min_lng, min_lat, max_lng, max_lat, 4326)::geography
+    and (status_filter is null or c.status::text = status_filter)
+  order by c.created_at desc, c.id desc
+  limit max_rows;
+$$ language sql stable security definer set search_path = public;
+
+-- Complaints within radius_m meters of a point, newest first. The optional
+-- category / excluded statuses / created_after filters (used by duplicate
+-- detection) apply before max_rows, so the limit never hides a match
+drop function if exists public.complaints_in_radius(double precision, double precision, double precision, text, integer);
+create or replace function public.complaints_in_radius(
+  center_lat double precision,
+  center_lng double precision,
+  radius_m double precision,
+  status_filter text default null,
+  max_rows integer default 2000,
+  category_filter text default null,
+  exclude_statuses text[] default null,
+  created_after timestamptz default null
+)
+returns table (
+  id text,
+  latitude double precision,
+  longitude double precision,
+  category text,
+  status text,
+  created_at timestamptz
+) as $$
+  select c.id::text, c.latitude::double precision, c.longitude::double precision,
+         c.category, c.status::text, c.created_at
+  from public.complaints c
+  where st_dwithin(c.location, st_setsrid(st_makepoint(center_lng, center_lat), 4326)::geography, radius_m)
+    and (status_filter is null or c.status::text = status_filter)
+    and (category_filter is null or c.category = category_filter)
+    and (exclude_statuses is null or c.status::text <> all(exclude_statuses))
+    and (created_after is null or c.created_at >= created_after)
+  order by c.created_at desc, c.id desc
+  limit max_rows;
+$$ language sql stable security definer set search_path = public;
+
+-- Both return complaints regardless of row level security; backend only
+revoke execute on function public.complaints_in_bbox(double precision, double precision, double precision, double precision, text, integer)
+  from public, anon, authenticated;
+revoke execute on function public.complaints_in_radius(double precision, double precision, double precision, text, integer, text, text[], timestamptz)
+  from public, anon, authenticated;
+grant execute on function public.complaints_in_bbox(double precision, double precision, double precision, double precision, text, integer)
+  to service_role;
+grant execute on function public.complaints_in_radius(double precision, double precision, double precision, text, integer, text, text[], timestamptz)
+  to service_role;
+
+-- ============================================================================
+-- SECTION 5: MARKER CLUSTERING (map tiles)
+-- ============================================================================
+
+-- Group complaints in a tile into a grid_size x grid_size grid with
+-- centroid and per-status / per-category counts for each non-empty cell
+create or replace function public.complaint_clusters(
+  min_lat double precision,
+  min_lng double precision,
+  max_lat double precision,
+  max_lng double precision,
+  grid_size integer default 8,
+  status_filter text default null
+)
+returns table (
+  cell_x integer,
+  cell_y integer,
+  count bigint,
+  latitude double precision,
+  longitude double precision,
+  by_status jsonb,
+  by_category jsonb,
+  complaint_id text
+) as $$
+  with points as (
+    select
+      c.id::text as id,
+      c.latitude::double precision as lat,
+      c.longitude::double precision as lng,
+      c.status::text as status,
+      coalesce(c.category, 'Other') as category,
+      greatest(0, least(grid_size - 1,
+        floor((c.longitude::double precision - min_lng) / nullif(max_lng - min_lng, 0) * grid_size)))::integer as cx,
+      greatest(0, least(grid_size - 1,
+        floor((c.latitude::double precision - min_lat) / nullif(max_lat - min_lat, 0) * grid_size)))::integer as cy
+    from public.complaints c
+    where c.location && st_makeenvelope(min_lng, min_lat, max_lng, max_lat, 4326)::geography
+      and (status_filter is null or c.status::text = status_filter)
+  ),
+  cells as (
+    select cx, cy, count(*) as n, avg(lat) as lat, avg(lng) as lng, min(id) as any_id
+    from points
+    group by cx, cy
+  ),
+  statuses as (
+    select cx, cy, jsonb_object_agg(status, n) as by_status
+    from (select cx, cy, status, count(*) as n from points group by cx, cy, status) s
+    group by cx, cy
+  ),
+  categories as (
+    select cx, cy, jsonb_object_agg(category, n) as by_category
+    from (select cx, cy, category, count(*) as n from points group by cx, cy, category) s
+    group by cx, cy
+  )
+  select cells.cx, cells.cy, cells.n, cells.lat, cells.lng,
+         statuses.by_status, categories.by_category,
+         case when cells.n = 1 then cells.any_id end
+  from cells
+  join statuses using (cx, cy)
+  join categories using (cx, cy);
+$$ language sql stable security definer set search_path = public;
+
+-- Reads every complaint in the tile regardless of row level security; backend only
+revoke execute on function public.complaint_clusters(double precision, double precision, double precision, double precision, integer, text)
+  from public, anon, authenticated;
+grant execute on function public.complaint_clusters(double precision, double precision, double precision, double precision, integer, text)
+  to service_role;
+
+-- ============================================================================
+-- SECTION 6: DUPLICATE COMPLAINTS
+-- ============================================================================
+
+-- Repeat reports point at the open complaint they duplicate
+alter table public.complaints add column if not exists duplicate_of text;
+-- 64-bit perceptual hash (hex) of the submitted photo
+alter table public.complaints add column if not exists image_phash text;
+
+create index if not exists idx_complaints_duplicate_of
+  on public.complaints(duplicate_of)
+  where duplicate_of is not null;
+
+-- ============================================================================
+-- SECTION 7: SCHEDULER LEADER LEASE
+-- ============================================================================
+
+-- One row per lease; the holder renews it before expires_at
+create table if not exists public.scheduler_leases (
+  name text primary key,
+  holder text not null,
+  expires_at timestamptz not null
+);
+
+-- No policies: only the service role (which bypasses RLS) can read or write leases
+alter table public.scheduler_leases enable row level security;
+
+-- Take or renew a lease; true when lease_holder owns it afterwards.
+-- A row lease is used instead of pg_advisory_lock because PostgREST requests
+-- run on pooled connections and cannot hold a session lock.
+create or replace function public.try_acquire_lease(lease_name text, lease_holder text, ttl_seconds integer)
+returns boolean as $$
+declare
+  current_holder text;
+begin
+  insert into public.scheduler_leases as l (name, holder, expires_at)
+  values (lease_name, lease_holder, now() + make_interval(secs => ttl_seconds))
+  on conflict (name) do update
+    set holder = excluded.holder, expires_at = excluded.expires_at
+    where l.holder = excluded.holder or l.expires_at < now()
+  returning holder into current_holder;
+  return coalesce(current_holder = lease_holder, false);
+end;
+$$ language plpgsql security definer set search_path = public;
+
+-- Give up a lease on shutdown so a standby can take over immediately
+create or replace function public.release_lease(lease_name text, lease_holder text)
+returns void as $$
+  delete from public.scheduler_leases where name = lease_name and holder = lease_holder;
+$$ language sql security definer set search_path = public;
+
+-- Only backend workers may take or release leases
+revoke execute on function public.try_acquire_lease(text, text, integer) from public, anon, authenticated;
+revoke execute on function public.release_lease(text, text) from public, anon, authenticated;
+grant execute on function public.try_acquire_lease(text, text, integer) to service_role;
+grant execute on function public.release_lease(text, text) to service_role;
+
+-- ============================================================================
+-- SECTION 8: FOLLOW-UP DUE TIMES
+-- ============================================================================
+
+-- When the next follow-up check of an open complaint is due; the sweep only
+-- loads rows past it and writes the following due time after each check.
+-- Cleared when a complaint is resolved or rejected.
+alter table public.complaints add column if not exists next_check_at timestamptz;
+
+create index if not exists idx_complaints_next_check_at
+  on public.complaints(next_check_at)
+  where next_check_at is not null;
+
+-- Write many next_check_at values in one statement
+-- updates: [{"id": "<complaint id>", "next_check_at": "<iso timestamp>"}, ...]
+create or replace function public.bulk_update_next_checks(updates jsonb)
+returns integer as $$
+  with changed as (
+    update public.complaints c
+    set next_check_at = u.next_check_at
+    from jsonb_to_recordset(updates) as u(id uuid, next_check_at timestamptz)
+    where c.id = u.id
+    returning 1
+  )
+  select count(*)::integer from changed;
+$$ language sql security definer set search_path = public;
+
+revoke execute on function public.bulk_update_next_checks(jsonb) from public, anon, authenticated;
+grant execute on function public.bulk_update_next_checks(jsonb) to service_role;
+
+-- Backfill open complaints: due now if past 80% of SLA, otherwise at the
+-- next 24-hour anniversary or 80% of SLA, whichever is sooner
+update public.complaints
+set next_check_at = case
+  when now() >= created_at + make_interval(secs => coalesce(sla_hours, 72) * 0.8 * 3600) then now()
+  else least(
+    created_at + make_interval(secs => coalesce(sla_hours, 72) * 0.8 * 3600),
+    created_at + make_interval(days => floor(extract(epoch from now() - created_at) / 86400)::integer + 1)
+  )
+end
+where next_check_at is null
+  and status not in ('resolved', 'rejected');
+
+-- ============================================================================
+-- FUNCTIONS COMPLETE
+-- ============================================================================
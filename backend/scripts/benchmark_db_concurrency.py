@@ -0,0 +1,102 @@
+"""
+Concurrent Request Throughput Benchmark
+Compares the old synchronous PostgREST client (called from async handlers)
+with the async repository layer against a local PostgREST stand-in.
+
+Usage (from the backend directory):
+    python scripts/benchmark_db_concurrency.py --requests 200 --concurrency 50 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Settings require these values; the benchmark never talks to real services
+for key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "GEMINI_API_KEY", "BREVO_API_KEY"):
+    os.environ.setdefault(key, "http://127.0.0.1" if key == "SUPABASE_URL" else "benchmark")
+
+from postgrest import SyncPostgrestClient  # noqa: E402
+from app.db.repository import SupabaseRepository  # noqa: E402
+
+
+def make_handler(latency_s: float):
+    """Build a request handler that emulates a PostgREST row fetch with fixed latency"""
+    body = json.dumps([{"id": "00000000-0000-0000-0000-000000000000", "status": "submitted"}]).encode()
+
+    class PostgrestStandIn(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency_s)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return PostgrestStandIn
+
+
+async def run_sync_client(base_url: str, n_requests: int, concurrency: int) -> float:
+    """Old path: sync client invoked directly inside coroutines (blocks the loop)"""
+    client = SyncPostgrestClient(f"{base_url}/rest/v1")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            client.from_("complaints").select("*").eq("id", "x").execute()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n_requests)))
+    elapsed = time.perf_counter() - start
+    client.session.close()
+    return elapsed
+
+
+async def run_async_repository(base_url: str, n_requests: int, concurrency: int) -> float:
+    """New path: async repository with a shared connection pool"""
+    repo = SupabaseRepository(base_url, "benchmark")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await repo.get_complaint("x")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n_requests)))
+    elapsed = time.perf_counter() - start
+    await repo.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"PostgREST stand-in at {base_url} ({args.latency_ms:.0f} ms per query)")
+    print(f"{args.requests} requests, concurrency {args.concurrency}\n")
+
+    for label, runner in (("sync client (before)", run_sync_client), ("async repository (after)", run_async_repository)):
+        elapsed = asyncio.run(runner(base_url, args.requests, args.concurrency))
+        print(f"{label:<28} {elapsed:8.3f} s  {args.requests / elapsed:10.1f} req/s")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
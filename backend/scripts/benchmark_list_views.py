@@ -0,0 +1,135 @@
+"""
+Complaint List Payload Benchmark
+Compares response size and serialization latency of the full and summary
+list views on synthetic rows, or measures a running API with --url.
+
+Usage (from the backend directory):
+    python scripts/benchmark_list_views.py --rows 100 --iterations 200
+    python scripts/benchmark_list_views.py --url http://localhost:8000 --page-size 100
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.schemas.complaint import (  # noqa: E402
+    ComplaintResponse,
+    ComplaintListResponse,
+    ComplaintSummary,
+    ComplaintSummaryListResponse,
+    COMPLAINT_SUMMARY_COLUMNS
+)
+
+
+def make_row(i: int) -> dict:
+    """A complaint row shaped like the PostgREST response for select=*"""
+    created = datetime(2025, 1, 1) + timedelta(minutes=i)
+    ai_report = {
+        "vision_summary": "Large pothole on the left lane, approximately 1m wide, water logged. " * 3,
+        "vision_confidence": 0.92,
+        "detected_issue": "Pothole",
+        "shap_values": {f: 0.1 * (j + 1) for j, f in enumerate(
+            ["time_since_sla_breach", "category_priority", "number_of_followups",
+             "days_since_submission", "status_score"])},
+        "feature_importance": [{"feature": "time_since_sla_breach", "importance": 0.42}] * 5,
+        "prediction": "wait",
+        "confidence": 0.81,
+        "explanation_text": "The model recommends waiting because the complaint is still within SLA. " * 4
+    }
+    return {
+        "id": str(uuid.UUID(int=i)),
+        "user_id": str(uuid.UUID(int=10_000 + i)),
+        "category": "Pothole",
+        "description": "Deep pothole near the bus stop causing two-wheelers to skid during rain. " * 3,
+        "landmark": "Opposite City Mall",
+        "latitude": "28.6139",
+        "longitude": "77.2090",
+        "image_url": f"https://example.supabase.co/storage/v1/object/public/complaint-images/u/{i}.jpg",
+        "status": "submitted",
+        "ai_detected_category": "Pothole",
+        "ai_confidence": 92,
+        "ai_report": ai_report,
+        "assigned_department": str(uuid.UUID(int=99)),
+        "official_summary": "Pothole reported near bus stop; requires resurfacing within SLA. " * 2,
+        "sla_hours": 72,
+        "sla_deadline": (created + timedelta(hours=72)).isoformat(),
+        "user_rating": None,
+        "user_feedback": None,
+        "created_at": created.isoformat(),
+        "updated_at": created.isoformat()
+    }
+
+
+def project(row: dict, columns: str) -> dict:
+    return {c.strip(): row[c.strip()] for c in columns.split(",")}
+
+
+def time_view(rows, row_schema, list_schema, iterations: int):
+    """Median ms to validate and serialize one page, and serialized bytes"""
+    timings = []
+    body = b""
+    for _ in range(iterations):
+        start = time.perf_counter()
+        page = list_schema(complaints=[row_schema(**r) for r in rows], total=None, page=1, page_size=len(rows))
+        body = page.model_dump_json().encode()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(body)
+
+
+def run_synthetic(n_rows: int, iterations: int):
+    full_rows = [make_row(i) for i in range(n_rows)]
+    summary_rows = [project(r, COMPLAINT_SUMMARY_COLUMNS) for r in full_rows]
+
+    print(f"{n_rows} rows per page, {iterations} iterations\n")
+    print(f"{'view':<10} {'db payload':>12} {'response':>12} {'serialize ms':>14}")
+    for label, rows, row_schema, list_schema in (
+        ("full", full_rows, ComplaintResponse, ComplaintListResponse),
+        ("summary", summary_rows, ComplaintSummary, ComplaintSummaryListResponse),
+    ):
+        db_bytes = len(json.dumps(rows).encode())
+        ms, response_bytes = time_view(rows, row_schema, list_schema, iterations)
+        print(f"{label:<10} {db_bytes / 1024:>10.1f}KB {response_bytes / 1024:>10.1f}KB {ms:>14.2f}")
+
+
+def run_live(url: str, page_size: int, iterations: int):
+    import httpx
+
+    print(f"{url}/complaints/ page_size={page_size}, {iterations} requests per view\n")
+    print(f"{'view':<10} {'response':>12} {'p50 ms':>10} {'p95 ms':>10}")
+    with httpx.Client(base_url=url, timeout=30.0) as client:
+        for view in ("full", "summary"):
+            timings, size = [], 0
+            for _ in range(iterations):
+                start = time.perf_counter()
+                response = client.get("/complaints/", params={"page_size": page_size, "view": view, "count": "none"})
+                timings.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+                size = len(response.content)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{view:<10} {size / 1024:>10.1f}KB {statistics.median(timings):>10.1f} {p95:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="Rows per synthetic page")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--url", help="Benchmark a running API instead of synthetic rows")
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.url:
+        run_live(args.url.rstrip("/"), args.page_size, args.iterations)
+    else:
+        run_synthetic(args.rows, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Startup Import-Time Benchmark
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+summarizes where cold-start import time goes.
+
+Usage (from the backend directory):
+    python scripts/benchmark_startup.py                # print summary
+    python scripts/benchmark_startup.py --top 30       # show more packages
+    python scripts/benchmark_startup.py --record scripts/startup_history.jsonl
+                                                       # append a run to track over time
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# importtime lines: "import time:  self [us] | cumulative | imported package"
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Settings require these values; nothing is contacted at import time
+PLACEHOLDER_ENV = {
+    "SUPABASE_URL": "http://127.0.0.1:54321",
+    "SUPABASE_ANON_KEY": "startup.benchmark.key",
+    "SUPABASE_SERVICE_ROLE_KEY": "startup.benchmark.key",
+    "GEMINI_API_KEY": "startup-benchmark",
+    "BREVO_API_KEY": "startup-benchmark",
+}
+
+# Modules whose presence at import time indicates a deferred import regressed
+WATCHED_MODULES = ["sklearn", "shap", "pandas", "joblib", "google.generativeai", "sib_api_v3_sdk"]
+
+
+def run_importtime(module: str) -> str:
+    env = {**PLACEHOLDER_ENV, **os.environ}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-4000:])
+        raise SystemExit(f"Importing {module} failed")
+    return result.stderr
+
+
+def summarize(output: str) -> dict:
+    """Aggregate cumulative import time per top-level package (microseconds)"""
+    per_package = defaultdict(int)
+    imported = set()
+    total_us = 0
+
+    for line in output.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        imported.add(name)
+        # Depth-0 entries (single leading space) are imported directly by the
+        # interpreter's `import` statement; their cumulative times sum to the total
+        if len(indent) == 1:
+            cumulative_us = int(cumulative)
+            total_us += cumulative_us
+            per_package[name.split(".")[0]] += cumulative_us
+
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(per_package.items(), key=lambda item: item[1], reverse=True)
+        },
+        "eagerly_imported": [m for m in WATCHED_MODULES if m in imported]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="Module to import (default: app.main)")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages to list")
+    parser.add_argument("--record", help="Append the run as a JSON line to this file")
+    args = parser.parse_args()
+
+    summary = summarize(run_importtime(args.module))
+
+    print(f"import {args.module}: {summary['total_ms']:.1f} ms total\n")
+    for name, ms in list(summary["packages_ms"].items())[:args.top]:
+        print(f"  {name:<32} {ms:9.1f} ms")
+
+    if summary["eagerly_imported"]:
+        print(f"\nHeavy modules imported at startup: {', '.join(summary['eagerly_imported'])}")
+    else:
+        print("\nNo heavy ML/SDK modules imported at startup")
+
+    if args.record:
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "module": args.module,
+            **summary
+        }
+        with open(args.record, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Recorded run in {args.record}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""
+Shared test setup: placeholder credentials so app.core.config.Settings loads
+without a .env file (no test talks to Supabase, Gemini or Brevo)
+"""
+
+import os
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+for key in ("SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "GEMINI_API_KEY", "BREVO_API_KEY"):
+    os.environ.setdefault(key, "test")
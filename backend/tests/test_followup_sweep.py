@@ -0,0 +1,39 @@
+"""Follow-up sweep dispatch accounting"""
+
+import asyncio
+
+from app.db.models import DecisionFeatures
+from app.services import followup_sweep
+from app.services.agent_workflow import WorkflowWriteBatch
+
+
+def features() -> DecisionFeatures:
+    return DecisionFeatures(
+        time_since_sla_breach=30.0,
+        category_priority=5,
+        number_of_followups=1,
+        days_since_submission=4.0,
+        status_score=1
+    )
+
+
+def test_failed_sends_are_counted_as_failed(monkeypatch):
+    async def execute_followup(complaint, features, dept=None, batch=None):
+        return complaint["id"] != "c2"
+
+    async def execute_escalation(complaint, features, dept=None, batch=None):
+        return False
+
+    monkeypatch.setattr(followup_sweep, "execute_followup", execute_followup)
+    monkeypatch.setattr(followup_sweep, "execute_escalation", execute_escalation)
+
+    decisions = [
+        ({"id": "c1", "assigned_department": "d1"}, features(), "follow_up"),
+        ({"id": "c2", "assigned_department": "d1"}, features(), "follow_up"),
+        ({"id": "c3", "assigned_department": "d2"}, features(), "escalate"),
+    ]
+    counts = asyncio.run(followup_sweep.dispatch_decisions(decisions, {}, WorkflowWriteBatch()))
+
+    assert counts["follow_ups"] == 1
+    assert counts["escalations"] == 0
+    assert counts["failed"] == 2
@@ -0,0 +1,48 @@
+"""Radius search filtering in the grid index fallback"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from app.services import geo_search as geo_search_module
+from app.services.geo_search import GeoSearch, GridIndex
+
+
+class MissingFunction(Exception):
+    code = "PGRST202"
+
+
+class MissingRpc:
+    async def execute(self):
+        raise MissingFunction("function not found")
+
+
+def row(id: str, category: str, status: str, created_at: str) -> dict:
+    return {
+        "id": id, "latitude": 12.9716, "longitude": 77.5946,
+        "category": category, "status": status, "created_at": created_at
+    }
+
+
+def test_radius_filters_apply_before_limit(monkeypatch):
+    monkeypatch.setattr(geo_search_module.repository, "rpc", lambda name, params: MissingRpc())
+
+    search = GeoSearch(index_ttl_seconds=60, cell_degrees=0.01, fallback_enabled=True)
+    search.index = GridIndex(0.01)
+    for r in [
+        row("new-other", "garbage", "pending", "2026-10-16T10:00:00+00:00"),
+        row("new-closed", "pothole", "resolved", "2026-10-16T09:00:00+00:00"),
+        row("match", "pothole", "pending", "2026-10-15T09:00:00+00:00"),
+        row("stale", "pothole", "pending", "2026-01-01T09:00:00+00:00"),
+    ]:
+        search.index.add(r)
+    search.index_built_at = time.monotonic()
+
+    rows = asyncio.run(search.in_radius(
+        12.9716, 77.5946, 50, limit=1,
+        category="pothole",
+        exclude_statuses={"resolved", "rejected"},
+        created_after=datetime(2026, 10, 1, tzinfo=timezone.utc)
+    ))
+
+    assert [r["id"] for r in rows] == ["match"]
@@ -0,0 +1,41 @@
+"""Keyset pagination query building"""
+
+import pytest
+
+pytest.importorskip("postgrest")
+
+from postgrest import AsyncPostgrestClient  # noqa: E402
+
+from app.api.pagination import apply_keyset, encode_cursor, match_any  # noqa: E402
+
+
+def complaints_query():
+    return AsyncPostgrestClient("http://localhost/rest/v1").from_("complaints").select("*")
+
+
+def test_orders_by_created_at_and_id_in_one_parameter():
+    query = apply_keyset(complaints_query(), cursor=None, page=1, page_size=20)
+
+    assert query.params.get_list("order") == ["created_at.desc,id.desc"]
+
+
+def test_cursor_keeps_single_order_parameter():
+    cursor = encode_cursor({
+        "created_at": "2024-05-01T10:00:00+00:00",
+        "id": "6f1c2d4e-8a3b-4c5d-9e7f-0a1b2c3d4e5f"
+    })
+    query = apply_keyset(complaints_query(), cursor=cursor, page=1, page_size=20)
+
+    assert query.params.get_list("order") == ["created_at.desc,id.desc"]
+    assert query.params["limit"] == "21"
+    assert query.params["or"].startswith("(created_at.lt.")
+    assert "id.lt.\"6f1c2d4e-8a3b-4c5d-9e7f-0a1b2c3d4e5f\"" in query.params["or"]
+
+
+def test_cursor_and_search_are_both_applied():
+    cursor = encode_cursor({"created_at": "2024-05-01T10:00:00+00:00", "id": "6f1c2d4e-8a3b-4c5d-9e7f-0a1b2c3d4e5f"})
+    query = match_any(complaints_query(), "category.ilike.%pothole%,description.ilike.%pothole%")
+    query = apply_keyset(query, cursor=cursor, page=1, page_size=20)
+
+    assert "or" not in query.params
+    assert query.params["and"].startswith("(or(category.ilike.%pothole%,description.ilike.%pothole%),or(created_at.lt.")
@@ -0,0 +1,42 @@
+"""Bulk RPC writes are sent in bounded chunks"""
+
+import asyncio
+
+from app.db import repository as repository_module
+from app.db.repository import repository, IN_FILTER_CHUNK_SIZE
+
+
+class RecordedRpc:
+    async def execute(self):
+        return None
+
+
+def record_rpc_calls(monkeypatch) -> list:
+    calls = []
+
+    def rpc(name, params):
+        calls.append((name, params))
+        return RecordedRpc()
+
+    monkeypatch.setattr(repository_module.repository, "rpc", rpc)
+    return calls
+
+
+def test_merge_ai_reports_is_chunked(monkeypatch):
+    calls = record_rpc_calls(monkeypatch)
+    patches = {f"c{i}": {"ingestion_attempts": i} for i in range(2 * IN_FILTER_CHUNK_SIZE + 1)}
+
+    asyncio.run(repository.merge_ai_reports(patches))
+
+    assert [len(params["updates"]) for _, params in calls] == [IN_FILTER_CHUNK_SIZE, IN_FILTER_CHUNK_SIZE, 1]
+    assert {u["id"] for _, params in calls for u in params["updates"]} == set(patches)
+
+
+def test_bulk_update_next_checks_is_chunked(monkeypatch):
+    calls = record_rpc_calls(monkeypatch)
+    next_checks = {f"c{i}": "2026-10-18T00:00:00+00:00" for i in range(IN_FILTER_CHUNK_SIZE + 1)}
+
+    asyncio.run(repository.bulk_update_next_checks(next_checks))
+
+    assert [len(params["updates"]) for _, params in calls] == [IN_FILTER_CHUNK_SIZE, 1]
+    assert {u["id"] for _, params in calls for u in params["updates"]} == set(next_checks)
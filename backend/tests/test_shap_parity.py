@@ -0,0 +1,80 @@
+"""
+SHAP parity: the built-in LinearShapExplainer must match shap.LinearExplainer
+on the decision model, for single rows and for batches
+"""
+
+import numpy as np
+import pytest
+
+shap = pytest.importorskip("shap")
+
+from app.services import decision_model as decision_model_module  # noqa: E402
+from app.services.decision_model import DecisionModel, LinearShapExplainer  # noqa: E402
+
+TOLERANCE = 1e-8
+
+
+@pytest.fixture(scope="module")
+def trained(tmp_path_factory):
+    """Decision model trained into a temporary directory, with its scaled training data"""
+    model_dir = tmp_path_factory.mktemp("models")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(decision_model_module, "MODEL_DIR", model_dir)
+        mp.setattr(decision_model_module, "MODEL_PATH", model_dir / "decision_model.pkl")
+        mp.setattr(decision_model_module, "SCALER_PATH", model_dir / "scaler.pkl")
+        mp.setattr(decision_model_module, "BACKGROUND_PATH", model_dir / "shap_background.pkl")
+        model = DecisionModel()
+        model.train()
+
+    X, _ = model.generate_training_data()
+    return model, model.scaler.transform(X)
+
+
+@pytest.fixture(scope="module")
+def reference(trained):
+    """shap.LinearExplainer over the full training background (the default masker subsamples 100 rows)"""
+    model, X_scaled = trained
+    return shap.LinearExplainer(model.model, shap.maskers.Independent(X_scaled, max_samples=len(X_scaled)))
+
+
+@pytest.fixture(scope="module")
+def batch(trained):
+    model, _ = trained
+    rng = np.random.default_rng(0)
+    return model.scaler.transform(np.column_stack([
+        rng.uniform(-48, 240, 1000),
+        rng.integers(1, 11, 1000),
+        rng.integers(0, 8, 1000),
+        rng.uniform(0, 60, 1000),
+        rng.choice([0, 1, 2, 3, 4], 1000)
+    ]))
+
+
+def reference_values(reference, rows: np.ndarray) -> np.ndarray:
+    values = reference.shap_values(rows)
+    return values[1] if isinstance(values, list) else values
+
+
+@pytest.mark.parametrize("size", [1, 1000])
+def test_shap_values_match(trained, reference, batch, size):
+    model, X_scaled = trained
+    analytic = LinearShapExplainer(model.model, X_scaled.mean(axis=0))
+    rows = batch[:size]
+
+    assert np.max(np.abs(analytic.shap_values(rows) - reference_values(reference, rows))) <= TOLERANCE
+
+
+def test_expected_value_matches(trained, reference):
+    model, X_scaled = trained
+    analytic = LinearShapExplainer(model.model, X_scaled.mean(axis=0))
+
+    assert abs(analytic.expected_value - float(np.ravel(reference.expected_value)[-1])) <= TOLERANCE
+
+
+def test_stored_background_matches(trained, batch):
+    """The deployed explainer uses the background mean stored at training time"""
+    model, X_scaled = trained
+    analytic = LinearShapExplainer(model.model, X_scaled.mean(axis=0))
+
+    stored = model.explain_batch(model.scaler.inverse_transform(batch))["shap_values"]
+    assert np.max(np.abs(stored - analytic.shap_values(batch))) <= 1e-6
@@ -67,7 +67,9 @@ export function AiReportDisplay({ complaint }: AiReportDisplayProps) {
           <div className="mt-4 p-4 rounded-lg bg-muted/50 border border-muted-foreground/20">
             <p className="font-medium text-sm mb-2">Detailed Analysis</p>
             <p className="text-sm text-muted-foreground whitespace-pre-line leading-relaxed">
-              {complaint.ai_report}
+              {typeof complaint.ai_report === 'string'
+                ? complaint.ai_report
+                : complaint.ai_report.vision_summary ?? complaint.ai_report.explanation_text}
             </p>
           </div>
         )}
@@ -24,7 +24,7 @@ export interface Complaint {
   // AI-generated fields
   ai_detected_category?: string
   ai_confidence?: number
-  ai_report?: string
+  ai_report?: Record<string, any> | string  // JSONB; string for rows written before the migration
   assigned_department?: string
   official_summary?: string
   // User feedback fields